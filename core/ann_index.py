@@ -0,0 +1,235 @@
+"""
+ANN Index - Approximate nearest-neighbour search over the memory embeddings
+"""
+import os
+import math
+import numpy as np
+import torch
+from typing import List, Optional, Tuple, Callable
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) index over an EmbeddingMatrix.
+
+    Rows are clustered around `nlist` centroids with spherical k-means and
+    each centroid keeps the list of row ids assigned to it. A query only
+    scores the rows in its `nprobe` closest lists, so the work per query
+    is roughly nprobe / nlist of an exact scan. The index stores row ids
+    only; the vectors themselves stay in the embedding matrix. Methods that
+    take a matrix accept a tensor or an EmbeddingMatrix, whose indexing
+    returns float32 rows for any storage type.
+    """
+
+    def __init__(self, nprobe: int = 8, min_train_size: int = 4096,
+                 retrain_growth: float = 4.0, logger: Optional[Callable] = None):
+        """
+        Initialize an untrained IVF index
+
+        Args:
+            nprobe: Number of inverted lists scanned per query
+            min_train_size: Number of rows needed before the index is trained
+            retrain_growth: Retrain once the row count grows by this factor
+            logger: Optional logging function
+        """
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.log = logger or print
+
+        self.centroids = None
+        self.assignments: List[int] = []
+        self.lists: List[List[int]] = []
+        self.trained_size = 0
+
+    def is_trained(self) -> bool:
+        """Whether centroids have been computed"""
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self.assignments)
+
+    def reset(self) -> None:
+        """Drop the centroids and all assignments"""
+        self.centroids = None
+        self.assignments = []
+        self.lists = []
+        self.trained_size = 0
+
+    def train(self, matrix: torch.Tensor, iterations: int = 10, seed: int = 0) -> None:
+        """
+        Compute centroids with spherical k-means and assign every row
+
+        Args:
+            matrix: Normalized embeddings, one row per document
+            iterations: Number of k-means iterations
+            seed: Random seed for centroid initialization
+        """
+        n = int(matrix.shape[0])
+        nlist = max(1, int(math.sqrt(n)))
+
+        # Train on a bounded sample; assignment of the rest is a single pass
+        generator = torch.Generator().manual_seed(seed)
+        sample_size = min(n, nlist * 64)
+        sample = matrix[torch.randperm(n, generator=generator)[:sample_size]].float()
+
+        centroids = sample[torch.randperm(sample_size, generator=generator)[:nlist]].clone()
+        for _ in range(iterations):
+            labels = torch.argmax(sample @ centroids.T, dim=1)
+            sums = torch.zeros_like(centroids).index_add_(0, labels, sample)
+            counts = torch.bincount(labels, minlength=nlist)
+            # Keep the previous centroid for empty clusters
+            empty = counts == 0
+            sums[empty] = centroids[empty]
+            centroids = torch.nn.functional.normalize(sums, dim=1)
+
+        self.centroids = centroids
+        self.assignments = []
+        self.lists = [[] for _ in range(nlist)]
+        self.trained_size = n
+        self.add(matrix, 0)
+
+        self.log(f"[Memory] Trained IVF index with {nlist} lists over {n} rows")
+
+    def _assign(self, vectors: torch.Tensor) -> torch.Tensor:
+        """Get the closest centroid for each vector"""
+        labels = []
+        # Bound the size of the temporary score matrix
+        for start in range(0, int(vectors.shape[0]), 8192):
+            block = vectors[start:start + 8192].float()
+            labels.append(torch.argmax(block @ self.centroids.T, dim=1))
+        return torch.cat(labels) if labels else torch.empty(0, dtype=torch.long)
+
+    def add(self, vectors: torch.Tensor, start_row: int) -> None:
+        """
+        Assign newly appended rows to their inverted lists
+
+        Args:
+            vectors: Normalized embeddings of the new rows
+            start_row: Row id of the first vector in the embedding matrix
+        """
+        if not self.is_trained():
+            return
+
+        for offset, label in enumerate(self._assign(vectors).tolist()):
+            self.assignments.append(label)
+            self.lists[label].append(start_row + offset)
+
+    def needs_training(self, count: int) -> bool:
+        """
+        Check whether the index should be (re)trained for a row count
+
+        Args:
+            count: Current number of rows in the embedding matrix
+
+        Returns:
+            True if train() should be called
+        """
+        if count < self.min_train_size:
+            return False
+        if not self.is_trained():
+            return True
+        return count >= self.trained_size * self.retrain_growth
+
+    def search(self, matrix: torch.Tensor, query: torch.Tensor, k: int,
+               nprobe: Optional[int] = None,
+               exclude: Optional[torch.Tensor] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Find approximate nearest rows for a query
+
+        Args:
+            matrix: Normalized embeddings the index was built over
+            query: Normalized 1-D query embedding
+            k: Number of results
+            nprobe: Optional override for the number of lists scanned
+            exclude: Optional boolean mask over the leading rows; rows set
+                in it are skipped
+
+        Returns:
+            Tuple of (scores, row indices), best first
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        _, probe = torch.topk(self.centroids @ query, k=nprobe)
+
+        candidates = [row for label in probe.tolist() for row in self.lists[label]]
+        ids = torch.tensor(candidates, dtype=torch.long)
+        # Rows appended after `matrix` was taken are not part of the search
+        ids = ids[ids < int(matrix.shape[0])]
+        if exclude is not None and len(exclude) and len(ids):
+            covered = ids < len(exclude)
+            ids = ids[~(covered & exclude[ids.clamp(max=len(exclude) - 1)])]
+        if not len(ids):
+            return torch.empty(0), torch.empty(0, dtype=torch.long)
+
+        scores = matrix[ids].float() @ query
+        top_scores, top = torch.topk(scores, k=min(k, len(ids)))
+        return top_scores, ids[top]
+
+    def select(self, rows: List[int]) -> None:
+        """
+        Keep only the given rows, renumbering them in order
+
+        The centroids are kept, so this is much cheaper than retraining
+        after rows are removed from the embedding matrix.
+
+        Args:
+            rows: Row ids to keep, ascending
+        """
+        if not self.is_trained():
+            return
+
+        self.assignments = [self.assignments[row] for row in rows if row < len(self.assignments)]
+        self.lists = [[] for _ in range(len(self.lists))]
+        for new_row, label in enumerate(self.assignments):
+            self.lists[label].append(new_row)
+
+    def save(self, path: str) -> None:
+        """
+        Save centroids and row assignments
+
+        Args:
+            path: Destination .npz file
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids.numpy(),
+                assignments=np.asarray(self.assignments, dtype=np.int32),
+                trained_size=np.int64(self.trained_size),
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str, matrix: torch.Tensor) -> bool:
+        """
+        Load a saved index and assign any rows it does not cover yet
+
+        Args:
+            path: Saved .npz file
+            matrix: Normalized embeddings the index belongs to
+
+        Returns:
+            True if the index was loaded, False if it does not match the matrix
+        """
+        with np.load(path) as data:
+            centroids = torch.from_numpy(data["centroids"])
+            assignments = data["assignments"]
+            trained_size = int(data["trained_size"])
+
+        count = int(matrix.shape[0])
+        if centroids.shape[1] != matrix.shape[1] or len(assignments) > count:
+            return False
+
+        self.centroids = centroids
+        self.trained_size = trained_size
+        self.assignments = assignments.tolist()
+        self.lists = [[] for _ in range(int(centroids.shape[0]))]
+
+        # Rebuild the inverted lists in row order
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.lists) + 1))
+        for label in range(len(self.lists)):
+            self.lists[label] = order[bounds[label]:bounds[label + 1]].tolist()
+
+        if len(assignments) < count:
+            self.add(matrix[len(assignments):], len(assignments))
+        return True
@@ -4,7 +4,25 @@ Chat Engine - Handles conversation logic and prompt formatting
 import time
 import json
 import os
-from typing import List, Dict, Any, Optional, Callable
+import threading
+from typing import List, Dict, Any, Optional, Callable, NamedTuple, Set, Tuple
+
+from core.session_journal import SessionJournal
+from core.chat_history import ChatHistory
+from core.prompt_builder import PromptBuilder, PromptStats, TokenCounter, load_tokenizer
+
+# Context window assumed when the model parameters do not set one
+# (Ollama's default num_ctx)
+DEFAULT_CONTEXT_WINDOW = 2048
+
+MEMORY_MODES = ("off", "manual", "auto", "background")
+
+class ConversationContext(NamedTuple):
+    """Backend context tokens that encode the conversation up to a message"""
+    model: str
+    system_prompt: str
+    tokens: List[int]
+    history_revision: int
 
 class ChatEngine:
     """Manages chat history, prompt formatting, and conversation context"""
@@ -12,32 +30,90 @@ class ChatEngine:
     def __init__(self, 
                  model_manager,
                  memory_system=None,
-                 session_file: str = "data/chat_history.json",
-                 logger: Optional[Callable] = None):
+                 session_file: str = "data/chat_history.jsonl",
+                 logger: Optional[Callable] = None,
+                 ollama_url: Optional[str] = None,
+                 history_page_size: int = 200,
+                 reuse_context: bool = True,
+                 tokenizer: Optional[str] = None):
         """
         Initialize the chat engine
         
         Args:
             model_manager: ModelManager instance
             memory_system: Optional MemorySystem instance
-            session_file: Path to save chat history
+            session_file: Path of the chat history journal; a legacy
+                .json history next to it is imported on first load
             logger: Optional logging function
+            ollama_url: Ollama server URL; defaults to $OLLAMA_HOST or
+                http://localhost:11434
+            history_page_size: Messages loaded at start-up and by each
+                load_older_messages() call
+            reuse_context: Continue the model's context from the previous
+                turn instead of resending the conversation, so only the new
+                turn is evaluated
+            tokenizer: Optional Hugging Face tokenizer name or path used
+                for the prompt token counts of every model; without one each
+                model's own tokenizer is read from its weights file, and
+                counts are estimated for models where that fails
         """
+        base, _ = os.path.splitext(session_file)
         self.model_manager = model_manager
         self.memory_system = memory_system
-        self.session_file = session_file
+        self.session_file = base + ".jsonl"
+        self.legacy_session_file = base + ".json"
+        self.history_page_size = history_page_size
         self.log = logger or print
+        self.ollama_url = ollama_url
+        self._ollama = None
+        self.reuse_context = reuse_context
+        self._conversation: Optional[ConversationContext] = None
+        
+        # Prompt assembly within the model's context window; prompt_builder
+        # uses the configured tokenizer, or estimates counts without one
+        self.prompt_builder = PromptBuilder(TokenCounter(
+            load_tokenizer(tokenizer, logger=self.log) if tokenizer else None))
+        # Builders of models whose own tokenizer was looked up, and models
+        # being looked up in the background
+        self._model_builders: Dict[str, PromptBuilder] = {}
+        self._resolving: Set[str] = set()
+        self._builders_lock = threading.Lock()
+        self.last_prompt_stats: Optional[PromptStats] = None
+        
+        # Functions (text, role) -> text applied to user messages before
+        # they are sent and to assistant responses before they are returned
+        self._message_modifiers: List[Callable[[str, str], str]] = []
+        
+        self.chat_history = ChatHistory()
+        
+        # Journal state: chat_history holds the journal from byte offset
+        # _history_offset on; its first _saved_count messages are on disk,
+        # unchanged unless its edit revision differs from _saved_revision
+        self.journal = SessionJournal(self.session_file, logger=self.log)
+        self._session_lock = threading.RLock()
+        self._history_offset = 0
+        self._saved_count = 0
+        self._saved_revision = None
         
-        self.chat_history = []
         self.system_prompt = "You are Irintai, a helpful and knowledgeable assistant."
-        self.memory_mode = "Off"  # Off, Manual, Auto, Background
+        self.memory_mode = "off"  # One of MEMORY_MODES
         
         # Create directory for session file if it doesn't exist
-        os.makedirs(os.path.dirname(session_file), exist_ok=True)
+        os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
         
         # Load previous session if available
         self.load_session()
         
+    @property
+    def chat_history(self) -> ChatHistory:
+        """Loaded chat history, oldest message first"""
+        return self._chat_history
+    
+    @chat_history.setter
+    def chat_history(self, messages) -> None:
+        """Replace the loaded chat history; the journal is rewritten on the next save"""
+        self._chat_history = messages if isinstance(messages, ChatHistory) else ChatHistory(messages)
+        
     def set_system_prompt(self, prompt: str) -> None:
         """
         Set the system prompt
@@ -53,11 +129,18 @@ class ChatEngine:
         Set the memory mode
         
         Args:
-            enabled: Whether memory is enabled
+            enabled: Whether memory is enabled, or a mode name ("Off",
+                "Manual", "Auto" or "Background", in any case)
             auto: Whether to automatically use memory
             background: Whether to run memory processing in background
         """
-        if not enabled:
+        if isinstance(enabled, str):
+            mode = enabled.lower()
+            if mode not in MEMORY_MODES:
+                self.log(f"[Memory Mode] Unknown mode: {enabled}")
+                return
+            self.memory_mode = mode
+        elif not enabled:
             self.memory_mode = "off"
         elif enabled and not auto:
             self.memory_mode = "manual"
@@ -68,99 +151,192 @@ class ChatEngine:
             
         self.log(f"[Memory Mode] Set to: {self.memory_mode.capitalize()}")
         
-    def format_prompt(self, prompt: str, model_name: str) -> str:
+    def _memory_documents(self, prompt: str) -> List[Dict[str, Any]]:
         """
-        Format a prompt for the given model
+        Get documents relevant to a prompt, if the memory mode adds them
         
         Args:
             prompt: User prompt
-            model_name: Name of the model
             
         Returns:
-            Formatted prompt
+            Matching documents, most relevant first
         """
-        model = model_name.lower()
-        
-        # Create a context from the recent chat history (last few exchanges)
-        recent_history = []
-        history_limit = 5  # Number of recent exchanges to include
-        
-        # Get the recent history
-        if self.chat_history:
-            recent_history = self.chat_history[-min(len(self.chat_history), history_limit*2):]
-        
-        # Check memory mode and add relevant context if enabled
-        context = ""
-        if self.memory_mode in ["Auto", "Background"] and self.memory_system:
-            matches = self.memory_system.search(prompt)
-            if matches:
-                context = "\n\nRelevant context from documents:\n"
-                for m in matches:
-                    source = m.get("source", "Unknown")
-                    text_preview = m.get("text", "")[:200]  # Get first 200 chars
-                    context += f"From {source}: {text_preview}\n\n"
-                
-                self.log(f"[Memory] Added context from {len(matches)} relevant documents")
+        if self.memory_mode not in ("auto", "background") or not self.memory_system:
+            return []
+        # Reflections and personality profiles are kept in their own collections
+        collections = getattr(self.memory_system, "CHAT_COLLECTIONS", None)
+        if collections:
+            return self.memory_system.search(prompt, collections=list(collections)) or []
+        return self.memory_system.search(prompt) or []
+    
+    def _context_window(self) -> Tuple[int, Optional[int]]:
+        """Get the context window of the current model and the tokens reserved for its response"""
+        params = getattr(self.model_manager, 'current_parameters', {}) or {}
+        window = params.get("num_ctx") or params.get("context") or DEFAULT_CONTEXT_WINDOW
+        reserve = params.get("num_predict")
+        return int(window), (int(reserve) if reserve and int(reserve) > 0 else None)
+    
+    def _log_prompt_stats(self, stats: PromptStats) -> None:
+        """Log the token counts of an assembled prompt"""
+        self.last_prompt_stats = stats
+        if stats.memory_documents:
+            self.log(f"[Memory] Added context from {stats.memory_documents} relevant documents")
+        self.log(f"[Prompt] {stats.total_tokens}/{stats.budget} tokens ({stats.template} template): "
+                 f"system {stats.system_tokens}, memory {stats.memory_tokens}, "
+                 f"history {stats.history_tokens} ({stats.history_messages} messages), "
+                 f"prompt {stats.prompt_tokens}")
+        if stats.dropped_documents:
+            self.log(f"[Prompt] Left out {stats.dropped_documents} documents that did not fit")
+        if stats.total_tokens > stats.budget:
+            self.log(f"[Prompt Warning] Prompt exceeds its budget of {stats.budget} tokens")
+        
+    def get_prompt_builder(self, model_name: str) -> PromptBuilder:
+        """
+        Get the prompt builder that counts tokens for a model
         
-        # Format based on the model
-        if any(k in model for k in ["llama", "mistral", "nous", "mythomax"]):
-            # Build chat context with system prompt
-            formatted_history = f"<|system|>\n{self.system_prompt}\n" if self.system_prompt else ""
-            
-            for msg in recent_history:
-                role = msg.get("role", "")
-                content = msg.get("content", "")
-                
-                if role == "user":
-                    formatted_history += f"<|user|>\n{content}\n"
-                elif role == "assistant":
-                    formatted_history += f"<|assistant|>\n{content}\n"
-            
-            # Add the current prompt
-            return context + formatted_history + f"<|user|>\n{prompt.strip()}\n<|assistant|>\n"
+        Never waits for a tokenizer: until the model's own tokenizer is
+        loaded by prepare_tokenizer(), which this starts if needed, the
+        estimating builder is returned.
         
-        elif "phi" in model:
-            # Format for Phi models
-            formatted_history = f"System: {self.system_prompt}\n\n" if self.system_prompt else ""
+        Args:
+            model_name: Name of the model
             
-            for msg in recent_history:
-                role = msg.get("role", "")
-                content = msg.get("content", "")
-                
-                if role == "user":
-                    formatted_history += f"Human: {content}\n"
-                elif role == "assistant":
-                    formatted_history += f"Assistant: {content}\n"
+        Returns:
+            Prompt builder
+        """
+        if self.prompt_builder.counter.tokenizer is not None:
+            return self.prompt_builder
+        builder = self._model_builders.get(model_name)
+        if builder is None:
+            self.prepare_tokenizer(model_name)
+            return self.prompt_builder
+        return builder
+    
+    def prepare_tokenizer(self, model_name: str) -> None:
+        """
+        Load a model's tokenizer in the background
+        
+        Called when a model is selected, so its prompts are counted with
+        its own tokenizer, read from its GGUF weights (which needs a local
+        Ollama server). Models without a usable tokenizer keep the
+        estimating builder, which is logged once; a lookup that fails
+        because the server is unavailable is retried on a later call.
+        
+        Args:
+            model_name: Name of the model
+        """
+        if not model_name or self.prompt_builder.counter.tokenizer is not None:
+            return
+        with self._builders_lock:
+            if model_name in self._model_builders or model_name in self._resolving:
+                return
+            self._resolving.add(model_name)
+        threading.Thread(target=self._load_model_tokenizer, args=(model_name,), daemon=True).start()
+    
+    def _load_model_tokenizer(self, model_name: str) -> None:
+        """Resolve and load a model's tokenizer; runs in a background thread"""
+        builder = None
+        try:
+            model_file = self._get_ollama_client().get_model_file(model_name)
+            tokenizer = None
+            if model_file:
+                tokenizer = load_tokenizer(os.path.dirname(model_file), logger=self.log,
+                                           gguf_file=os.path.basename(model_file))
+            if tokenizer is None:
+                self.log(f"[Prompt] No tokenizer found for {model_name}, estimating token counts")
+                builder = self.prompt_builder
+            else:
+                self.log(f"[Prompt] Counting tokens with the tokenizer of {model_name}")
+                builder = PromptBuilder(TokenCounter(tokenizer))
+        except Exception as e:
+            self.log(f"[Prompt] Could not look up the tokenizer of {model_name} yet: {e}")
+        finally:
+            with self._builders_lock:
+                if builder is not None:
+                    self._model_builders[model_name] = builder
+                self._resolving.discard(model_name)
+    
+    def format_continuation(self, prompt: str, model_name: str) -> str:
+        """
+        Format only the new turn of a conversation for the given model
+        
+        Used when the model continues its context from the previous turn,
+        which already holds the system prompt and the earlier exchanges.
+        The token counts are kept in last_prompt_stats.
+        
+        Args:
+            prompt: User prompt
+            model_name: Name of the model
             
-            # Add the current prompt
-            return context + formatted_history + f"Human: {prompt.strip()}\n\nAssistant:"
-        
-        elif "codellama" in model or "deepseek" in model:
-            # Specialized for code models
-            formatted = f"""
-            [INST] 
-            {self.system_prompt}
-
-            {context if context else ''}
-            {prompt.strip()}
-            [/INST]
-            """
-            return formatted
-        else:
-            # Generic format with conversation history
-            formatted_history = f"System: {self.system_prompt}\n\n" if self.system_prompt else ""
+        Returns:
+            Formatted turn
+        """
+        window, reserve = self._context_window()
+        assembled = self.get_prompt_builder(model_name).build_continuation(
+            model_name, prompt, self._memory_documents(prompt), window, reserve)
+        self._log_prompt_stats(assembled.stats)
+        return assembled.text
+    
+    def _reusable_context(self, model_name: str) -> Optional[List[int]]:
+        """
+        Get the context tokens the next turn can continue from
+        
+        Must be called before the new user message is added. The context
+        is dropped when the model or system prompt changed, or when the
+        history changed in any way since the previous response (its
+        revision differs).
+        
+        Args:
+            model_name: Model the next turn is sent to
             
-            for msg in recent_history:
-                role = msg.get("role", "")
-                content = msg.get("content", "")
-                
-                if role == "user":
-                    formatted_history += f"User: {content}\n\n"
-                elif role == "assistant":
-                    formatted_history += f"Assistant: {content}\n\n"
+        Returns:
+            Context tokens, or None to send the full conversation
+        """
+        state = self._conversation
+        if not self.reuse_context or state is None:
+            return None
+        
+        if state.model != model_name or state.system_prompt != self.system_prompt:
+            return None
+        if self.chat_history.revision != state.history_revision:
+            return None
+        return state.tokens
+    
+    def _remember_context(self, model_name: str, tokens: Optional[List[int]]) -> None:
+        """Keep the context returned with the response just added to the history"""
+        if not self.reuse_context or not tokens or not self.chat_history:
+            self._conversation = None
+            return
+        self._conversation = ConversationContext(
+            model_name, self.system_prompt, tokens, self.chat_history.revision)
+    
+    def format_prompt(self, prompt: str, model_name: str) -> str:
+        """
+        Format a prompt for the given model
+        
+        The system prompt, relevant documents (in the Auto and Background
+        memory modes) and as much recent history as fits are packed into
+        the model's context window, less the tokens reserved for the
+        response. The token counts are kept in last_prompt_stats.
+        
+        Args:
+            prompt: User prompt
+            model_name: Name of the model
             
-            # Add the current prompt
-            return context + formatted_history + f"User: {prompt.strip()}\n\nAssistant:"
+        Returns:
+            Formatted prompt
+        """
+        history = self.chat_history
+        # send_message adds the user message to the history first
+        if history and history[-1].get("role") == "user" and history[-1].get("content") == prompt:
+            history = history[:-1]
+        
+        window, reserve = self._context_window()
+        assembled = self.get_prompt_builder(model_name).build(
+            model_name, self.system_prompt, history, prompt,
+            self._memory_documents(prompt), window, reserve)
+        self._log_prompt_stats(assembled.stats)
+        return assembled.text
     
     def add_user_message(self, content: str) -> None:
         """
@@ -192,45 +368,124 @@ class ChatEngine:
         }
         self.chat_history.append(message)
     
-    def send_message(self, content: str, on_response: Optional[Callable] = None) -> str:
+    def register_message_modifier(self, modifier_function: Callable[[str, str], str]) -> None:
+        """
+        Register a function that modifies messages, e.g. a personality style
+        
+        Args:
+            modifier_function: Called with (text, role) where role is "user"
+                or "assistant"; returns the modified text
+        """
+        if modifier_function not in self._message_modifiers:
+            self._message_modifiers.append(modifier_function)
+            
+    def unregister_message_modifier(self, modifier_function: Callable[[str, str], str]) -> None:
+        """
+        Unregister a message modifier
+        
+        Args:
+            modifier_function: Previously registered function
+        """
+        if modifier_function in self._message_modifiers:
+            self._message_modifiers.remove(modifier_function)
+            
+    def apply_message_modifiers(self, text: str, role: str) -> str:
+        """
+        Run text through the registered message modifiers
+        
+        Args:
+            text: Message text
+            role: "user" or "assistant"
+            
+        Returns:
+            Modified text
+        """
+        for modifier in list(self._message_modifiers):
+            try:
+                result = modifier(text, role)
+                if isinstance(result, str):
+                    text = result
+            except Exception as e:
+                self.log(f"[Error] Message modifier failed: {e}")
+        return text
+        
+    def send_message(self, content: str, on_response: Optional[Callable] = None,
+                     on_chunk: Optional[Callable[[str], None]] = None) -> str:
         """
         Send a message and get a response
         
+        With on_chunk the response is streamed: each piece is passed to it
+        as the model produces it, from the calling thread. Assistant message
+        modifiers can only see the complete response, so the returned text
+        may differ from the concatenated pieces (typically by an added
+        prefix or suffix); callers rendering the stream should reconcile
+        with the returned text.
+        
         Args:
             content: Message content
             on_response: Optional callback for when response is ready
+            on_chunk: Optional callback receiving raw response pieces
             
         Returns:
-            Response text
+            Response text, after the message modifiers
         """
+        content = self.apply_message_modifiers(content, "user")
+        model_name = self.model_manager.current_model
+        
+        # Get model parameters if available
+        params = getattr(self.model_manager, 'current_parameters', {}) or {}
+        
+        # The previous turn's context is only valid for the history as it
+        # was when that response was added
+        context_tokens = self._reusable_context(model_name) if model_name else None
+        self._conversation = None
+        
         # Add user message to history
         self.add_user_message(content)
         
         # Check if model is running
-        if not self.model_manager.current_model:
+        if not model_name:
             error_msg = "Model is not running. Please start a model first."
             self.log(f"[Error] {error_msg}")
             return error_msg
         
         try:
-            # Import the OllamaClient
-            from plugins.ollama_hub.core.ollama_client import OllamaClient
-            
-            # Create a client with our logger
-            ollama = OllamaClient(logger=self.log)
-            
-            # Format the prompt
-            model_name = self.model_manager.current_model
-            formatted_prompt = self.format_prompt(content, model_name)
-            
-            # Get model parameters if available
-            params = getattr(self.model_manager, 'current_parameters', {})
+            ollama = self._get_ollama_client()
             
             # Log that we're sending the prompt
             self.log(f"[Prompt] Sending to model: {content[:100]}...")
             
-            # Send to model using direct Ollama API
-            success, response = ollama.generate(model_name, formatted_prompt, params)
+            # Stream from the Ollama REST API (the CLI if the server is unreachable)
+            success = False
+            if context_tokens:
+                continuation = self.format_continuation(content, model_name)
+                stats = self.last_prompt_stats
+                if len(context_tokens) + stats.total_tokens > stats.budget:
+                    # The backend would silently cut off the start of the context
+                    self.log(f"[Prompt] Context of {len(context_tokens)} tokens is full, sending the full conversation")
+                    context_tokens = None
+            retry = True
+            if context_tokens:
+                self.log(f"[Prompt] Continuing context of {len(context_tokens)} tokens")
+                streamed = []
+                
+                def forward_chunk(piece: str) -> None:
+                    streamed.append(piece)
+                    if on_chunk:
+                        on_chunk(piece)
+                        
+                success, response = ollama.generate(
+                    model_name, continuation, params, on_token=forward_chunk, context=context_tokens)
+                # Consumers cannot take back streamed pieces, so a retry
+                # would show a second answer after a partial one
+                retry = not success and not streamed
+                if retry:
+                    self.log(f"[Prompt] Context continuation failed ({response}), sending the full conversation")
+                elif not success:
+                    self.log(f"[Prompt] Context continuation failed after streaming began: {response}")
+            if not success and retry:
+                success, response = ollama.generate(
+                    model_name, self.format_prompt(content, model_name), params, on_token=on_chunk)
         except Exception as e:
             success = False
             response = f"Error occurred: {str(e)}"
@@ -239,10 +494,13 @@ class ChatEngine:
         if success and response:
             # Add assistant message to history
             self.add_assistant_message(response, model_name)
+            self._remember_context(model_name, ollama.last_result.get("context"))
             
             # Save session
             self.save_session()
             
+            response = self.apply_message_modifiers(response, "assistant")
+            
             # Call callback if provided
             if on_response:
                 on_response(response)
@@ -253,21 +511,53 @@ class ChatEngine:
             self.log(f"[Error] {error_msg}")
             return error_msg
             
+    def _get_ollama_client(self):
+        """Get the Ollama client, created once so its HTTP connection is reused"""
+        if self._ollama is None:
+            from plugins.ollama_hub.core.ollama_client import OllamaClient
+            self._ollama = OllamaClient(logger=self.log, base_url=self.ollama_url)
+        return self._ollama
+    
+    def _mark_saved(self) -> None:
+        """Record that the whole in-memory history is on disk"""
+        self._saved_count = len(self.chat_history)
+        self._saved_revision = self.chat_history.edit_revision
+        
+    def _unsaved_messages(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the messages added since the last save
+        
+        Returns:
+            New messages, or None if the history was replaced or messages
+            already saved were changed, removed or reordered, and the
+            journal must be rewritten
+        """
+        history = self.chat_history
+        if history.edit_revision != self._saved_revision or len(history) < self._saved_count:
+            return None
+        return history[self._saved_count:]
+    
     def save_session(self) -> bool:
         """
-        Save the chat session to a file
+        Save the chat session to the journal
+        
+        Only messages added since the last save are appended. If saved
+        messages were changed, the loaded part of the journal is compacted
+        (rewritten) instead.
         
         Returns:
             True if session saved successfully, False otherwise
         """
         try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
-            
-            with open(self.session_file, 'w', encoding='utf-8') as f:
-                json.dump(self.chat_history, f, indent=2)
-                
-            self.log("[Session] Session saved")
+            with self._session_lock:
+                new_messages = self._unsaved_messages()
+                if new_messages is None:
+                    self.journal.rewrite(self.chat_history, keep_bytes=self._history_offset)
+                    self.log("[Session] Session compacted")
+                elif new_messages:
+                    self.journal.append(new_messages)
+                    self.log(f"[Session] Saved {len(new_messages)} new messages")
+                self._mark_saved()
             return True
         except Exception as e:
             self.log(f"[Session Error] Failed to save session: {e}")
@@ -275,18 +565,26 @@ class ChatEngine:
             
     def load_session(self) -> bool:
         """
-        Load a chat session from a file
+        Load the most recent page of the chat session
+        
+        A legacy JSON history is imported into the journal the first time.
         
         Returns:
             True if session loaded successfully, False otherwise
         """
-        if not os.path.exists(self.session_file):
-            self.log("[Session] No previous session found")
-            return False
-            
         try:
-            with open(self.session_file, 'r', encoding='utf-8') as f:
-                self.chat_history = json.load(f)
+            with self._session_lock:
+                if not self.journal.exists():
+                    if not os.path.exists(self.legacy_session_file):
+                        self.log("[Session] No previous session found")
+                        return False
+                    with open(self.legacy_session_file, 'r', encoding='utf-8') as f:
+                        self.journal.rewrite(json.load(f))
+                    self.log(f"[Session] Imported {self.legacy_session_file} into {self.session_file}")
+                
+                self.journal.repair()
+                self.chat_history, self._history_offset = self.journal.read_before(None, self.history_page_size)
+                self._mark_saved()
                 
             self.log(f"[Session] Loaded {len(self.chat_history)} messages")
             return True
@@ -294,9 +592,43 @@ class ChatEngine:
             self.log(f"[Session Error] Failed to load session: {e}")
             return False
             
+    def has_older_messages(self) -> bool:
+        """Whether the journal holds messages older than the loaded history"""
+        return self._history_offset > 0
+    
+    def load_older_messages(self, count: Optional[int] = None) -> int:
+        """
+        Load a page of older messages in front of the chat history
+        
+        Args:
+            count: Number of messages, history_page_size if None
+            
+        Returns:
+            Number of messages loaded
+        """
+        with self._session_lock:
+            if not self._history_offset:
+                return 0
+            # Unsaved changes would be lost by moving the start of the window
+            self.save_session()
+            older, self._history_offset = self.journal.read_before(
+                self._history_offset, count or self.history_page_size)
+            valid = self._conversation is not None \
+                and self._conversation.history_revision == self.chat_history.revision
+            self.chat_history[:0] = older
+            self._mark_saved()
+            if valid:
+                # Older messages do not change what the context covers
+                self._conversation = self._conversation._replace(
+                    history_revision=self.chat_history.revision)
+        return len(older)
+            
     def clear_history(self) -> None:
-        """Clear the chat history"""
-        self.chat_history = []
+        """Clear the chat history, including older messages not loaded"""
+        with self._session_lock:
+            self.chat_history = []
+            self._history_offset = 0
+            self._conversation = None
         self.log("[Session] Chat history cleared")
         
     def get_last_model(self) -> Optional[str]:
@@ -0,0 +1,145 @@
+"""
+Chat History - Message list that records when it was changed
+"""
+import itertools
+from typing import Any, Dict, Iterable
+
+# Revisions are unique across histories, so a replaced history never
+# matches a revision recorded for the one before it
+_revisions = itertools.count(1)
+
+class ChatMessage(dict):
+    """Chat message that reports in-place edits to the history holding it"""
+
+    __slots__ = ("_history",)
+
+    def __init__(self, *args, history: "ChatHistory" = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._history = history
+
+    def _edited(self) -> None:
+        if self._history is not None:
+            self._history._edited()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._edited()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._edited()
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._edited()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self._edited()
+        return result
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._edited()
+
+    def clear(self):
+        super().clear()
+        self._edited()
+
+    def __reduce__(self):
+        # Copies and pickles are plain dictionaries, detached from the history
+        return (dict, (dict(self),))
+
+class ChatHistory(list):
+    """
+    List of chat messages with revision numbers.
+
+    `revision` changes on every change to the list or to a message in it;
+    `edit_revision` changes only when messages already in the list are
+    changed, replaced, removed or reordered, not when messages are
+    appended. The session journal compares edit revisions to tell whether
+    it can append, and the chat engine compares revisions to tell whether
+    the model's context still matches the history. Messages are stored as
+    ChatMessage copies so edits made through the history are seen.
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = ()):
+        super().__init__()
+        super().extend(self._adopt(message) for message in messages)
+        self.revision = self.edit_revision = next(_revisions)
+
+    def _adopt(self, message: Dict[str, Any]) -> ChatMessage:
+        """Get a message owned by this history"""
+        if isinstance(message, ChatMessage) and message._history is self:
+            return message
+        return ChatMessage(message, history=self)
+
+    def _appended(self) -> None:
+        self.revision = next(_revisions)
+
+    def _edited(self) -> None:
+        self.revision = self.edit_revision = next(_revisions)
+
+    def append(self, message):
+        super().append(self._adopt(message))
+        self._appended()
+
+    def extend(self, messages):
+        super().extend([self._adopt(message) for message in messages])
+        self._appended()
+
+    def __iadd__(self, messages):
+        self.extend(messages)
+        return self
+
+    def insert(self, index, message):
+        super().insert(index, self._adopt(message))
+        self._edited()
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = [self._adopt(message) for message in value]
+        else:
+            value = self._adopt(value)
+        super().__setitem__(key, value)
+        self._edited()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._edited()
+
+    def __imul__(self, count):
+        result = super().__imul__(count)
+        self._edited()
+        return result
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._edited()
+        return result
+
+    def remove(self, message):
+        super().remove(message)
+        self._edited()
+
+    def clear(self):
+        super().clear()
+        self._edited()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._edited()
+
+    def reverse(self):
+        super().reverse()
+        self._edited()
+
+    def __reduce__(self):
+        # Copies and pickles are plain lists of plain dictionaries
+        return (list, ([dict(message) for message in self],))
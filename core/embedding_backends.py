@@ -0,0 +1,264 @@
+"""
+Embedding Backends - Interchangeable text embedding models for the memory system
+"""
+import hashlib
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple, Type, Union
+
+import numpy as np
+import torch
+
+class EmbeddingBackend:
+    """
+    Base class of embedding backends.
+
+    A backend turns texts into float32 embeddings through encode(), which
+    accepts the same common arguments as SentenceTransformer.encode so the
+    memory system and the embedding workers can use either. Subclasses
+    implement _embed() for a list of texts.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name: str, threads: int = 0, logger: Optional[Callable] = None):
+        """
+        Initialize the backend
+
+        Args:
+            model_name: Model name or path
+            threads: Torch CPU threads to use, 0 keeps the current setting
+            logger: Optional logging function
+        """
+        self.model_name = model_name
+        self.log = logger or print
+        if threads > 0:
+            torch.set_num_threads(threads)
+
+    @classmethod
+    def expected_model_id(cls, model_name: str) -> str:
+        """
+        Get the model id a backend is expected to report, before it is loaded
+
+        Args:
+            model_name: Model name or path
+
+        Returns:
+            Id string
+        """
+        return model_name
+
+    @property
+    def model_id(self) -> str:
+        """
+        Identify the embeddings this backend produces
+
+        Stores and caches record this id, so embeddings of different
+        backends are never mixed.
+        """
+        return self.model_name
+
+    def _embed(self, texts: List[str], batch_size: int) -> torch.Tensor:
+        """Embed texts into a float32 matrix with one row per text"""
+        raise NotImplementedError
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32,
+               convert_to_tensor: bool = False, convert_to_numpy: bool = True,
+               **kwargs) -> Union[torch.Tensor, np.ndarray]:
+        """
+        Embed one text or a list of texts
+
+        Args:
+            texts: Text or list of texts
+            batch_size: Texts passed through the model at a time
+            convert_to_tensor: Return a torch tensor
+            convert_to_numpy: Return a numpy array (ignored if
+                convert_to_tensor is set)
+
+        Returns:
+            Embedding, or matrix with one embedding per text
+        """
+        single = isinstance(texts, str)
+        embeddings = self._embed([texts] if single else list(texts), batch_size)
+        embeddings = embeddings.detach().to("cpu", torch.float32)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor or not convert_to_numpy:
+            return embeddings
+        return embeddings.numpy()
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Sentence transformer model on the default device"""
+
+    name = "sentence_transformer"
+    device: Optional[str] = None
+
+    def __init__(self, model_name: str, threads: int = 0, logger: Optional[Callable] = None):
+        """
+        Load the model
+
+        Args:
+            model_name: Sentence transformer name or path
+            threads: Torch CPU threads to use, 0 keeps the current setting
+            logger: Optional logging function
+        """
+        super().__init__(model_name, threads, logger)
+        # Imported here because sentence_transformers dominates start-up time
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device=self.device)
+
+    def _embed(self, texts: List[str], batch_size: int) -> torch.Tensor:
+        """Embed texts with the sentence transformer"""
+        if not texts:
+            return torch.empty((0, self.model.get_sentence_embedding_dimension() or 0))
+        return self.model.encode(texts, batch_size=batch_size, convert_to_tensor=True)
+
+class CPUBackend(SentenceTransformerBackend):
+    """
+    Sentence transformer tuned for machines without a GPU.
+
+    The model is pinned to the CPU and its linear layers, which dominate
+    transformer inference, are converted to dynamically quantized int8.
+    That usually embeds markedly faster at a small cost in retrieval
+    quality (measure with diagnostics/memory_benchmark.py --backend cpu);
+    quantized embeddings get their own model id so they are never mixed
+    with float ones. Where quantization is unavailable the float model is
+    used, under the plain model id. Inference runs without autograd
+    bookkeeping.
+    """
+
+    name = "cpu"
+    device = "cpu"
+
+    def __init__(self, model_name: str, threads: int = 0, logger: Optional[Callable] = None,
+                 quantize: bool = True):
+        """
+        Load and optimize the model
+
+        Args:
+            model_name: Sentence transformer name or path
+            threads: Torch CPU threads to use, 0 keeps the current setting
+            logger: Optional logging function
+            quantize: Quantize linear layers to int8
+        """
+        super().__init__(model_name, threads, logger)
+        self.quantized = False
+        if quantize:
+            try:
+                with warnings.catch_warnings():
+                    # Newer torch releases deprecate eager-mode quantization
+                    warnings.simplefilter("ignore")
+                    self.model = torch.ao.quantization.quantize_dynamic(
+                        self.model, {torch.nn.Linear}, dtype=torch.qint8)
+                self.quantized = True
+            except Exception as e:
+                # Not every torch build ships a quantized engine for this CPU
+                self.log(f"[Memory Warning] Could not quantize {model_name}, embedding with the float model: {e}")
+
+    @classmethod
+    def expected_model_id(cls, model_name: str) -> str:
+        """Expect the quantized model"""
+        return f"{model_name}+int8"
+
+    @property
+    def model_id(self) -> str:
+        """Identify quantized embeddings apart from float ones"""
+        return f"{self.model_name}+int8" if self.quantized else self.model_name
+
+    def _embed(self, texts: List[str], batch_size: int) -> torch.Tensor:
+        """Embed texts without autograd"""
+        with torch.inference_mode():
+            return super()._embed(texts, batch_size)
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic bag-of-words embedder that needs no model.
+
+    Every token is hashed to a signed unit in one of `dim` buckets, so texts
+    sharing words get similar embeddings. Meant for tests and offline
+    benchmarks: results are reproducible and nothing is downloaded.
+    """
+
+    name = "hashing"
+
+    def __init__(self, model_name: str = "hashing", threads: int = 0, logger: Optional[Callable] = None,
+                 dim: int = 384):
+        """
+        Initialize the embedder
+
+        Args:
+            model_name: Unused except in the model id
+            threads: Unused
+            logger: Optional logging function
+            dim: Embedding dimension
+        """
+        super().__init__(model_name, 0, logger)
+        self.dim = dim
+
+    @classmethod
+    def expected_model_id(cls, model_name: str) -> str:
+        """Identify hashed embeddings"""
+        return f"hashing:{model_name}"
+
+    @property
+    def model_id(self) -> str:
+        """Identify hashed embeddings"""
+        return self.expected_model_id(self.model_name)
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        """Get the bucket and sign of a token; hashing is cheaper than caching"""
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def _embed(self, texts: List[str], batch_size: int) -> torch.Tensor:
+        """Hash the tokens of every text"""
+        embeddings = torch.zeros((len(texts), self.dim), dtype=torch.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                bucket, sign = self._bucket(token)
+                embeddings[row, bucket] += sign
+        return embeddings
+
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    CPUBackend.name: CPUBackend,
+    HashingBackend.name: HashingBackend,
+}
+
+def get_backend_class(backend: str) -> Type[EmbeddingBackend]:
+    """
+    Look up an embedding backend by name
+
+    Args:
+        backend: "sentence_transformer", "cpu" or "hashing"
+
+    Returns:
+        Backend class
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    try:
+        return EMBEDDING_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown embedding backend '{backend}', "
+                         f"expected one of {', '.join(EMBEDDING_BACKENDS)}") from None
+
+def load_embedding_backend(backend: str, model_name: str, threads: int = 0,
+                           logger: Optional[Callable] = None) -> EmbeddingBackend:
+    """
+    Create an embedding backend
+
+    Module-level so it can be pickled as the model loader of embedding
+    worker processes (with functools.partial for the backend name).
+
+    Args:
+        backend: Backend name
+        model_name: Model name or path
+        threads: Torch CPU threads to use, 0 keeps the current setting
+        logger: Optional logging function
+
+    Returns:
+        Loaded backend
+    """
+    return get_backend_class(backend)(model_name, threads=threads, logger=logger)
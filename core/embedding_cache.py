@@ -0,0 +1,247 @@
+"""
+Embedding Cache - Persistent content-hash cache of text embeddings
+"""
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+from typing import List, Dict, Iterable, Optional, Callable, Tuple
+
+def content_hash(text: str) -> str:
+    """
+    Get the content hash used to identify a text chunk
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        Hex SHA-256 digest of the UTF-8 encoded text
+    """
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Append-only on-disk cache of embeddings keyed by text hash.
+
+    One cache file is kept per embedding model, so switching models never
+    returns vectors from a different embedding space. The file is a short
+    header followed by fixed-size records (32-byte SHA-256 digest plus the
+    float32 vector), so adding entries is a single append. The file is
+    memory-mapped rather than read into memory: only the digest lookup is
+    resident, and vectors are paged in when they are hit. Entries of texts
+    the store no longer holds are dropped by compact().
+    """
+
+    MAGIC = b"IREC1\n"
+    HEADER_SIZE = len(MAGIC) + 4
+
+    def __init__(self, cache_dir: str, model_name: str, logger: Optional[Callable] = None):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding the cache files
+            model_name: Embedding model name the vectors belong to
+            logger: Optional logging function
+        """
+        self.model_name = model_name
+        self.log = logger or print
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = os.path.join(cache_dir, f"embedding_cache.{safe_name}.bin")
+
+        self.dim = None
+        self._rows: Dict[bytes, int] = {}
+        self._records = None
+        self._mapped = 0
+        self._count = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record_size(self) -> int:
+        return 32 + self.dim * 4
+
+    def _map(self, count: int) -> None:
+        """Map the first `count` records of the cache file"""
+        # Drop the old mapping first; a mapped file cannot be replaced on Windows
+        self._records = None
+        self._mapped = count
+        if count:
+            self._records = np.memmap(self.path, dtype=np.uint8, mode="r", offset=self.HEADER_SIZE,
+                                      shape=(count, self._record_size()))
+
+    def _load(self) -> None:
+        """Map the cache file and index its digests on first use"""
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "rb") as f:
+                if f.read(len(self.MAGIC)) != self.MAGIC:
+                    raise ValueError("bad header")
+                dim = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+
+            self.dim = dim
+            data_size = os.path.getsize(self.path) - self.HEADER_SIZE
+            count = data_size // self._record_size()
+            if data_size % self._record_size():
+                # Drop a record torn by a crash so later appends stay aligned
+                with open(self.path, "r+b") as f:
+                    f.truncate(self.HEADER_SIZE + count * self._record_size())
+
+            self._map(count)
+            self._rows = {self._records[i, :32].tobytes(): i for i in range(count)}
+            self._count = count
+        except Exception as e:
+            self.log(f"[Memory Warning] Ignoring unreadable embedding cache {self.path}: {e}")
+            self._rows = {}
+            self._records = None
+            self._mapped = 0
+            self._count = 0
+
+    def lookup(self, hashes: List[str]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """
+        Look up cached embeddings
+
+        Args:
+            hashes: Content hashes, see content_hash()
+
+        Returns:
+            Tuple of (position -> vector for hits, positions of misses)
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+            found = {}
+            missing = []
+            for pos, digest in enumerate(hashes):
+                row = self._rows.get(bytes.fromhex(digest))
+                if row is None:
+                    missing.append(pos)
+                    continue
+                if row >= self._mapped:
+                    # Appended since the file was mapped
+                    self._map(self._count)
+                found[pos] = np.frombuffer(self._records[row, 32:].tobytes(), dtype=np.float32)
+
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing
+
+    def put(self, hashes: List[str], vectors: np.ndarray) -> None:
+        """
+        Add embeddings to the cache and append them to the cache file
+
+        Args:
+            hashes: Content hashes of the embedded texts
+            vectors: 2-D float matrix with one embedding per hash
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not len(hashes):
+            return
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                self.log("[Memory Warning] Embedding dimension changed; not caching")
+                return
+
+            new = {}
+            for digest, vector in zip(hashes, vectors):
+                key = bytes.fromhex(digest)
+                if key not in self._rows and key not in new:
+                    new[key] = vector
+            if not new:
+                return
+
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                is_new = not os.path.exists(self.path)
+                with open(self.path, "ab") as f:
+                    if is_new:
+                        f.write(self.MAGIC)
+                        f.write(np.uint32(self.dim).tobytes())
+                    f.write(b"".join(key + vector.tobytes() for key, vector in new.items()))
+            except Exception as e:
+                self.log(f"[Memory Warning] Failed to write embedding cache: {e}")
+                return
+
+            for offset, key in enumerate(new):
+                self._rows[key] = self._count + offset
+            self._count += len(new)
+
+    def compact(self, keep: Iterable[Optional[str]]) -> int:
+        """
+        Drop the entries of texts that are no longer stored
+
+        The kept records are written to a new file that replaces the old one.
+
+        Args:
+            keep: Content hashes of the texts still stored
+
+        Returns:
+            Number of entries dropped
+        """
+        keep_keys = {bytes.fromhex(digest) for digest in keep if digest}
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            kept = sorted((row, key) for key, row in self._rows.items() if key in keep_keys)
+            dropped = self._count - len(kept)
+            if not dropped:
+                return 0
+
+            if self._mapped < self._count:
+                self._map(self._count)
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(self.MAGIC)
+                    f.write(np.uint32(self.dim).tobytes())
+                    for start in range(0, len(kept), 4096):
+                        rows = [row for row, _ in kept[start:start + 4096]]
+                        f.write(self._records[rows].tobytes())
+                self._map(0)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                self.log(f"[Memory Warning] Failed to compact embedding cache: {e}")
+                self._map(self._count)
+                return 0
+
+            self._rows = {key: row for row, (_, key) in enumerate(kept)}
+            self._count = len(kept)
+            self._map(self._count)
+
+        self.log(f"[Memory] Dropped {dropped} unused entries from the embedding cache")
+        return dropped
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with entry, hit and miss counts
+        """
+        return {"entries": self._count, "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        """Remove all cached embeddings and the cache file"""
+        with self._lock:
+            self._rows = {}
+            self._map(0)
+            self._count = 0
+            self.dim = None
+            self._loaded = True
+            if os.path.exists(self.path):
+                os.remove(self.path)
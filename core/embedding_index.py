@@ -0,0 +1,379 @@
+"""
+Embedding Index - Contiguous matrix storage and scoring for memory embeddings
+"""
+import numpy as np
+import torch
+import torch.nn.functional as F
+from typing import List, Optional, Tuple, Union
+
+class EmbeddingMatrix:
+    """
+    Growable 2-D buffer of L2-normalized embeddings.
+
+    Rows are stored contiguously in a preallocated tensor whose capacity
+    doubles when full, so appends are amortized O(1) and a query is scored
+    with a single matrix-vector product. Because rows are normalized on the
+    way in, that product is the cosine similarity.
+
+    Rows can be kept in a compact storage type to reduce resident memory:
+    "float16" halves it, and "int8" stores each row as signed 8-bit codes
+    with one float32 scale per row (symmetric scalar quantization), about a
+    quarter of float32. Compact rows are scored without materializing a
+    float32 copy of the matrix: float16 rows with a half-precision product,
+    int8 codes block by block with the row scale applied to the product.
+    """
+
+    MIN_CAPACITY = 1024
+    GROWTH_FACTOR = 2
+
+    # Supported storage types
+    STORAGE_TYPES = {"float32": torch.float32, "float16": torch.float16, "int8": torch.int8}
+
+    # Rows converted to float32 at a time when scoring int8 storage; small
+    # enough for the converted block to stay in cache
+    SCORE_BLOCK_ROWS = 8192
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 0, storage: str = "float32"):
+        """
+        Initialize an empty embedding matrix
+
+        Args:
+            dim: Embedding dimension, inferred from the first append if None
+            capacity: Number of rows to preallocate
+            storage: Row storage type, one of STORAGE_TYPES
+        """
+        if storage not in self.STORAGE_TYPES:
+            raise ValueError(f"Unsupported embedding storage type: {storage}")
+
+        self.dim = dim
+        self.storage = storage
+        self._buffer = None
+        self._scales = None
+        self._count = 0
+
+        if dim and capacity:
+            self._allocate(capacity)
+
+    @classmethod
+    def from_array(cls, matrix: Union[np.ndarray, torch.Tensor],
+                   normalized: bool = True,
+                   scales: Optional[Union[np.ndarray, torch.Tensor]] = None,
+                   storage: Optional[str] = None) -> "EmbeddingMatrix":
+        """
+        Wrap an existing matrix without copying it
+
+        A memory-mapped array stays mapped until the first append that
+        needs more capacity. If `storage` differs from the type of the
+        given matrix, the rows are converted instead.
+
+        Args:
+            matrix: 2-D array with one embedding (or int8 code row) per row
+            normalized: Whether the rows are already L2-normalized
+            scales: Per-row scales, required for an int8 matrix
+            storage: Storage type for the result, defaults to the matrix type
+
+        Returns:
+            EmbeddingMatrix backed by the given matrix
+        """
+        tensor = torch.from_numpy(matrix) if isinstance(matrix, np.ndarray) else matrix
+        if scales is not None and isinstance(scales, np.ndarray):
+            scales = torch.from_numpy(scales)
+
+        source = {torch.float16: "float16", torch.int8: "int8"}.get(tensor.dtype, "float32")
+        if source == "int8" and scales is None:
+            raise ValueError("int8 embeddings need per-row scales")
+        if source == "float32" and (tensor.dtype != torch.float32 or not normalized):
+            tensor = F.normalize(tensor.float(), dim=1)
+
+        wrapped = cls(dim=int(tensor.shape[1]), storage=source)
+        wrapped._buffer = tensor
+        wrapped._scales = scales if source == "int8" else None
+        wrapped._count = int(tensor.shape[0])
+
+        if storage is None or storage == source:
+            return wrapped
+
+        # Convert between storage types one block at a time
+        converted = cls(dim=wrapped.dim, capacity=len(wrapped), storage=storage)
+        for start in range(0, len(wrapped), cls.SCORE_BLOCK_ROWS):
+            converted.append(wrapped[start:start + cls.SCORE_BLOCK_ROWS])
+        return converted
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Shape of the stored rows as (count, dim)"""
+        return (self._count, self.dim or 0)
+
+    def __getitem__(self, key) -> torch.Tensor:
+        """
+        Get stored rows as float32
+
+        Only the selected rows are converted from compact storage, so this
+        is the way to read a subset of rows regardless of the storage type.
+
+        Args:
+            key: Row index, slice, or list/tensor of row ids
+
+        Returns:
+            Float32 tensor of the selected rows
+        """
+        if self._buffer is None:
+            return torch.empty((0, self.dim or 0), dtype=torch.float32)[key]
+        if isinstance(key, slice):
+            key = slice(*key.indices(self._count))
+        elif isinstance(key, (list, tuple)):
+            key = torch.as_tensor(key, dtype=torch.long)
+
+        rows = self._buffer[:self._count][key]
+        if self.storage == "float32":
+            return rows
+        if self.storage == "float16":
+            return rows.float()
+        return rows.float() * self._scales[:self._count][key].unsqueeze(-1)
+
+    def capacity(self) -> int:
+        """Number of rows the buffer can hold before it grows"""
+        return 0 if self._buffer is None else int(self._buffer.shape[0])
+
+    def nbytes(self) -> int:
+        """Number of bytes used by the stored rows"""
+        if self._buffer is None:
+            return 0
+        size = self._count * self.dim * self._buffer.element_size()
+        if self._scales is not None:
+            size += self._count * self._scales.element_size()
+        return size
+
+    def _allocate(self, capacity: int) -> None:
+        """Replace the buffers with empty ones of the given capacity, keeping the rows"""
+        buffer = torch.empty((capacity, self.dim), dtype=self.STORAGE_TYPES[self.storage])
+        scales = torch.empty(capacity, dtype=torch.float32) if self.storage == "int8" else None
+        if self._count:
+            buffer[:self._count] = self._buffer[:self._count]
+            if scales is not None:
+                scales[:self._count] = self._scales[:self._count]
+        self._buffer = buffer
+        self._scales = scales
+
+    def _reserve(self, needed: int) -> None:
+        """
+        Grow the buffer geometrically so it can hold at least `needed` rows
+
+        Args:
+            needed: Required number of rows
+        """
+        if needed <= self.capacity():
+            return
+
+        self._allocate(max(needed, self.capacity() * self.GROWTH_FACTOR, self.MIN_CAPACITY))
+
+    def append(self, vectors: Union[torch.Tensor, List[torch.Tensor]]) -> None:
+        """
+        Normalize and append embeddings
+
+        Args:
+            vectors: 2-D tensor or list of 1-D tensors
+        """
+        if isinstance(vectors, (list, tuple)):
+            if not vectors:
+                return
+            vectors = torch.stack([torch.as_tensor(v) for v in vectors])
+        if vectors.dim() == 1:
+            vectors = vectors.unsqueeze(0)
+
+        vectors = F.normalize(vectors.detach().to("cpu", torch.float32), dim=1)
+
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        n = int(vectors.shape[0])
+        self._reserve(self._count + n)
+        rows = slice(self._count, self._count + n)
+
+        if self.storage == "int8":
+            # Symmetric per-row quantization to [-127, 127]
+            scales = vectors.abs().amax(dim=1).clamp(min=1e-12) / 127.0
+            self._buffer[rows] = torch.round(vectors / scales.unsqueeze(1)).clamp(-127, 127).to(torch.int8)
+            self._scales[rows] = scales
+        else:
+            self._buffer[rows] = vectors.to(self._buffer.dtype)
+        self._count += n
+
+    def matrix(self) -> torch.Tensor:
+        """
+        Get the stored rows as float32
+
+        For float32 storage this is a view of the buffer. For compact
+        storage it is a full float32 copy; prefer indexing or top_k().
+
+        Returns:
+            Tensor of shape [count, dim]
+        """
+        return self[:]
+
+    def storage_arrays(self, count: Optional[int] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Get the raw stored rows for persisting them
+
+        Args:
+            count: Number of leading rows, defaults to all
+
+        Returns:
+            Tuple of (row matrix in the storage type, per-row scales for int8 or None)
+        """
+        count = self._count if count is None else count
+        if self._buffer is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32), None
+        scales = self._scales[:count].numpy() if self._scales is not None else None
+        return self._buffer[:count].numpy(), scales
+
+    def prepare_query(self, query: torch.Tensor) -> torch.Tensor:
+        """
+        Normalize a query embedding for scoring against the stored rows
+
+        Args:
+            query: 1-D query embedding
+
+        Returns:
+            Normalized float32 CPU tensor
+        """
+        return F.normalize(query.detach().to("cpu", torch.float32).flatten(), dim=0)
+
+    def scores(self, query: torch.Tensor) -> torch.Tensor:
+        """
+        Compute cosine similarity between a query and every row
+
+        Args:
+            query: 1-D query embedding
+
+        Returns:
+            1-D tensor of scores
+        """
+        query = self.prepare_query(query)
+        if self._buffer is None:
+            return torch.empty(0, dtype=torch.float32)
+        if self.storage != "int8":
+            return self._score(self._buffer[:self._count], None, query)
+
+        blocks = []
+        for start in range(0, self._count, self.SCORE_BLOCK_ROWS):
+            end = min(start + self.SCORE_BLOCK_ROWS, self._count)
+            blocks.append(self._score(self._buffer[start:end], self._scales[start:end], query))
+        return torch.cat(blocks)
+
+    def _score(self, rows: torch.Tensor, scales: Optional[torch.Tensor],
+               query: torch.Tensor) -> torch.Tensor:
+        """
+        Score stored rows in their storage type against a prepared query
+
+        Args:
+            rows: Rows taken from the buffer
+            scales: Matching int8 row scales, or None
+            query: Normalized float32 query
+
+        Returns:
+            1-D float32 tensor of scores
+        """
+        if self.storage == "float32":
+            return rows @ query
+        if self.storage == "float16":
+            return (rows @ query.half()).float()
+        return (rows.float() @ query) * scales
+
+    def top_k(self, query: torch.Tensor, k: int,
+              rows: Optional[List[int]] = None,
+              exclude: Optional[torch.Tensor] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Find the rows most similar to a query
+
+        Args:
+            query: 1-D query embedding
+            k: Number of results
+            rows: Optional candidate row ids; only these rows are scored
+            exclude: Optional boolean mask over the leading rows; rows set
+                in it are never returned. Ignored when `rows` is given.
+
+        Returns:
+            Tuple of (scores, row indices), best first
+        """
+        available = None
+        if rows is None:
+            scores = self.scores(query)
+            if exclude is not None and len(exclude):
+                scores[:len(exclude)].masked_fill_(exclude, float("-inf"))
+                available = int(scores.shape[0]) - int(exclude.sum())
+        else:
+            row_ids = torch.as_tensor(rows, dtype=torch.long)
+            scales = self._scales[row_ids] if self.storage == "int8" else None
+            scores = self._score(self._buffer[row_ids], scales, self.prepare_query(query))
+
+        k = min(k, int(scores.shape[0]) if available is None else available)
+        if k <= 0:
+            return scores[:0], torch.empty(0, dtype=torch.long)
+
+        top_scores, top_indices = torch.topk(scores, k=k)
+        if rows is not None:
+            top_indices = row_ids[top_indices]
+        return top_scores, top_indices
+
+    def view(self, count: Optional[int] = None) -> "EmbeddingMatrix":
+        """
+        Get a read-only view of the leading rows
+
+        The view shares the current buffer. Rows appended later are
+        written past its end or into a new buffer, so the view keeps
+        showing exactly `count` rows; this is what lets searches run
+        against a fixed version of the index while rows are added.
+
+        Args:
+            count: Number of leading rows, defaults to all
+
+        Returns:
+            EmbeddingMatrix over the same storage
+        """
+        view = EmbeddingMatrix(dim=self.dim, storage=self.storage)
+        view._buffer = self._buffer
+        view._scales = self._scales
+        view._count = self._count if count is None else min(count, self._count)
+        return view
+
+    def take(self, rows: Union[List[int], torch.Tensor]) -> "EmbeddingMatrix":
+        """
+        Copy a subset of rows into a new matrix with the same storage type
+
+        Args:
+            rows: Row ids to keep, in the order they should appear
+
+        Returns:
+            New EmbeddingMatrix holding only the given rows
+        """
+        row_ids = torch.as_tensor(rows, dtype=torch.long)
+        selected = EmbeddingMatrix(dim=self.dim, storage=self.storage)
+        if self._buffer is None or not len(row_ids):
+            return selected
+
+        selected._buffer = self._buffer[:self._count][row_ids].clone()
+        if self._scales is not None:
+            selected._scales = self._scales[:self._count][row_ids].clone()
+        selected._count = int(len(row_ids))
+        return selected
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        Get the stored rows as a float32 numpy array
+
+        Returns:
+            Array of shape [count, dim]
+        """
+        return self.matrix().numpy()
+
+    def clear(self) -> None:
+        """Remove all rows and release the buffer"""
+        self._buffer = None
+        self._scales = None
+        self._count = 0
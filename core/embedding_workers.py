@@ -0,0 +1,114 @@
+"""
+Embedding Workers - Process pool that embeds large batches of text in parallel
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Callable
+
+import numpy as np
+
+# Embedding model of the current worker process, loaded by _init_worker
+_worker_model = None
+
+def load_sentence_transformer(model_name: str):
+    """
+    Load a sentence transformer model
+
+    Args:
+        model_name: Model name or path
+
+    Returns:
+        Loaded SentenceTransformer
+    """
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def _init_worker(model_name: str, model_loader: Callable, torch_threads: int) -> None:
+    """Load the model once when a worker process starts"""
+    global _worker_model
+    import torch
+    torch.set_num_threads(torch_threads)
+    _worker_model = model_loader(model_name)
+
+def _encode_batch(texts: List[str], batch_size: int) -> np.ndarray:
+    """Embed one batch in a worker process, batch_size texts per model call"""
+    embeddings = _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return np.asarray(embeddings, dtype=np.float32)
+
+class EmbeddingWorkerPool:
+    """
+    Pool of embedding worker processes.
+
+    Each worker loads the embedding model once at start-up and then embeds
+    whole batches, so a bulk import uses several cores and keeps the
+    embedding work out of the UI process. Texts are split into batches of
+    batch_size, spread over the workers and merged back in input order.
+    Torch threads are divided between the workers to avoid oversubscribing
+    the CPU. Workers are started on first use with the "spawn" method,
+    which is safe in a process that already runs threads.
+    """
+
+    def __init__(self, model_name: str, workers: int = 2, batch_size: int = 512,
+                 model_loader: Callable = load_sentence_transformer,
+                 logger: Optional[Callable] = None):
+        """
+        Initialize the pool without starting it
+
+        Args:
+            model_name: Embedding model loaded by every worker
+            workers: Number of worker processes
+            batch_size: Texts sent to a worker at a time, and passed
+                through the model at a time
+            model_loader: Picklable function returning a model with an
+                encode() method for a model name
+            logger: Optional logging function
+        """
+        self.model_name = model_name
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.model_loader = model_loader
+        self.log = logger or print
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the worker processes if needed"""
+        with self._lock:
+            if self._executor is None:
+                torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+                self.log(f"[Memory] Starting {self.workers} embedding workers "
+                         f"({torch_threads} threads each)")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.model_loader, torch_threads),
+                )
+            return self._executor
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts in the worker processes
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Float32 matrix with one row per text, in input order
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        results = list(self._get_executor().map(_encode_batch, batches, [self.batch_size] * len(batches)))
+        return np.concatenate(results)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
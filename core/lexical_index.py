@@ -0,0 +1,286 @@
+"""
+Lexical Index - BM25 inverted index over memory document text
+"""
+import os
+import re
+import json
+import math
+import threading
+from array import array
+import numpy as np
+from typing import List, Dict, Optional, Tuple, Callable
+
+# Words, optionally joined by . - : / so identifiers, file names and error
+# codes such as "file_ops.py" or "ERR-4012" are kept whole
+_TOKEN_RE = re.compile(r"\w+(?:[.\-:/]\w+)*")
+_PART_RE = re.compile(r"[._\-:/]+")  # also splits snake_case
+
+# Very common English words; they carry no lexical signal and would
+# otherwise have the longest posting lists
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its "
+    "me my no not of on or our she so that the their them then there these they this "
+    "to was we were what when which who will with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-case index terms
+
+    Compound tokens are indexed whole and by their parts, so a query for
+    "memory_system.py" and a query for "memory" both match it.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms, with repetitions
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = _PART_RE.split(token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part and part not in STOPWORDS)
+    return terms
+
+class BM25Index:
+    """
+    Incrementally maintained inverted index with BM25 scoring.
+
+    Each term has one posting list: an ``array('I')`` of packed entries
+    ``row << 8 | tf`` (term frequency capped at 255, where BM25 has long
+    saturated), so a posting costs 4 bytes. Rows are added in increasing
+    order and the lists stay sorted without any merging. Scoring decodes
+    the posting lists of the query terms with numpy and only touches
+    documents that contain at least one of them.
+
+    Posting arrays are only read through copies taken under a lock, since
+    an array cannot grow while numpy holds a view of its buffer.
+    """
+
+    TF_BITS = 8
+    TF_MAX = (1 << TF_BITS) - 1
+    MAX_ROWS = 1 << (32 - TF_BITS)
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, logger: Optional[Callable] = None):
+        """
+        Initialize an empty index
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            logger: Optional logging function
+        """
+        self.k1 = k1
+        self.b = b
+        self.log = logger or print
+
+        self.postings: Dict[str, array] = {}
+        self.doc_len = array("I")
+        self.total_len = 0
+        self._lock = threading.Lock()
+
+        # Store epoch the row ids belong to, set by the owner
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def add(self, row: int, text: str) -> None:
+        """
+        Index the text of a row
+
+        Rows must be added in order; rows skipped in between (documents
+        without text) are indexed as empty.
+
+        Args:
+            row: Row id of the document
+            text: Document text
+        """
+        if row >= self.MAX_ROWS:
+            raise ValueError(f"Lexical index supports at most {self.MAX_ROWS} rows")
+
+        counts: Dict[str, int] = {}
+        terms = tokenize(text or "")
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+
+        with self._lock:
+            if row < len(self.doc_len):
+                raise ValueError(f"Row {row} is already indexed")
+            while len(self.doc_len) < row:
+                self.doc_len.append(0)
+
+            for term, tf in counts.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = array("I")
+                posting.append((row << self.TF_BITS) | min(tf, self.TF_MAX))
+
+            self.doc_len.append(len(terms))
+            self.total_len += len(terms)
+
+    def scores(self, query: str, rows: Optional[List[int]] = None,
+               exclude: Optional[np.ndarray] = None,
+               count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute BM25 scores of the rows matching a query
+
+        Args:
+            query: Query text
+            rows: Optional candidate row ids; other rows are ignored
+            exclude: Optional boolean mask over the leading rows; rows set
+                in it are never returned
+            count: Optional row count; rows from this one on are ignored
+
+        Returns:
+            Tuple of (row ids, scores) for rows containing a query term,
+            in increasing row order
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.doc_len)
+            postings = [np.array(self.postings[term], dtype=np.uint32)
+                        for term in query_terms if term in self.postings]
+            if not n or not postings:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            avg_len = max(self.total_len / n, 1e-9)
+            doc_len = np.array(self.doc_len, dtype=np.uint32)
+
+        all_rows, all_scores = [], []
+        for entries in postings:
+            matched = (entries >> self.TF_BITS).astype(np.int64)
+            tf = (entries & self.TF_MAX).astype(np.float32)
+            df = len(entries)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_len[matched] / avg_len)
+            all_rows.append(matched)
+            all_scores.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+
+        matched = np.concatenate(all_rows)
+        scores = np.concatenate(all_scores)
+        if len(postings) > 1:
+            matched, inverse = np.unique(matched, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        scores = scores.astype(np.float32)
+
+        keep = np.ones(len(matched), dtype=bool)
+        if count is not None:
+            keep &= matched < count
+        if rows is not None:
+            keep &= np.isin(matched, np.asarray(rows, dtype=np.int64))
+        if exclude is not None and len(exclude):
+            covered = matched < len(exclude)
+            keep[covered] &= ~exclude[matched[covered]]
+        return matched[keep], scores[keep]
+
+    @staticmethod
+    def best(matched: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Select the highest scores
+
+        Args:
+            matched: Row ids, as returned by scores()
+            scores: Their scores
+            k: Number of results
+
+        Returns:
+            Tuple of (scores, row ids), best first
+        """
+        if len(matched) > k:
+            top = np.argpartition(-scores, k)[:k]
+            matched, scores = matched[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return scores[order], matched[order]
+
+    def top_k(self, query: str, k: int, rows: Optional[List[int]] = None,
+              exclude: Optional[np.ndarray] = None,
+              count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the best BM25 matches for a query
+
+        Args:
+            query: Query text
+            k: Number of results
+            rows: Optional candidate row ids; other rows are ignored
+            exclude: Optional boolean mask over the leading rows; rows set
+                in it are never returned
+            count: Optional row count; rows from this one on are ignored
+
+        Returns:
+            Tuple of (scores, row ids), best first
+        """
+        return self.best(*self.scores(query, rows=rows, exclude=exclude, count=count), k)
+
+    def save(self, path: str, epoch: int = 0) -> None:
+        """
+        Save the index
+
+        Args:
+            path: Destination .npz file
+            epoch: Store epoch the row ids belong to
+        """
+        with self._lock:
+            terms = list(self.postings)
+            lengths = np.fromiter((len(self.postings[term]) for term in terms), dtype=np.int64, count=len(terms))
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            entries = np.empty(int(offsets[-1]), dtype=np.uint32)
+            for term, start, end in zip(terms, offsets[:-1], offsets[1:]):
+                entries[start:end] = np.frombuffer(self.postings[term], dtype=np.uint32)
+            doc_len = np.array(self.doc_len, dtype=np.uint32)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.frombuffer(json.dumps(terms).encode("utf-8"), dtype=np.uint8),
+                offsets=offsets,
+                entries=entries,
+                doc_len=doc_len,
+                epoch=np.int64(epoch),
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str, epoch: int = 0) -> bool:
+        """
+        Load a saved index
+
+        Args:
+            path: Saved .npz file
+            epoch: Store epoch the row ids must belong to
+
+        Returns:
+            True if the index was loaded, False if it belongs to another epoch
+        """
+        with np.load(path) as data:
+            if int(data["epoch"]) != epoch:
+                return False
+            terms = json.loads(data["terms"].tobytes().decode("utf-8"))
+            offsets = data["offsets"]
+            entries = data["entries"]
+            doc_len = data["doc_len"]
+
+        postings = {
+            term: array("I", entries[start:end].tobytes())
+            for term, start, end in zip(terms, offsets[:-1].tolist(), offsets[1:].tolist())
+        }
+        with self._lock:
+            self.postings = postings
+            self.doc_len = array("I", doc_len.astype(np.uint32).tobytes())
+            self.total_len = int(doc_len.sum())
+        return True
+
+    def nbytes(self) -> int:
+        """Approximate number of bytes used by postings and document lengths"""
+        return sum(len(posting) for posting in self.postings.values()) * 4 + len(self.doc_len) * 4
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self.postings = {}
+            self.doc_len = array("I")
+            self.total_len = 0
@@ -0,0 +1,86 @@
+"""
+LRU Cache - Small thread-safe least-recently-used cache with hit/miss counters
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry when full.
+
+    Lookups and insertions take a lock, so one cache can be shared by
+    concurrent searches. A max_size of 0 disables the cache: nothing is
+    stored and every lookup is a miss.
+    """
+
+    def __init__(self, max_size: int = 256):
+        """
+        Initialize an empty cache
+
+        Args:
+            max_size: Maximum number of entries
+        """
+        self.max_size = max(0, int(max_size))
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Look up an entry and mark it as recently used
+
+        Args:
+            key: Entry key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value, or default
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store an entry, evicting the least recently used one if full
+
+        Args:
+            key: Entry key
+            value: Value to cache
+        """
+        if not self.max_size:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries; the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters
+
+        Returns:
+            Dictionary with hits, misses, size and max_size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
@@ -0,0 +1,127 @@
+"""
+Memory Stats - Incrementally maintained aggregates over memory documents
+"""
+import time
+from typing import Dict, Any, Iterable, Optional
+
+from core.metadata_index import MetadataIndex
+
+class MemoryStats:
+    """
+    Running totals over the live documents of a memory index.
+
+    Counters are updated as documents are added and deleted, so reading
+    them costs time proportional to the number of distinct sources and
+    file types, not to the number of documents. Timestamps only move
+    forward: deleting a document records the deletion time as the last
+    update instead of recomputing the newest remaining timestamp.
+    """
+
+    UNKNOWN_FILE_TYPE = "unknown"
+
+    def __init__(self):
+        """Initialize empty counters"""
+        self.count = 0
+        self.total_bytes = 0
+        self.sources: Dict[str, int] = {}
+        self.source_updated: Dict[str, str] = {}
+        self.file_types: Dict[str, int] = {}
+        self.last_updated: Optional[str] = None
+
+    @staticmethod
+    def _text_bytes(meta: Dict[str, Any]) -> int:
+        """Get the UTF-8 size of a document's text"""
+        text = meta.get("text")
+        return len(text.encode("utf-8")) if isinstance(text, str) else 0
+
+    def _file_type(self, meta: Dict[str, Any]) -> str:
+        """Get the file type a document is counted under"""
+        return MetadataIndex.get_file_type(meta) or self.UNKNOWN_FILE_TYPE
+
+    def add(self, meta: Dict[str, Any]) -> None:
+        """
+        Count a document
+
+        Args:
+            meta: Document metadata
+        """
+        source = meta.get("source", "Unknown")
+        file_type = self._file_type(meta)
+
+        self.count += 1
+        self.total_bytes += self._text_bytes(meta)
+        self.sources[source] = self.sources.get(source, 0) + 1
+        self.file_types[file_type] = self.file_types.get(file_type, 0) + 1
+
+        timestamp = meta.get("timestamp")
+        if timestamp:
+            timestamp = str(timestamp)
+            if timestamp > self.source_updated.get(source, ""):
+                self.source_updated[source] = timestamp
+            if self.last_updated is None or timestamp > self.last_updated:
+                self.last_updated = timestamp
+
+    def remove(self, meta: Dict[str, Any]) -> None:
+        """
+        Stop counting a deleted document
+
+        Args:
+            meta: Metadata of a counted document
+        """
+        source = meta.get("source", "Unknown")
+        file_type = self._file_type(meta)
+
+        self.count -= 1
+        self.total_bytes -= self._text_bytes(meta)
+        self._decrement(self.sources, source)
+        self._decrement(self.file_types, file_type)
+        if source not in self.sources:
+            self.source_updated.pop(source, None)
+
+        self.last_updated = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def _decrement(counts: Dict[str, int], key: str) -> None:
+        """Decrement a counter, dropping it when it reaches zero"""
+        remaining = counts.get(key, 0) - 1
+        if remaining > 0:
+            counts[key] = remaining
+        else:
+            counts.pop(key, None)
+
+    def rebuild(self, documents: Iterable[Dict[str, Any]]) -> None:
+        """
+        Recount from scratch
+
+        Args:
+            documents: Metadata of the live documents
+        """
+        self.clear()
+        for meta in documents:
+            self.add(meta)
+
+    def clear(self) -> None:
+        """Reset all counters"""
+        self.count = 0
+        self.total_bytes = 0
+        self.sources = {}
+        self.source_updated = {}
+        self.file_types = {}
+        self.last_updated = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a copy of the counters
+
+        Returns:
+            Dictionary with documents_count, total_bytes, sources,
+            source_updated, file_types and last_updated
+        """
+        return {
+            "documents_count": self.count,
+            "total_bytes": self.total_bytes,
+            "sources": dict(self.sources),
+            "source_updated": dict(self.source_updated),
+            "file_types": dict(self.file_types),
+            "last_updated": self.last_updated,
+        }
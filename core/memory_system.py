@@ -2,179 +2,1508 @@
 Memory System - Vector embeddings and semantic search for context retrieval
 """
 import os
+import re
 import json
 import torch
 import numpy as np
-from typing import List, Dict, Any, Optional, Callable, Union
-from sentence_transformers import SentenceTransformer, util
+from typing import List, Dict, Any, Optional, Callable, Union, TextIO, NamedTuple
+import copy
 import time
+import uuid
+import itertools
+import threading
+import functools
+from contextlib import contextmanager
+
+from core.vector_store import VectorStoreFile, VectorStoreJournal, MemorySnapshotWriter, MemorySnapshotReader
+from core.embedding_index import EmbeddingMatrix
+from core.ann_index import IVFIndex
+from core.embedding_cache import EmbeddingCache, content_hash
+from core.metadata_index import MetadataIndex
+from core.lexical_index import BM25Index
+from core.memory_stats import MemoryStats
+from core.text_chunker import iter_chunks
+from core.embedding_workers import EmbeddingWorkerPool
+from core.embedding_backends import EMBEDDING_BACKENDS, load_embedding_backend
+from core.lru_cache import LRUCache
+from core.prompt_builder import TokenCounter
+
+class IngestBatch:
+    """Documents buffered by MemorySystem.batch() until the batch commits"""
+    
+    def __init__(self, full_save: bool = False):
+        """
+        Initialize an empty batch
+        
+        Args:
+            full_save: Rewrite the whole store at commit instead of journaling
+        """
+        self.full_save = full_save
+        self.docs: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.embedded: List[torch.Tensor] = []
+        self.embedded_metadata: List[Dict[str, Any]] = []
+        self.committed = 0
+        self.success = None
+        
+    def __len__(self) -> int:
+        return len(self.docs) + len(self.embedded)
+        
+    def add_embedded(self, embeddings: torch.Tensor, metadata: List[Dict[str, Any]]) -> None:
+        """
+        Buffer rows whose embeddings are already known
+        
+        Args:
+            embeddings: 2-D tensor with one embedding per row
+            metadata: Metadata for the rows
+        """
+        self.embedded.append(embeddings)
+        self.embedded_metadata.extend(metadata)
+
+class IndexSnapshot(NamedTuple):
+    """
+    One consistent version of the index, as seen by searches
+    
+    Snapshots are never modified after they are published. Rows are only
+    ever appended to the shared structures behind them, and every field
+    stops at `count`; deletions, purges and reloads replace objects instead
+    of changing them.
+    """
+    generation: int
+    epoch: int
+    index: EmbeddingMatrix
+    documents: List[Dict[str, Any]]
+    count: int
+    tombstones: Optional[torch.Tensor]
+    ann_index: IVFIndex
 
 class MemorySystem:
-    """Manages vector embeddings and semantic search for context retrieval"""
+    """
+    Manages vector embeddings and semantic search for context retrieval
+    
+    Writers (additions, deletions, purges, loads) hold _write_lock and
+    publish a new IndexSnapshot when they finish. Searches take the current
+    snapshot and run without the lock, so any number of them proceed in
+    parallel with ingestion and each sees one complete index version.
+    """
+    
+    # Rewrite the store once the journal holds this many rows, or this
+    # fraction of the store, whichever is larger. Scaling with the store
+    # size keeps the amortized write cost per added row constant.
+    COMPACT_MIN_ROWS = 1000
+    COMPACT_RATIO = 0.25
+    
+    # Purge deleted rows from the store once this fraction of rows is deleted
+    PURGE_RATIO = 0.2
+    
+    # Candidates taken from each retriever per requested result in hybrid mode
+    HYBRID_POOL_FACTOR = 4
+    
+    # Number of texts passed to the embedding model at once when a batch commits
+    EMBED_BATCH_SIZE = 512
+    
+    # Fewer texts than this are embedded in-process even with workers, as
+    # sending them to a worker costs more than it saves
+    WORKER_MIN_TEXTS = 64
+    
+    # Rows held in memory at a time by export and import; below
+    # COMPACT_MIN_ROWS so imported chunks are journaled, not full saves
+    TRANSFER_CHUNK_ROWS = 512
+    
+    # Collection held by the instance created by the application; named
+    # collections are stored under COLLECTIONS_DIR next to its store
+    DEFAULT_COLLECTION = "default"
+    COLLECTIONS_DIR = "collections"
+    PROFILES_COLLECTION = "profiles"
+    REFLECTIONS_COLLECTION = "reflections"
+    
+    # Collections searched for chat context
+    CHAT_COLLECTIONS = (DEFAULT_COLLECTION, PROFILES_COLLECTION, REFLECTIONS_COLLECTION)
+    
+    # Created once reflections and profiles stored in the default collection
+    # by older versions have been moved to their own collections
+    LEGACY_SPLIT_MARKER = ".legacy_split"
+    
+    # Embedding model load states reported by get_model_state()
+    MODEL_NOT_LOADED = "not_loaded"
+    MODEL_LOADING = "loading"
+    MODEL_LOADED = "loaded"
+    MODEL_FAILED = "failed"
     
     def __init__(self, 
                  model_name: str = "all-MiniLM-L6-v2", 
                  index_path: str = "data/vector_store/vector_store.json",
-                 logger: Optional[Callable] = None):
+                 logger: Optional[Callable] = None,
+                 search_mode: str = "exact",
+                 ann_nprobe: int = 8,
+                 use_embedding_cache: bool = True,
+                 storage_dtype: str = "float32",
+                 retrieval_mode: str = "vector",
+                 hybrid_alpha: float = 0.6,
+                 embedding_workers: int = 0,
+                 embedding_batch_size: int = EMBED_BATCH_SIZE,
+                 query_cache_size: int = 256,
+                 embedding_backend: str = "sentence_transformer",
+                 embedding_threads: int = 0,
+                 collection: str = DEFAULT_COLLECTION):
         """
         Initialize the memory system
         
         Args:
             model_name: Name of the sentence transformer model to use
-            index_path: Path to the vector store JSON file
+            index_path: Path to the vector store JSON file. The binary store
+                files are kept next to it and a legacy JSON store found here
+                is migrated on first load.
             logger: Optional logging function
+            search_mode: "exact" for brute-force search or "ivf" for the
+                approximate inverted-file index (exact search is used until
+                the index has enough rows to be trained)
+            ann_nprobe: Number of IVF lists scanned per query; higher values
+                trade latency for recall
+            use_embedding_cache: Reuse embeddings of previously seen text
+                from a persistent per-model cache next to the store
+            storage_dtype: How embeddings are kept in memory and on disk:
+                "float32", "float16" (half the memory) or "int8" (scalar
+                quantized, about a quarter). Compact types trade a little
+                recall, see diagnostics/quantization_recall.py.
+            retrieval_mode: Default search mode: "vector" (embeddings),
+                "lexical" (BM25 over document text) or "hybrid" (both)
+            hybrid_alpha: Weight of the vector score in hybrid mode; the
+                rest goes to the normalized BM25 score
+            embedding_workers: Number of worker processes for embedding
+                large batches, each with its own copy of the model; 0
+                embeds everything in this process
+            embedding_batch_size: Texts embedded per model call (and per
+                worker task)
+            query_cache_size: Number of query embeddings and of search
+                results kept in memory for repeated queries; 0 disables
+                both caches
+            embedding_backend: How texts are embedded: "sentence_transformer"
+                (default device), "cpu" (CPU-pinned model with int8
+                quantized linear layers, for machines without a GPU) or
+                "hashing" (deterministic, model-free; for tests)
+            embedding_threads: Torch CPU threads used for embedding in this
+                process, 0 keeps the torch default
+            collection: Name of the collection this instance holds; named
+                collections are opened through get_collection()
         """
         self.model_name = model_name
         self.index_path = index_path
         self.log = logger or print
         
+        if embedding_backend not in EMBEDDING_BACKENDS:
+            self.log(f"[Memory Warning] Unknown embedding backend '{embedding_backend}', "
+                     f"using sentence_transformer")
+            embedding_backend = "sentence_transformer"
+        self.embedding_backend = embedding_backend
+        self.embedding_threads = embedding_threads
+        
+        # Stores, caches and snapshots record which embeddings they hold;
+        # the loaded model confirms the expected id
+        self._embedding_id = EMBEDDING_BACKENDS[embedding_backend].expected_model_id(model_name)
+        self.store = VectorStoreFile(index_path, logger=self.log)
+        self._store_epoch = 0
+        self.journal = VectorStoreJournal(self._journal_path(), logger=self.log)
+        
         self.log(f"[Memory] Initializing memory system with model: {model_name}")
         self.model = None
-        self.index = []
-        self.documents = []
+        self.model_state = self.MODEL_NOT_LOADED
+        self._model_lock = threading.Lock()
+        
+        self.embed_batch_size = max(1, int(embedding_batch_size))
+        self._worker_pool = None
+        if embedding_workers > 0:
+            self._worker_pool = EmbeddingWorkerPool(
+                model_name, workers=embedding_workers, batch_size=self.embed_batch_size,
+                model_loader=functools.partial(load_embedding_backend, embedding_backend),
+                logger=self.log)
+        
+        if storage_dtype not in EmbeddingMatrix.STORAGE_TYPES:
+            self.log(f"[Memory Warning] Unknown storage type '{storage_dtype}', using float32")
+            storage_dtype = "float32"
+        self.storage_dtype = storage_dtype
+        self.index = EmbeddingMatrix(storage=storage_dtype)
+        self._documents = []
+        
+        # Deleted rows are only marked in this bitmap until they are purged,
+        # so row ids stay stable; rows past its end are not deleted
+        self._tombstones = None
+        self._deleted_count = 0
+        
+        # Per-source and per-file-type counters over the live documents,
+        # updated on every addition and deletion
+        self._stats = MemoryStats()
+        
+        self.search_mode = search_mode
+        self.ann_index = IVFIndex(nprobe=ann_nprobe, logger=self.log)
+        
+        # Content-hash embedding cache and (hash, source) -> row lookup for
+        # duplicate detection, built on first use
+        self.embedding_cache = None
+        if use_embedding_cache:
+            self.embedding_cache = EmbeddingCache(os.path.dirname(index_path), self._embedding_id, logger=self.log)
+        self._hash_index = None
+        
+        # Source, category, file type and timestamp indexes used by filtered
+        # search and category lookups, built on first use
+        self._metadata_index = None
+        
+        # BM25 index over document text for lexical and hybrid retrieval,
+        # built or loaded on first use
+        self.retrieval_mode = retrieval_mode
+        self.hybrid_alpha = hybrid_alpha
+        self._lexical_index = None
+        
+        # Journal and compaction state
+        self._write_lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._journal_row_count = 0
+        self._compacting = False
+        self._purging = False
+        self._closed = False
+        
+        # Open ingestion batch, per thread
+        self._batch_state = threading.local()
+        
+        # Named collections, opened on first use. A collection is a
+        # MemorySystem of its own that embeds through its parent.
+        self.collection = collection
+        self._parent = None
+        self._collections: Dict[str, "MemorySystem"] = {}
+        self._collections_lock = threading.Lock()
+        
+        # Recent query embeddings, and recent results keyed on the index
+        # generation so any change to the index makes them miss
+        self._query_embeddings = LRUCache(query_cache_size)
+        self._search_results = LRUCache(query_cache_size)
+        
+        # Token counts for get_context_for_query
+        self.token_counter = TokenCounter()
+        
+        # Index version read by searches, replaced under _write_lock
+        self._generation = 0
+        self._snapshot = None
+        self._publish_snapshot()
         
         # Ensure the directory exists
         os.makedirs(os.path.dirname(index_path), exist_ok=True)
         
-        # Try to load the model
-        self.load_model()
-        
-        # Try to load the index
+        # Try to load the index; the embedding model is loaded on first use
         self.load_index()
+        if self.collection == self.DEFAULT_COLLECTION:
+            self._split_legacy_collections()
     
     def load_model(self) -> bool:
         """
         Load the embedding model
         
+        Safe to call from several threads; the model is only loaded once.
+        
         Returns:
             True if model loaded successfully, False otherwise
         """
+        with self._model_lock:
+            if self.model is not None:
+                return True
+                
+            self.model_state = self.MODEL_LOADING
+            try:
+                self.log(f"[Memory] Loading embedding model: {self.model_name} ({self.embedding_backend})")
+                self.model = load_embedding_backend(self.embedding_backend, self.model_name,
+                                                    threads=self.embedding_threads, logger=self.log)
+                self._set_embedding_id(self.model.model_id)
+                self.model_state = self.MODEL_LOADED
+                self._query_embeddings.clear()
+                self.log("[Memory] Model loaded successfully")
+                return True
+            except Exception as e:
+                self.model_state = self.MODEL_FAILED
+                self.log(f"[Memory Error] Failed to load model: {e}")
+                return False
+    
+    @property
+    def embedding_id(self) -> str:
+        """Id of the embeddings this memory system holds, shared by its collections"""
+        if self._parent is not None:
+            return self._parent.embedding_id
+        return self._embedding_id
+    
+    def _set_embedding_id(self, embedding_id: str) -> None:
+        """
+        Switch to the embedding id reported by the loaded model
+        
+        Embeddings cached under the expected id are not reused for a model
+        that produces different ones, e.g. the float fallback of the CPU
+        backend.
+        
+        Args:
+            embedding_id: Model id of the loaded backend
+        """
+        if embedding_id == self._embedding_id:
+            return
+        self.log(f"[Memory Warning] Embedding model produces {embedding_id} embeddings, "
+                 f"expected {self._embedding_id}")
+        self._embedding_id = embedding_id
+        if self.embedding_cache is not None:
+            self.embedding_cache = EmbeddingCache(os.path.dirname(self.index_path), embedding_id, logger=self.log)
+    
+    def start_background_load(self) -> None:
+        """Warm up the embedding model in a background thread"""
+        if self.model is not None or self.model_state == self.MODEL_LOADING:
+            return
+            
+        threading.Thread(target=self.load_model, daemon=True).start()
+    
+    def get_model_state(self) -> str:
+        """
+        Get the embedding model load state
+        
+        Returns:
+            One of "not_loaded", "loading", "loaded" or "failed"
+        """
+        if self._parent is not None:
+            return self._parent.get_model_state()
+        return self.model_state
+    
+    @property
+    def documents(self) -> List[Dict[str, Any]]:
+        """Metadata of all documents in the index, excluding deleted ones"""
+        if not self._deleted_count:
+            return self._documents
+        return [self._documents[row] for row in self._live_row_ids()]
+    
+    def embed_texts(self, texts: List[str], use_cache: bool = True) -> List[torch.Tensor]:
+        """
+        Embed a list of texts
+        
+        Texts already in the embedding cache are not passed to the model.
+        
+        Args:
+            texts: List of text strings to embed
+            use_cache: Whether to consult and fill the embedding cache
+            
+        Returns:
+            List of tensor embeddings
+        """
+        if self._parent is not None:
+            # Collections share the model and cache of the default collection
+            return self._parent.embed_texts(texts, use_cache)
+            
+        if not use_cache or self.embedding_cache is None:
+            return self._encode_texts(texts)
+            
+        hashes = [content_hash(text) for text in texts]
+        found, missing = self.embedding_cache.lookup(hashes)
+        
+        results = [None] * len(texts)
+        for pos, vector in found.items():
+            results[pos] = torch.from_numpy(vector.copy())
+            
+        if missing:
+            computed = self._encode_texts([texts[pos] for pos in missing])
+            if len(computed) != len(missing):
+                return []
+            vectors = torch.stack([vec.detach().to("cpu", torch.float32) for vec in computed])
+            self.embedding_cache.put([hashes[pos] for pos in missing], vectors.numpy())
+            for pos, vector in zip(missing, vectors):
+                results[pos] = vector
+                
+        if found:
+            self.log(f"[Memory] Reused {len(found)} of {len(texts)} embeddings from cache")
+        return results
+    
+    def _embed_group_size(self) -> int:
+        """Number of texts to hand to embed_texts() at once during bulk ingestion"""
+        workers = self._worker_pool.workers if self._worker_pool is not None else 1
+        return self.embed_batch_size * workers
+    
+    def _encode_texts(self, texts: List[str]) -> List[torch.Tensor]:
+        """
+        Embed a list of texts with the model
+        
+        Large lists go to the embedding worker processes when they are
+        enabled, falling back to the in-process model if the workers fail.
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            List of tensor embeddings
+        """
+        if self._worker_pool is not None and len(texts) >= self.WORKER_MIN_TEXTS:
+            try:
+                embeddings = torch.from_numpy(self._worker_pool.encode(texts))
+                return [embeddings[i] for i in range(embeddings.shape[0])]
+            except Exception as e:
+                self.log(f"[Memory Warning] Embedding workers failed, embedding in-process: {e}")
+                
+        if not self.model:
+            if not self.load_model():
+                return []
+                
+        try:
+            embeddings = self.model.encode(texts, batch_size=self.embed_batch_size, convert_to_tensor=True)
+            
+            # Handle different return types from different model implementations
+            if isinstance(embeddings, list):
+                return embeddings
+            elif isinstance(embeddings, torch.Tensor):
+                # If it's a single tensor with shape [batch_size, embedding_dim]
+                # Convert to list of tensors with shape [embedding_dim]
+                return [embeddings[i] for i in range(embeddings.shape[0])]
+            else:
+                self.log(f"[Memory Warning] Unexpected embedding type: {type(embeddings)}")
+                return []
+                
+        except Exception as e:
+            self.log(f"[Memory Error] Failed to embed texts: {e}")
+            return []
+    
+    def add_to_index(self, docs: List[str], metadata: List[Dict[str, Any]],
+                     collection: Optional[str] = None) -> bool:
+        """
+        Add documents to the index
+        
+        Args:
+            docs: List of document text strings
+            metadata: List of metadata dictionaries
+            collection: Optional name of the collection to add to, defaults
+                to this one
+            
+        Returns:
+            True if documents were added successfully, False otherwise
+        """
+        if collection is not None and collection != self.collection:
+            target = self.get_collection(collection)
+            return target.add_to_index(docs, metadata) if target is not None else False
+            
+        if not docs or not metadata:
+            self.log("[Memory Warning] No documents to add")
+            return False
+            
+        if len(docs) != len(metadata):
+            self.log("[Memory Error] Number of documents and metadata entries must match")
+            return False
+            
+        try:
+            for meta in metadata:
+                if "timestamp" not in meta:
+                    meta["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                    
+            # Inside a batch, defer embedding and persistence to the commit
+            batch = getattr(self._batch_state, "batch", None)
+            if batch is not None:
+                batch.docs.extend(docs)
+                batch.metadata.extend(metadata)
+                return True
+                
+            docs, metadata = self._drop_duplicates(docs, metadata)
+            if not docs:
+                return True
+                
+            # Get embeddings
+            embeddings = self.embed_texts(docs)
+            
+            if len(embeddings) == 0:
+                return False
+                
+            # Add to index
+            success = self._append_rows(embeddings, metadata)
+            
+            self.log(f"[Memory] Added {len(docs)} documents to index")
+            
+            return success
+        except Exception as e:
+            self.log(f"[Memory Error] Failed to add documents to index: {e}")
+            return False
+    
+    def _drop_duplicates(self, docs: List[str], metadata: List[Dict[str, Any]]):
+        """
+        Remove documents whose text is already stored for the same source
+        
+        Records the content hash in each kept document's metadata.
+        
+        Args:
+            docs: List of document text strings
+            metadata: List of metadata dictionaries
+            
+        Returns:
+            Tuple of (docs, metadata) without duplicates
+        """
+        positions = self._unique_positions([content_hash(doc) for doc in docs], metadata)
+        
+        skipped = len(docs) - len(positions)
+        if skipped:
+            self.log(f"[Memory] Skipped {skipped} duplicate documents")
+        return [docs[pos] for pos in positions], [metadata[pos] for pos in positions]
+    
+    @staticmethod
+    def _document_hash(doc: Dict[str, Any]) -> Optional[str]:
+        """Get the content hash of a stored document, or None if it has no text"""
+        return doc.get("content_hash") or (content_hash(doc["text"]) if "text" in doc else None)
+    
+    def _unique_positions(self, digests: List[Optional[str]], metadata: List[Dict[str, Any]]) -> List[int]:
+        """
+        Find the documents whose content is not yet stored for the same source
+        
+        Records the content hash in each kept document's metadata. Documents
+        without a hash are always kept.
+        
+        Args:
+            digests: Content hash of each document, or None
+            metadata: Metadata of each document
+            
+        Returns:
+            Positions of the documents to keep
+        """
+        with self._write_lock:
+            stored = self._get_hash_index()
+            
+        positions = []
+        seen = set()
+        for pos, (digest, meta) in enumerate(zip(digests, metadata)):
+            if digest:
+                key = (digest, meta.get("path") or meta.get("source"))
+                if key in stored or key in seen:
+                    continue
+                seen.add(key)
+                meta["content_hash"] = digest
+            positions.append(pos)
+        return positions
+    
+    def _get_hash_index(self) -> Dict[tuple, int]:
+        """
+        Get the row of each stored (content hash, source) pair, building it on first use
+        
+        Must be called with the write lock held.
+        """
+        if self._hash_index is None:
+            self._hash_index = {}
+            for row, doc in enumerate(self._documents):
+                if self._is_deleted(row):
+                    continue
+                digest = self._document_hash(doc)
+                if digest:
+                    self._hash_index[(digest, doc.get("path") or doc.get("source"))] = row
+        return self._hash_index
+    
+    def _find_stored(self, text: str, source: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Find the stored document with the given text and source
+        
+        Args:
+            text: Document text
+            source: Path or source of the document
+            
+        Returns:
+            Metadata of the stored document, or None if there is none
+        """
+        with self._write_lock:
+            row = self._get_hash_index().get((content_hash(text), source))
+            return self._documents[row] if row is not None else None
+    
+    def _append_rows(self, embeddings: Union[torch.Tensor, List[torch.Tensor]],
+                     metadata: List[Dict[str, Any]], full_save: bool = False) -> bool:
+        """
+        Append embedded rows to the index and persist them
+        
+        Args:
+            embeddings: Embeddings for the rows
+            metadata: Metadata for the rows
+            full_save: Rewrite the whole store instead of journaling the rows
+            
+        Returns:
+            True if the rows were persisted, False otherwise
+        """
+        # Large appends would trigger a compaction anyway; write the store once
+        threshold = max(self.COMPACT_MIN_ROWS, int(len(self.index) * self.COMPACT_RATIO))
+        full_save = full_save or len(metadata) >= threshold
+        
+        with self._write_lock:
+            start_row = len(self.index)
+            self.index.append(embeddings)
+            self._documents.extend(metadata)
+            self._update_ann_index(start_row)
+            
+            if self._hash_index is not None:
+                for row, meta in enumerate(metadata, start_row):
+                    if "content_hash" in meta:
+                        self._hash_index[(meta["content_hash"], meta.get("path") or meta.get("source"))] = row
+            if self._metadata_index is not None:
+                for row, meta in enumerate(metadata, start_row):
+                    self._metadata_index.add(row, meta)
+            if self._lexical_index is not None:
+                for row, meta in enumerate(metadata, start_row):
+                    self._lexical_index.add(row, meta.get("text", ""))
+            for meta in metadata:
+                self._stats.add(meta)
+            self._publish_snapshot()
+            
+            if not full_save:
+                # Persist only the new rows; the full store is rewritten by compaction
+                self._journal_rows(start_row)
+                
+        if full_save:
+            return self.save_index()
+            
+        self._maybe_compact()
+        return True
+    
+    @contextmanager
+    def batch(self, full_save: bool = False):
+        """
+        Group many additions into one embedding pass and one write
+        
+        Documents added from this thread inside the block are buffered.
+        When the block exits they are embedded in groups of
+        embedding_batch_size texts per worker and persisted once. Nested
+        blocks join the outer batch. If the block raises, the buffered
+        documents are discarded.
+        
+        Example:
+            with memory_system.batch() as batch:
+                for path in files:
+                    memory_system.add_file_to_index(path)
+            if not batch.success:
+                ...
+        
+        Args:
+            full_save: Rewrite the whole store at commit instead of journaling
+            
+        Yields:
+            The IngestBatch being filled
+        """
+        outer = getattr(self._batch_state, "batch", None)
+        if outer is not None:
+            outer.full_save = outer.full_save or full_save
+            yield outer
+            return
+            
+        batch = IngestBatch(full_save=full_save)
+        self._batch_state.batch = batch
         try:
-            self.log(f"[Memory] Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            self.log("[Memory] Model loaded successfully")
+            yield batch
+        except Exception:
+            self.log(f"[Memory Warning] Discarded batch of {len(batch)} documents")
+            raise
+        finally:
+            self._batch_state.batch = None
+            
+        batch.success = self._commit_batch(batch)
+    
+    def _commit_batch(self, batch: IngestBatch) -> bool:
+        """
+        Embed and persist the documents of a batch
+        
+        Args:
+            batch: Batch to commit
+            
+        Returns:
+            True if the batch was committed successfully, False otherwise
+        """
+        if not len(batch):
             return True
+            
+        try:
+            docs, doc_metadata = self._drop_duplicates(batch.docs, batch.metadata)
+            
+            embeddings = []
+            group_size = self._embed_group_size()
+            for start in range(0, len(docs), group_size):
+                texts = docs[start:start + group_size]
+                chunk = self.embed_texts(texts)
+                if len(chunk) != len(texts):
+                    self.log("[Memory Error] Failed to embed batch")
+                    return False
+                embeddings.extend(chunk)
+                
+            rows = [torch.stack(embeddings)] if embeddings else []
+            rows.extend(batch.embedded)
+            metadata = doc_metadata + batch.embedded_metadata
+            if not metadata:
+                return True
+            
+            success = self._append_rows(torch.cat([r.to("cpu", torch.float32) for r in rows]),
+                                        metadata, full_save=batch.full_save)
+            batch.committed = len(metadata)
+            
+            self.log(f"[Memory] Committed batch of {len(metadata)} documents to index")
+            return success
         except Exception as e:
-            self.log(f"[Memory Error] Failed to load model: {e}")
+            self.log(f"[Memory Error] Failed to commit batch: {e}")
             return False
     
-    def embed_texts(self, texts: List[str]) -> List[torch.Tensor]:
+    def search(self, query: str, top_k: int = 5,
+               filters: Optional[Dict[str, Any]] = None,
+               mode: Optional[str] = None,
+               collections: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Search the index for documents similar to the query
+        
+        Args:
+            query: Search query string
+            top_k: Number of results to return
+            filters: Optional metadata filter, e.g. {"category": "learning"}
+                or {"file_type": [".md", ".txt"], "since": "2025-01-01"}.
+                Only matching documents are scored; see filter_rows().
+            mode: "vector", "lexical" or "hybrid"; defaults to retrieval_mode.
+                Scores are cosine similarities for "vector", BM25 scores for
+                "lexical" and a weighted blend in [0, 1] for "hybrid".
+            collections: Optional collection name or names to search instead
+                of this collection. Results of all of them are merged by
+                score and carry a "collection" key.
+            
+        Returns:
+            List of document metadata dictionaries
+        """
+        if collections is not None:
+            return self._search_collections(query, top_k, filters, mode, collections)
+        return self._search(query, top_k, filters, mode)
+    
+    def _search(self, query: str, top_k: int, filters: Optional[Dict[str, Any]],
+                mode: Optional[str], query_vec: Optional[torch.Tensor] = None) -> List[Dict[str, Any]]:
+        """
+        Search this collection
+        
+        Args:
+            query: Search query string
+            top_k: Number of results to return
+            filters: Optional metadata filter
+            mode: Retrieval mode, defaults to retrieval_mode
+            query_vec: Query embedding if already computed
+            
+        Returns:
+            List of document metadata dictionaries
+        """
+        mode = mode or self.retrieval_mode
+        try:
+            snapshot = self._snapshot
+            if not snapshot.count:
+                self.log("[Memory Warning] Index is empty")
+                return []
+                
+            cache_key = self._result_cache_key(query, top_k, filters, mode, snapshot.generation)
+            cached = self._search_results.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                return [dict(meta) for meta in cached]
+                
+            lexical_index = self._get_lexical_index() if mode in ("lexical", "hybrid") else None
+            
+            # Resolve the filter against the index version being searched
+            rows = None
+            if filters:
+                with self._write_lock:
+                    if self._snapshot is not snapshot:
+                        snapshot = self._snapshot
+                        cache_key = self._result_cache_key(query, top_k, filters, mode, snapshot.generation)
+                    rows = self.filter_rows(filters)
+                    
+            if rows is not None:
+                rows = [row for row in rows if row < snapshot.count]
+                if not rows:
+                    return []
+            if lexical_index is not None and lexical_index.epoch != snapshot.epoch:
+                # Purged while the lexical index was fetched; its row ids
+                # do not match this version, so skip lexical scores this time
+                lexical_index = BM25Index()
+                cache_key = None
+                
+            if mode == "lexical":
+                top_scores, top_indices = self._lexical_top_k(snapshot, lexical_index, query, top_k, rows)
+            else:
+                # Get query embedding
+                if query_vec is None:
+                    query_vec = self.embed_query(query)
+                    if query_vec is None:
+                        return []
+                    
+                if mode == "hybrid":
+                    top_scores, top_indices = self._hybrid_top_k(snapshot, lexical_index, query,
+                                                                 query_vec, top_k, rows)
+                else:
+                    top_scores, top_indices = self._vector_top_k(snapshot, query_vec, top_k, rows)
+            
+            # Return metadata for top matches
+            results = []
+            for i, score in zip(top_indices.tolist(), top_scores.tolist()):
+                meta = dict(snapshot.documents[i])
+                meta["score"] = float(score)
+                results.append(meta)
+                
+            if cache_key is not None:
+                self._search_results.put(cache_key, [dict(meta) for meta in results])
+            self.log(f"[Memory] Found {len(results)} matches for query: {query[:50]}...")
+            return results
+        except Exception as e:
+            self.log(f"[Memory Error] Search failed: {e}")
+            return []
+    
+    def embed_query(self, query: str) -> Optional[torch.Tensor]:
+        """
+        Embed a search query, reusing the embedding of a recent identical query
+        
+        Chat turns often search for the same text more than once, so query
+        embeddings are kept in a small in-memory LRU cache rather than the
+        persistent document embedding cache.
+        
+        Args:
+            query: Search query string
+            
+        Returns:
+            Query embedding, or None if embedding failed
+        """
+        if self._parent is not None:
+            return self._parent.embed_query(query)
+            
+        query_vec = self._query_embeddings.get(query)
+        if query_vec is None:
+            embedded = self.embed_texts([query], use_cache=False)
+            if not embedded:
+                return None
+            query_vec = embedded[0].detach()
+            self._query_embeddings.put(query, query_vec)
+        return query_vec
+    
+    def _result_cache_key(self, query: str, top_k: int, filters: Optional[Dict[str, Any]],
+                          mode: str, generation: int) -> Optional[tuple]:
+        """
+        Get the search result cache key of a query
+        
+        The key includes the index generation, so results cached before
+        any addition, deletion or reload are never returned afterwards.
+        
+        Returns:
+            Hashable key, or None if the filter cannot be keyed
+        """
+        try:
+            filters_key = json.dumps(filters, sort_keys=True) if filters else None
+        except (TypeError, ValueError):
+            return None
+        return (query, top_k, filters_key, mode, self.search_mode, self.hybrid_alpha, generation)
+    
+    def _search_collections(self, query: str, top_k: int,
+                            filters: Optional[Dict[str, Any]], mode: Optional[str],
+                            collections: Union[str, List[str]]) -> List[Dict[str, Any]]:
+        """
+        Search several collections and merge their results
+        
+        The query is embedded once. BM25 scores are relative to each
+        collection's own statistics, so lexical results merge less evenly
+        than vector or hybrid ones.
+        
+        Args:
+            query: Search query string
+            top_k: Number of results to return
+            filters: Optional metadata filter applied in every collection
+            mode: Retrieval mode, defaults to retrieval_mode
+            collections: Collection name or names
+            
+        Returns:
+            Merged list of document metadata dictionaries, best first
+        """
+        if isinstance(collections, str):
+            collections = [collections]
+            
+        targets = []
+        for name in dict.fromkeys(collections):
+            target = self.get_collection(name, create=False)
+            if target is not None and target._snapshot.count:
+                targets.append(target)
+        if not targets:
+            return []
+            
+        query_vec = None
+        if (mode or self.retrieval_mode) != "lexical":
+            query_vec = self.embed_query(query)
+            if query_vec is None:
+                return []
+            
+        results = []
+        for target in targets:
+            for result in target._search(query, top_k, filters, mode, query_vec=query_vec):
+                result["collection"] = target.collection
+                results.append(result)
+                
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:top_k]
+    
+    def _vector_top_k(self, snapshot: IndexSnapshot, query_vec: torch.Tensor, top_k: int,
+                      rows: Optional[List[int]] = None):
+        """
+        Find the rows closest to a query embedding
+        
+        Args:
+            snapshot: Index version to search
+            query_vec: Query embedding
+            top_k: Number of results
+            rows: Optional candidate row ids
+            
+        Returns:
+            Tuple of (scores, row ids), best first
+        """
+        index = snapshot.index
+        if rows is not None:
+            # Score only the candidate rows
+            return index.top_k(query_vec, top_k, rows=rows)
+        if self.search_mode == "ivf" and snapshot.ann_index.is_trained():
+            # Only score the rows in the closest inverted lists
+            query_emb = index.prepare_query(query_vec)
+            return snapshot.ann_index.search(index, query_emb, top_k, exclude=snapshot.tombstones)
+        # Score every row with one matrix-vector product and keep the top K
+        return index.top_k(query_vec, top_k, exclude=snapshot.tombstones)
+    
+    def _lexical_scores(self, snapshot: IndexSnapshot, lexical_index: BM25Index, query: str,
+                        rows: Optional[List[int]] = None):
+        """
+        Compute the BM25 scores of the live rows of a snapshot matching a query
+        
+        Args:
+            snapshot: Index version to search
+            lexical_index: Lexical index of the snapshot's epoch
+            query: Search query string
+            rows: Optional candidate row ids
+            
+        Returns:
+            Tuple of (row ids, scores), in increasing row order
+        """
+        exclude = snapshot.tombstones.numpy() if snapshot.tombstones is not None else None
+        return lexical_index.scores(query, rows=rows, exclude=exclude, count=snapshot.count)
+    
+    def _lexical_top_k(self, snapshot: IndexSnapshot, lexical_index: BM25Index, query: str,
+                       top_k: int, rows: Optional[List[int]] = None):
+        """
+        Find the best BM25 matches for a query
+        
+        Args:
+            snapshot: Index version to search
+            lexical_index: Lexical index of the snapshot's epoch
+            query: Search query string
+            top_k: Number of results
+            rows: Optional candidate row ids
+            
+        Returns:
+            Tuple of (scores, row ids), best first
+        """
+        return BM25Index.best(*self._lexical_scores(snapshot, lexical_index, query, rows), top_k)
+    
+    def _hybrid_top_k(self, snapshot: IndexSnapshot, lexical_index: BM25Index, query: str,
+                      query_vec: torch.Tensor, top_k: int, rows: Optional[List[int]] = None):
+        """
+        Fuse vector and BM25 retrieval
+        
+        The best candidates of both retrievers are pooled and rescored with
+        hybrid_alpha * cosine + (1 - hybrid_alpha) * BM25 / max(BM25), so an
+        exact identifier match can outrank a loosely similar embedding.
+        
+        Args:
+            snapshot: Index version to search
+            lexical_index: Lexical index of the snapshot's epoch
+            query: Search query string
+            query_vec: Query embedding
+            top_k: Number of results
+            rows: Optional candidate row ids
+            
+        Returns:
+            Tuple of (scores, row ids), best first
+        """
+        pool = max(top_k * self.HYBRID_POOL_FACTOR, top_k)
+        _, vector_ids = self._vector_top_k(snapshot, query_vec, pool, rows)
+        
+        # One BM25 pass gives both the lexical candidates and the score of
+        # every pooled row
+        matched, bm25 = self._lexical_scores(snapshot, lexical_index, query, rows)
+        lexical_scores, lexical_ids = BM25Index.best(matched, bm25, pool)
+        
+        candidates = sorted(set(vector_ids.tolist()) | set(lexical_ids.tolist()))
+        if not candidates:
+            return torch.empty(0), torch.empty(0, dtype=torch.long)
+            
+        # Exact cosine scores for every pooled candidate
+        vector_scores = snapshot.index[candidates] @ snapshot.index.prepare_query(query_vec)
+        
+        # BM25 scores normalized by the best match; matched rows are sorted,
+        # so the pooled rows are found by binary search
+        lexical = torch.zeros(len(candidates))
+        if len(lexical_ids):
+            wanted = np.asarray(candidates, dtype=np.int64)
+            pos = np.minimum(np.searchsorted(matched, wanted), len(matched) - 1)
+            found = np.where(matched[pos] == wanted, bm25[pos], 0.0)
+            best = max(float(lexical_scores[0]), 1e-9)
+            lexical = torch.from_numpy(found / best).float().clamp(max=1.0)
+            
+        fused = self.hybrid_alpha * vector_scores + (1.0 - self.hybrid_alpha) * lexical
+        top_scores, top = torch.topk(fused, k=min(top_k, len(candidates)))
+        return top_scores, torch.tensor(candidates, dtype=torch.long)[top]
+    
+    def _get_lexical_index(self) -> BM25Index:
+        """
+        Get the lexical index, loading or building it if needed
+        
+        The saved index is used when it belongs to the current store epoch;
+        rows it does not cover yet are tokenized here. Tokenizing happens
+        outside the write lock, so additions are not blocked meanwhile.
+        """
+        lexical_index = self._lexical_index
+        if lexical_index is not None:
+            return lexical_index
+            
+        with self._write_lock:
+            if self._lexical_index is not None:
+                return self._lexical_index
+            documents = self._documents
+            count = len(documents)
+            epoch = self._store_epoch
+            
+        lexical_index = BM25Index(logger=self.log)
+        lexical_path = self.store.sidecar_path("bm25.npz")
+        try:
+            if os.path.exists(lexical_path) and lexical_index.load(lexical_path, epoch=epoch) \
+                    and len(lexical_index) <= count:
+                self.log(f"[Memory] Loaded lexical index for {len(lexical_index)} items")
+            else:
+                lexical_index.clear()
+        except Exception as e:
+            self.log(f"[Memory Warning] Failed to load lexical index: {e}")
+            lexical_index.clear()
+            
+        start = len(lexical_index)
+        for row in range(start, count):
+            lexical_index.add(row, documents[row].get("text", ""))
+            
+        lexical_index.epoch = epoch
+        with self._write_lock:
+            if self._documents is not documents or self._store_epoch != epoch:
+                # The rows were replaced while building; build again on next use
+                return lexical_index
+            for row in range(count, len(self._documents)):
+                lexical_index.add(row, self._documents[row].get("text", ""))
+            self._lexical_index = lexical_index
+            
+        if count - start:
+            self.log(f"[Memory] Indexed {count - start} items for lexical search")
+        return lexical_index
+    
+    def _publish_snapshot(self) -> None:
+        """
+        Make the current rows visible to searches as a new index version
+        
+        Called with the write lock held, after every change to the rows.
+        """
+        self._generation += 1
+        count = len(self._documents)
+        self._snapshot = IndexSnapshot(
+            generation=self._generation,
+            epoch=self._store_epoch,
+            index=self.index.view(count),
+            documents=self._documents,
+            count=count,
+            tombstones=self._tombstones,
+            ann_index=self.ann_index,
+        )
+    
+    def _reset_row_indexes(self) -> None:
+        """Drop the indexes derived from the document list; they are rebuilt on use"""
+        self._hash_index = None
+        self._metadata_index = None
+        self._lexical_index = None
+    
+    def _get_metadata_index(self) -> MetadataIndex:
+        """Get the metadata index, building it from the documents if needed"""
+        with self._write_lock:
+            if self._metadata_index is None:
+                metadata_index = MetadataIndex()
+                metadata_index.rebuild(self._documents)
+                self._metadata_index = metadata_index
+            return self._metadata_index
+    
+    def filter_rows(self, filters: Dict[str, Any]) -> List[int]:
+        """
+        Get the rows of documents matching a metadata filter
+        
+        "source", "category" and "file_type" accept a value or a list of
+        values and are answered from the metadata index, as are "since" and
+        "until" (inclusive timestamp bounds, a date prefix such as
+        "2025-01-31" covers the whole day). Any other key is compared for
+        equality against the document metadata of the remaining rows.
+        
+        Args:
+            filters: Filter dictionary
+            
+        Returns:
+            Sorted list of matching row ids
+        """
+        with self._write_lock:
+            rows = self._get_metadata_index().rows_for(filters)
+            rows = self._live_row_ids() if rows is None else self._live_rows(rows)
+                
+            other = {key: value for key, value in filters.items()
+                     if key not in MetadataIndex.INDEXED_FIELDS and key not in ("since", "until")}
+            if not other:
+                return list(rows)
+                
+            matches = []
+            for row in rows:
+                doc = self._documents[row]
+                if all(self._matches_filter(doc.get(key), value) for key, value in other.items()):
+                    matches.append(row)
+            return matches
+    
+    @staticmethod
+    def _matches_filter(actual: Any, expected: Any) -> bool:
+        """Compare a metadata value against a filter value or list of values"""
+        if isinstance(expected, (list, tuple, set, frozenset)):
+            return actual in expected
+        return actual == expected
+    
+    def get_documents_by_source(self, source: str) -> List[Dict[str, Any]]:
+        """
+        Get all documents (chunks) stored for a source
+        
+        Args:
+            source: Source name, usually the file name
+            
+        Returns:
+            List of document metadata dictionaries in insertion order
+        """
+        with self._write_lock:
+            rows = self._live_rows(self._get_metadata_index().rows_by("source", source))
+            return [self._documents[row] for row in rows]
+    
+    def _is_deleted(self, row: int) -> bool:
+        """Check whether a row has been deleted"""
+        return self._tombstones is not None and row < len(self._tombstones) and bool(self._tombstones[row])
+    
+    def _live_rows(self, rows: List[int]) -> List[int]:
+        """Drop deleted rows from a list of row ids"""
+        if not self._deleted_count:
+            return list(rows)
+        return [row for row in rows if not self._is_deleted(row)]
+    
+    def _live_row_ids(self) -> List[int]:
+        """Get the ids of all rows that are not deleted"""
+        if not self._deleted_count:
+            return list(range(len(self._documents)))
+        deleted = torch.zeros(len(self._documents), dtype=torch.bool)
+        deleted[:len(self._tombstones)] = self._tombstones[:len(self._documents)]
+        return (~deleted).nonzero().flatten().tolist()
+    
+    def _mark_deleted(self, rows: List[int]) -> None:
+        """
+        Set rows in the tombstone bitmap and uncount them from the stats
+        
+        Args:
+            rows: Row ids of existing rows
+        """
+        # Published snapshots hold the current bitmap, so a new one is built
+        tombstones = torch.zeros(len(self.index), dtype=torch.bool)
+        if self._tombstones is not None:
+            tombstones[:len(self._tombstones)] = self._tombstones
+            
+        row_ids = torch.as_tensor(rows, dtype=torch.long)
+        for row in row_ids[~tombstones[row_ids]].unique().tolist():
+            self._stats.remove(self._documents[row])
+        tombstones[row_ids] = True
+        self._tombstones = tombstones
+        self._deleted_count = int(tombstones.sum())
+    
+    def delete_by_id(self, doc_ids: Union[str, List[str]]) -> int:
+        """
+        Delete documents by their "id" metadata field (e.g. reflection ids)
+        
+        Args:
+            doc_ids: Document id or list of ids
+            
+        Returns:
+            Number of documents deleted
+        """
+        return self._delete_rows(self.filter_rows({"id": doc_ids}))
+    
+    def delete_by_source(self, source: Union[str, List[str]]) -> int:
+        """
+        Delete all documents (chunks) of a source
+        
+        Args:
+            source: Source name or list of names, usually file names
+            
+        Returns:
+            Number of documents deleted
+        """
+        return self._delete_rows(self.filter_rows({"source": source}))
+    
+    def remove_document(self, source: str) -> bool:
+        """
+        Remove a document and all its chunks from memory
+        
+        Args:
+            source: Source name of the document
+            
+        Returns:
+            True if anything was removed, False otherwise
+        """
+        return self.delete_by_source(source) > 0
+    
+    def _delete_rows(self, rows: List[int]) -> int:
+        """
+        Mark rows as deleted and journal the deletion
+        
+        The rows stay in the index, skipped by search and lookups, until
+        enough of the index is deleted for a purge to be worthwhile.
+        
+        Args:
+            rows: Row ids to delete
+            
+        Returns:
+            Number of rows deleted
+        """
+        try:
+            with self._write_lock:
+                rows = sorted({row for row in rows if 0 <= row < len(self.index) and not self._is_deleted(row)})
+                if not rows:
+                    return 0
+                    
+                self.journal.append_delete(rows)
+                self._mark_deleted(rows)
+                self._publish_snapshot()
+                
+                # Let the same content be added again
+                if self._hash_index is not None:
+                    for row in rows:
+                        doc = self._documents[row]
+                        key = (doc.get("content_hash"), doc.get("path") or doc.get("source"))
+                        if self._hash_index.get(key) == row:
+                            del self._hash_index[key]
+                            
+            self.log(f"[Memory] Deleted {len(rows)} documents")
+            self._maybe_purge()
+            return len(rows)
+        except Exception as e:
+            self.log(f"[Memory Error] Failed to delete documents: {e}")
+            return 0
+    
+    def _maybe_purge(self) -> None:
+        """Start a background purge if enough rows are deleted"""
+        if not self._deleted_count or self._purging or self._closed:
+            return
+        if self._deleted_count < len(self.index) * self.PURGE_RATIO:
+            return
+            
+        self._purging = True
+        
+        def purge_thread():
+            try:
+                self._purge_deleted()
+            except Exception as e:
+                self.log(f"[Memory Error] Failed to purge deleted documents: {e}")
+            finally:
+                self._purging = False
+                
+        threading.Thread(target=purge_thread, daemon=True).start()
+    
+    def _purge_deleted(self) -> bool:
+        """
+        Rewrite the store without deleted rows
+        
+        Row ids change, so the whole purge runs under the write lock and
+        starts a new journal epoch: the new store records the epoch, and a
+        journal left from before the purge is never replayed against it.
+        
+        Returns:
+            True if deleted rows were purged, False otherwise
+        """
+        with self._compact_lock, self._write_lock:
+            purged = self._purge_locked()
+        if purged:
+            self._compact_embedding_cache(force=True)
+        return purged
+    
+    def _purge_locked(self) -> bool:
+        """Purge deleted rows; the caller holds _compact_lock and _write_lock"""
+        if not self._deleted_count:
+            return False
+            
+        keep = self._live_row_ids()
+        index = self.index.take(keep)
+        documents = [self._documents[row] for row in keep]
+        removed = len(self._documents) - len(documents)
+        
+        store = self._get_store()
+        epoch = self._store_epoch + 1
+        
+        # The IVF lists keep their centroids; only row ids are renumbered.
+        # The lexical index is rebuilt for the new row ids on next use.
+        ann_path = store.sidecar_path("ivf.npz")
+        for path in (ann_path, store.sidecar_path("bm25.npz")):
+            if os.path.exists(path):
+                os.remove(path)
+        ann_index = copy.copy(self.ann_index)
+        ann_index.select(keep)
+        
+        matrix, scales = index.storage_arrays()
+        store.save(matrix, documents,
+                   extra={"model_name": self.embedding_id, "normalized": True, "epoch": epoch},
+                   scales=scales)
+        if ann_index.is_trained():
+            ann_index.save(ann_path)
+        
+        self.ann_index = ann_index
+        self.index = index
+        self._documents = documents
+        self._tombstones = None
+        self._deleted_count = 0
+        self._reset_row_indexes()
+        
+        old_journal = self.journal
+        self._store_epoch = epoch
+        self.journal = VectorStoreJournal(self._journal_path(), logger=self.log)
+        self._journal_row_count = 0
+        old_journal.clear()
+        self._publish_snapshot()
+        
+        self.log(f"[Memory] Purged {removed} deleted documents from {store.meta_path}")
+        return True
+    
+    def _update_ann_index(self, start_row: int) -> None:
+        """
+        Add newly appended rows to the ANN index, training it when due
+        
+        Args:
+            start_row: Row id of the first new embedding
+        """
+        if self.search_mode != "ivf":
+            return
+            
+        # Searches may be using the current index: new rows are only
+        # appended to its lists, and training happens on a new index
+        try:
+            if self.ann_index.needs_training(len(self.index)):
+                ann_index = self._new_ann_index()
+                ann_index.train(self.index)
+                self.ann_index = ann_index
+            else:
+                self.ann_index.add(self.index[start_row:], start_row)
+        except Exception as e:
+            self.log(f"[Memory Warning] ANN index update failed, using exact search: {e}")
+            self.ann_index = self._new_ann_index()
+    
+    def _new_ann_index(self) -> IVFIndex:
+        """Create an empty ANN index with the current settings"""
+        return IVFIndex(nprobe=self.ann_index.nprobe, min_train_size=self.ann_index.min_train_size,
+                        retrain_growth=self.ann_index.retrain_growth, logger=self.log)
+    
+    def _rebuild_ann_index(self) -> None:
+        """Discard the ANN index and rebuild it for the current rows"""
+        self.ann_index = self._new_ann_index()
+        self._update_ann_index(0)
+    
+    def _journal_rows(self, start_row: int) -> None:
         """
-        Embed a list of texts
+        Append rows from start_row onwards to the journal
         
         Args:
-            texts: List of text strings to embed
-            
-        Returns:
-            List of tensor embeddings
+            start_row: Row id of the first row to journal
         """
-        if not self.model:
-            if not self.load_model():
-                return []
-                
-        try:
-            embeddings = self.model.encode(texts, convert_to_tensor=True)
+        embeddings = self.index[start_row:].numpy()
+        self.journal.append(start_row, embeddings, self._documents[start_row:])
+        self._journal_row_count += len(self.index) - start_row
+    
+    def _maybe_compact(self) -> None:
+        """Start a background compaction if the journal has grown large enough"""
+        threshold = max(self.COMPACT_MIN_ROWS, int(len(self.index) * self.COMPACT_RATIO))
+        if self._journal_row_count < threshold or self._compacting or self._closed:
+            return
             
-            # Handle different return types from different model implementations
-            if isinstance(embeddings, list):
-                return embeddings
-            elif isinstance(embeddings, torch.Tensor):
-                # If it's a single tensor with shape [batch_size, embedding_dim]
-                # Convert to list of tensors with shape [embedding_dim]
-                return [embeddings[i] for i in range(embeddings.shape[0])]
-            else:
-                self.log(f"[Memory Warning] Unexpected embedding type: {type(embeddings)}")
-                return []
+        self._compacting = True
+        
+        def compact_thread():
+            try:
+                self._compact_index()
+            finally:
+                self._compacting = False
                 
-        except Exception as e:
-            self.log(f"[Memory Error] Failed to embed texts: {e}")
-            return []
+        threading.Thread(target=compact_thread, daemon=True).start()
     
-    def add_to_index(self, docs: List[str], metadata: List[Dict[str, Any]]) -> bool:
+    def _compact_index(self) -> bool:
         """
-        Add documents to the index
+        Write the full store and drop the journal records it now covers
+        
+        Rows are only ever appended, so a view of the first `count` rows
+        stays valid while new rows are added during the write. Rows are
+        written in the configured storage type.
         
-        Args:
-            docs: List of document text strings
-            metadata: List of metadata dictionaries
-            
         Returns:
-            True if documents were added successfully, False otherwise
+            True if the store was written, False otherwise
         """
-        if not docs or not metadata:
-            self.log("[Memory Warning] No documents to add")
-            return False
+        with self._compact_lock:
+            with self._write_lock:
+                count = len(self.index)
+                if not count:
+                    return False
+                matrix, scales = self.index.storage_arrays(count)
+                documents = self._documents[:count]
+                store = self._get_store()
+                
+                # Save the ANN index alongside the store
+                ann_path = store.sidecar_path("ivf.npz")
+                if self.ann_index.is_trained():
+                    self.ann_index.save(ann_path)
+                elif os.path.exists(ann_path):
+                    os.remove(ann_path)
+                lexical_index = self._lexical_index
             
-        if len(docs) != len(metadata):
-            self.log("[Memory Error] Number of documents and metadata entries must match")
-            return False
+            store.save(matrix, documents,
+                       extra={"model_name": self.embedding_id, "normalized": True,
+                              "epoch": self._store_epoch},
+                       scales=scales)
             
-        try:
-            # Get embeddings
-            embeddings = self.embed_texts(docs)
+            # Rows past `count` are in the journal, so they are replayed
+            # before the saved lexical index is used again
+            if lexical_index is not None:
+                lexical_index.save(store.sidecar_path("bm25.npz"), epoch=self._store_epoch)
             
-            if len(embeddings) == 0:
-                return False
+            with self._write_lock:
+                self.journal.truncate_before(count)
+                self._journal_row_count = len(self.index) - count
                 
-            # Add to index
-            for emb, meta in zip(embeddings, metadata):
-                if "timestamp" not in meta:
-                    meta["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
-                self.index.append(emb)
-                self.documents.append(meta)
-            
-            self.log(f"[Memory] Added {len(docs)} documents to index")
-            
-            # Save updated index
-            return self.save_index()
-        except Exception as e:
-            self.log(f"[Memory Error] Failed to add documents to index: {e}")
-            return False
+            self.log(f"[Memory] Index saved to {store.meta_path}")
+        self._compact_embedding_cache()
+        return True
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def _compact_embedding_cache(self, force: bool = False) -> None:
         """
-        Search the index for documents similar to the query
+        Drop cached embeddings of texts that are no longer stored
+        
+        Collections embed through the cache of the default collection, so
+        the texts of every open collection are kept. Unless forced, the
+        cache is only rewritten once COMPACT_RATIO of it is unused.
         
         Args:
-            query: Search query string
-            top_k: Number of results to return
-            
-        Returns:
-            List of document metadata dictionaries
+            force: Rewrite the cache even if few entries are unused
         """
-        if not self.index:
-            self.log("[Memory Warning] Index is empty")
-            return []
+        if self._parent is not None:
+            self._parent._compact_embedding_cache(force)
+            return
+        cache = self.embedding_cache
+        if cache is None or not len(cache):
+            return
             
+        with self._collections_lock:
+            holders = [self, *self._collections.values()]
+        hashes = set()
+        for holder in holders:
+            with holder._write_lock:
+                hashes.update(self._document_hash(doc) for doc in holder.documents)
+        hashes.discard(None)
+        
+        if not force and len(cache) <= len(hashes) * (1 + self.COMPACT_RATIO):
+            return
         try:
-            # Get query embedding
-            query_vec = self.embed_texts([query])
-            
-            if not query_vec:
-                return []
-                
-            # Calculate similarity scores
-            scores = util.cos_sim(query_vec[0], torch.stack(self.index))[0]
-            
-            # Get top K results
-            top_scores, top_indices = torch.topk(scores, k=min(top_k, len(scores)))
-            
-            # Return metadata for top matches
-            results = []
-            for i, score in zip(top_indices, top_scores):
-                meta = self.documents[i]
-                meta["score"] = float(score)  # Convert tensor to float for serialization
-                results.append(meta)
-                
-            self.log(f"[Memory] Found {len(results)} matches for query: {query[:50]}...")
-            return results
+            cache.compact(hashes)
         except Exception as e:
-            self.log(f"[Memory Error] Search failed: {e}")
-            return []
+            self.log(f"[Memory Warning] Failed to compact the embedding cache: {e}")
     
     def save_index(self) -> bool:
         """
-        Save the index to disk
+        Save the full index to disk in the binary store format
         
         Returns:
             True if index saved successfully, False otherwise
@@ -184,47 +1513,295 @@ class MemorySystem:
             return False
             
         try:
-            # Convert tensors to lists for JSON serialization
-            data = [
-                {
-                    "embedding": emb.cpu().tolist(), 
-                    "meta": meta
-                } 
-                for emb, meta in zip(self.index, self.documents)
-            ]
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-            
-            # Save to file
-            with open(self.index_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-                
-            self.log(f"[Memory] Index saved to {self.index_path}")
-            return True
+            return self._compact_index()
         except Exception as e:
             self.log(f"[Memory Error] Failed to save index: {e}")
             return False
+
+    def relocate(self, index_path: str, copy_index: bool = True) -> bool:
+        """
+        Move the memory system to another store path
+
+        With copy_index, the live documents of this collection and of every
+        named collection are written to the new location; deleted rows are
+        purged first so they are not carried over. Otherwise the store
+        found at the new path is loaded. The old files are left in place.
+
+        Args:
+            index_path: New path of the vector store JSON file
+            copy_index: Copy the current index and collections to the new path
+
+        Returns:
+            True if the index was copied or loaded, False otherwise
+        """
+        if index_path == self.index_path:
+            return True
+
+        # Collections live next to the store, so they move with it
+        names = [name for name in self.list_collections() if name != self.collection] if copy_index else []
+        collections = [self.get_collection(name) for name in names]
+        with self._collections_lock:
+            opened = list(self._collections.values())
+            self._collections = {}
+        for collection in opened:
+            if collection not in collections:
+                collection.close()
+
+        try:
+            if not copy_index:
+                self.index_path = index_path
+                loaded = self.load_index()
+                if self.collection == self.DEFAULT_COLLECTION:
+                    self._split_legacy_collections()
+                return loaded
+
+            copied = self._copy_to(index_path)
+            for name, collection in zip(names, collections):
+                copied = collection._copy_to(self._collection_path(name)) and copied
+                with self._collections_lock:
+                    self._collections[name] = collection
+            if copied:
+                self.log(f"[Memory] Copied index and {len(collections)} collections to {index_path}")
+            return copied
+        except Exception as e:
+            self.log(f"[Memory Error] Failed to move index to {index_path}: {e}")
+            return False
+
+    def _copy_to(self, index_path: str) -> bool:
+        """
+        Write the live rows to a store at another path and switch to it
+
+        Args:
+            index_path: New path of the vector store JSON file
+
+        Returns:
+            True if the store was written, False otherwise
+        """
+        with self._compact_lock, self._write_lock:
+            # Tombstones are not part of the store file, so drop their rows
+            # while they are still known
+            self._purge_locked()
+            self.index_path = index_path
+            os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+            self._get_store()
+            # A journal left at the new path belongs to another store
+            self.journal.clear()
+            empty = not len(self.index)
+
+        if empty:
+            # Nothing to copy; use whatever is stored there
+            self.load_index()
+            return True
+        return self._compact_index()
+
+    def close(self) -> None:
+        """
+        Stop background work before the application exits
+        
+        Shuts down the embedding worker processes and waits for a running
+        compaction or purge to finish; no new ones are started afterwards.
+        Every change is already in the store or its journal, so nothing
+        else needs saving. Open collections are closed too.
+        """
+        self._closed = True
+        with self._collections_lock:
+            collections = list(self._collections.values())
+        for collection in collections:
+            collection.close()
+            
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+            
+        # Compactions and purges hold this lock while they write
+        with self._compact_lock:
+            pass
+        self.log("[Memory] Memory system closed")
+    
+    def _get_store(self) -> VectorStoreFile:
+        """Get the binary store handler for the current index path"""
+        if self.store.index_path != self.index_path:
+            self.store = VectorStoreFile(self.index_path, logger=self.log)
+            self._store_epoch = 0
+            self.journal = VectorStoreJournal(self._journal_path(), logger=self.log)
+            self._journal_row_count = 0
+            if self.embedding_cache is not None:
+                self.embedding_cache = EmbeddingCache(os.path.dirname(self.index_path), self.embedding_id,
+                                                      logger=self.log)
+        return self.store
+    
+    def _journal_path(self) -> str:
+        """Get the journal path for the current store epoch"""
+        if not self._store_epoch:
+            return self.store.sidecar_path("journal")
+        return self.store.sidecar_path(f"{self._store_epoch}.journal")
     
     def load_index(self) -> bool:
         """
         Load the index from disk
         
+        The binary store is preferred. If only a legacy JSON store exists it
+        is loaded once, rewritten in the binary format and renamed so later
+        starts use the memory-mapped store. Rows added and deleted after the
+        last full save are then replayed from the journal.
+        
         Returns:
             True if index loaded successfully, False otherwise
         """
-        if not os.path.exists(self.index_path):
+        store = self._get_store()
+        with self._write_lock:
+            self._tombstones = None
+            self._deleted_count = 0
+            self._store_epoch = 0
+        
+        if store.exists():
+            loaded = self._load_binary_index()
+        elif os.path.exists(self.index_path):
+            loaded = self._load_legacy_index()
+            if loaded:
+                self._migrate_legacy_index()
+        else:
             self.log(f"[Memory] No index file found at {self.index_path}")
+            with self._write_lock:
+                self.index = EmbeddingMatrix(storage=self.storage_dtype)
+                self._documents = []
+                self._reset_row_indexes()
+                self.ann_index = self._new_ann_index()
+            loaded = False
+            
+        # The store records which journal epoch belongs to it
+        self.journal = VectorStoreJournal(self._journal_path(), logger=self.log)
+        if self.journal.exists():
+            loaded = self._replay_journal() > 0 or loaded
+            
+        with self._write_lock:
+            self._stats.rebuild(self._documents[row] for row in self._live_row_ids())
+            self._publish_snapshot()
+            
+        self._maybe_purge()
+        return loaded
+    
+    def _replay_journal(self) -> int:
+        """
+        Apply journaled additions and deletions not yet in the loaded store
+        
+        Returns:
+            Number of rows added or deleted
+        """
+        start_row = len(self.index)
+        deleted = 0
+        try:
+            for kind, record_row, embeddings, documents in self.journal.read():
+                count = len(self.index)
+                if kind == VectorStoreJournal.DELETE:
+                    rows = [row for row in documents if 0 <= row < count]
+                    if rows:
+                        self._mark_deleted(rows)
+                    deleted = self._deleted_count
+                    continue
+                    
+                if record_row + len(documents) <= count:
+                    # Already persisted by a compaction
+                    continue
+                if record_row > count:
+                    self.log(f"[Memory Warning] Journal gap at row {count}; ignoring later records")
+                    break
+                    
+                skip = count - record_row
+                self.index.append(torch.from_numpy(embeddings[skip:].copy()))
+                self._documents.extend(documents[skip:])
+        except Exception as e:
+            self.log(f"[Memory Error] Failed to replay journal: {e}")
+            
+        replayed = len(self.index) - start_row
+        self._journal_row_count = replayed
+        if replayed:
+            self._update_ann_index(start_row)
+            self.log(f"[Memory] Recovered {replayed} items from journal")
+        if deleted:
+            self.log(f"[Memory] Recovered {deleted} deletions from journal")
+        return replayed + deleted
+    
+    def _load_binary_index(self) -> bool:
+        """
+        Load the memory-mapped binary store
+        
+        Returns:
+            True if index loaded successfully, False otherwise
+        """
+        try:
+            matrix, documents, meta = self.store.load()
+            
+            # The index wraps the mapped file; nothing is copied unless the
+            # store was written with a different storage type
+            self.index = EmbeddingMatrix.from_array(matrix, normalized=meta.get("normalized", False),
+                                                    scales=self.store.load_scales(meta),
+                                                    storage=self.storage_dtype)
+            if meta.get("dtype", "float32") != self.storage_dtype:
+                self.log(f"[Memory] Converted index from {meta.get('dtype', 'float32')} to {self.storage_dtype}; "
+                         f"it is rewritten in the new format on the next save")
+            self._documents = documents
+            self._reset_row_indexes()
+            self._store_epoch = int(meta.get("epoch", 0))
+            self._load_ann_index()
+            
+            stored_model = meta.get("model_name")
+            if stored_model and stored_model != self.embedding_id:
+                self.log(f"[Memory Warning] Index was built with {stored_model}, current model is {self.embedding_id}")
+                
+            self.log(f"[Memory] Loaded {len(self.index)} items from {self.store.meta_path}")
+            return True
+        except Exception as e:
+            self.log(f"[Memory Error] Failed to load index: {e}")
             return False
+    
+    def _load_ann_index(self) -> None:
+        """Load the saved ANN index, or build it if it is missing or stale"""
+        self.ann_index = self._new_ann_index()
+        if self.search_mode != "ivf":
+            return
+            
+        ann_path = self.store.sidecar_path("ivf.npz")
+        try:
+            ann_index = self._new_ann_index()
+            if os.path.exists(ann_path) and ann_index.load(ann_path, self.index):
+                self.ann_index = ann_index
+                self.log(f"[Memory] Loaded IVF index with {len(ann_index.lists)} lists")
+                return
+        except Exception as e:
+            self.log(f"[Memory Warning] Failed to load ANN index: {e}")
             
+        self._rebuild_ann_index()
+    
+    def _migrate_legacy_index(self) -> None:
+        """Rewrite a loaded legacy JSON store in the binary format"""
+        if not self.index:
+            return
+            
+        if not self.save_index():
+            self.log("[Memory Warning] Legacy index could not be migrated; keeping JSON store")
+            return
+            
+        try:
+            migrated_path = self.index_path + ".migrated"
+            os.replace(self.index_path, migrated_path)
+            self.log(f"[Memory] Migrated legacy index to binary store (original kept at {migrated_path})")
+        except Exception as e:
+            self.log(f"[Memory Warning] Failed to rename legacy index: {e}")
+    
+    def _load_legacy_index(self) -> bool:
+        """
+        Load a legacy JSON store
+        
+        Returns:
+            True if index loaded successfully, False otherwise
+        """
         try:
             # Use utf-8-sig to handle UTF-8 BOM (Byte Order Mark)
             with open(self.index_path, "r", encoding="utf-8-sig") as f:
                 data = json.load(f)
                 
-            # Clear current index
-            self.index = []
-            self.documents = []
+            embeddings = []
+            documents = []
             
             # Check if data is a list or dict
             if isinstance(data, list):
@@ -234,8 +1811,8 @@ class MemorySystem:
                         self.log(f"[Memory Warning] Invalid item format in index: {type(item)}")
                         continue
                     if "embedding" in item and "meta" in item:
-                        self.index.append(torch.tensor(item["embedding"]))
-                        self.documents.append(item["meta"])
+                        embeddings.append(item["embedding"])
+                        documents.append(item["meta"])
                     else:
                         self.log(f"[Memory Warning] Missing embedding or meta in item")
             elif isinstance(data, dict):
@@ -243,11 +1820,7 @@ class MemorySystem:
                 if "embeddings" in data and "documents" in data:
                     embeddings = data["embeddings"]
                     documents = data["documents"]
-                    if len(embeddings) == len(documents):
-                        for emb, doc in zip(embeddings, documents):
-                            self.index.append(torch.tensor(emb))
-                            self.documents.append(doc)
-                    else:
+                    if len(embeddings) != len(documents):
                         self.log("[Memory Error] Mismatched lengths of embeddings and documents")
                         return False
                 else:
@@ -257,6 +1830,14 @@ class MemorySystem:
                 self.log(f"[Memory Error] Invalid index data type: {type(data)}")
                 return False
                 
+            # Build the matrix in one step instead of one tensor per row
+            self.index = EmbeddingMatrix(storage=self.storage_dtype)
+            if embeddings:
+                self.index.append(torch.tensor(embeddings, dtype=torch.float32))
+            self._documents = documents
+            self._reset_row_indexes()
+            self._rebuild_ann_index()
+                
             self.log(f"[Memory] Loaded {len(self.index)} items from index")
             return True
         except Exception as e:
@@ -271,12 +1852,31 @@ class MemorySystem:
             True if index cleared successfully, False otherwise
         """
         try:
-            self.index = []
-            self.documents = []
-            
-            # Remove the index file if it exists
-            if os.path.exists(self.index_path):
-                os.remove(self.index_path)
+            with self._compact_lock, self._write_lock:
+                self.index = EmbeddingMatrix(storage=self.storage_dtype)
+                self._documents = []
+                self._reset_row_indexes()
+                self._tombstones = None
+                self._deleted_count = 0
+                self._stats.clear()
+                self.ann_index = self._new_ann_index()
+                self._publish_snapshot()
+                
+                # Remove the index files if they exist
+                if os.path.exists(self.index_path):
+                    os.remove(self.index_path)
+                store = self._get_store()
+                store.remove()
+                for suffix in ("ivf.npz", "bm25.npz"):
+                    if os.path.exists(store.sidecar_path(suffix)):
+                        os.remove(store.sidecar_path(suffix))
+                self.journal.clear()
+                self._store_epoch = 0
+                self.journal = VectorStoreJournal(self._journal_path(), logger=self.log)
+                self.journal.clear()
+                self._journal_row_count = 0
+                if self.embedding_cache is not None:
+                    self.embedding_cache.clear()
                 
             self.log("[Memory] Index cleared")
             return True
@@ -293,7 +1893,8 @@ class MemorySystem:
         
         Args:
             file_path: Path to the file
-            content: Optional file content if already read
+            content: Optional file content if already read; otherwise the
+                file is read incrementally while it is chunked
             chunk_size: Size of chunks to split content into
             chunk_overlap: Overlap between chunks
             
@@ -301,37 +1902,52 @@ class MemorySystem:
             True if file added successfully, False otherwise
         """
         try:
-            # Get file content if not provided
             if content is None:
                 with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
-                    
-            # Check if we should chunk based on content length
-            if len(content) > chunk_size:
-                self.log(f"[Memory] Chunking file {os.path.basename(file_path)} into smaller sections")
-                return self._add_chunked_file(file_path, content, chunk_size, chunk_overlap)
-            else:
-                # Add as a single document
-                meta = {
-                    "source": os.path.basename(file_path),
-                    "path": file_path,
-                    "text": content,
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                }
-                
-                return self.add_to_index([content], [meta])
+                    return self._add_chunked_file(file_path, f, chunk_size, chunk_overlap)
+            return self._add_chunked_file(file_path, content, chunk_size, chunk_overlap)
         except Exception as e:
             self.log(f"[Memory Error] Failed to add file {file_path}: {e}")
             return False
             
-    def _add_chunked_file(self, file_path: str, content: str, 
+    def update_file_in_index(self, file_path: str,
+                             content: Optional[str] = None,
+                             chunk_size: int = 1000,
+                             chunk_overlap: int = 200) -> bool:
+        """
+        Replace the indexed content of a file
+        
+        The file's current chunks are deleted and the new content is added;
+        unchanged chunks are embedded from the embedding cache.
+        
+        Args:
+            file_path: Path to the file
+            content: Optional file content if already read
+            chunk_size: Size of chunks to split content into
+            chunk_overlap: Overlap between chunks
+            
+        Returns:
+            True if file updated successfully, False otherwise
+        """
+        with self._write_lock:
+            rows = [row for row in self.filter_rows({"source": os.path.basename(file_path)})
+                    if self._documents[row].get("path") == file_path]
+        self._delete_rows(rows)
+        return self.add_file_to_index(file_path, content, chunk_size, chunk_overlap)
+            
+    def _add_chunked_file(self, file_path: str, content: Union[str, TextIO], 
                           chunk_size: int, chunk_overlap: int) -> bool:
         """
         Add a file to the index in chunks using sentence-aware chunking
         
+        Chunks are produced by a streaming chunker and added
+        one embedding group at a time, so a large file is never held as a
+        complete list of chunks. Content that fits in one chunk is added as
+        a single document.
+        
         Args:
             file_path: Path to the file
-            content: File content
+            content: File content, or a text file object to read it from
             chunk_size: Size of chunks to split content into
             chunk_overlap: Overlap between chunks
             
@@ -341,29 +1957,48 @@ class MemorySystem:
         try:
             # Get the file name for metadata
             file_name = os.path.basename(file_path)
+            chunks = iter_chunks(content, max_chunk_size=chunk_size, overlap=chunk_overlap)
             
-            # Use the sentence-aware chunking method
-            chunks = self._chunk_text(content, max_chunk_size=chunk_size, overlap=chunk_overlap)
-            
-            self.log(f"[Memory] Split file '{file_name}' into {len(chunks)} chunks")
-            
-            # Create metadata for each chunk
-            metadata = []
-            for i, chunk in enumerate(chunks):
+            first = next(chunks)
+            second = next(chunks, None)
+            if second is None:
+                # Add as a single document
                 meta = {
                     "source": file_name,
                     "path": file_path,
-                    "text": chunk,
-                    "chunk": i + 1,
-                    "total_chunks": len(chunks),
+                    "text": first.text,
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                }
+                return self.add_to_index([first.text], [meta])
+                
+            self.log(f"[Memory] Chunking file {file_name} into smaller sections")
+            
+            success = True
+            count = 0
+            docs, metadata = [], []
+            for chunk in itertools.chain([first, second], chunks):
+                count += 1
+                docs.append(chunk.text)
+                metadata.append({
+                    "source": file_name,
+                    "path": file_path,
+                    "text": chunk.text,
+                    "chunk": count,
+                    "start": chunk.start,
+                    "end": chunk.end,
                     "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                     # Add file extension as a hint about content type
                     "file_type": os.path.splitext(file_path)[1].lower(),
-                }
-                metadata.append(meta)
+                })
+                if len(docs) >= self._embed_group_size():
+                    success = self.add_to_index(docs, metadata) and success
+                    docs, metadata = [], []
+                    
+            if docs:
+                success = self.add_to_index(docs, metadata) and success
                 
-            # Add chunks to index
-            return self.add_to_index(chunks, metadata)
+            self.log(f"[Memory] Split file '{file_name}' into {count} chunks")
+            return success
             
         except Exception as e:
             self.log(f"[Memory Error] Failed to chunk file {file_path}: {e}")
@@ -373,90 +2008,193 @@ class MemorySystem:
         """
         Get statistics about the memory system
         
+        The document aggregates (sources, file types, bytes, last update)
+        are maintained as documents are added and deleted, so this does
+        not walk the documents and is cheap enough for periodic UI refresh.
+        
         Returns:
             Dictionary of statistics
         """
-        stats = {
-            "model": self.model_name,
-            "index_path": self.index_path,
-            "documents_count": len(self.documents),
-            "sources": {},
-            "last_updated": None
-        }
-        
-        # Get unique sources and count
-        for doc in self.documents:
-            source = doc.get("source", "Unknown")
-            if source in stats["sources"]:
-                stats["sources"][source] += 1
-            else:
-                stats["sources"][source] = 1
-                
-        # Get last updated timestamp
-        if self.documents:
-            timestamps = [doc.get("timestamp") for doc in self.documents if "timestamp" in doc]
-            if timestamps:
-                stats["last_updated"] = max(timestamps)
-                
+        with self._write_lock:
+            counters = self._stats.snapshot()
+            stats = {
+                "model": self.model_name,
+                "embedding_backend": self.embedding_backend,
+                "index_path": self.index_path,
+                "deleted_count": self._deleted_count,
+                "search_mode": self.search_mode,
+                "storage_dtype": self.storage_dtype,
+                "index_bytes": self.index.nbytes(),
+                "retrieval_mode": self.retrieval_mode,
+                "lexical_index_bytes": self._lexical_index.nbytes() if self._lexical_index is not None else 0,
+                "model_state": self.get_model_state(),
+                "index_generation": self._generation,
+                "query_embedding_cache": self._query_embeddings.stats(),
+                "search_result_cache": self._search_results.stats(),
+            }
+        stats.update(counters)
         return stats
     
     def _chunk_text(self, text: str, max_chunk_size: int = 1000, overlap: int = 100) -> List[str]:
         """Split text into overlapping chunks of maximum size"""
-        chunks = []
-        
-        # If text is shorter than max chunk size, return as is
-        if len(text) <= max_chunk_size:
-            return [text]
+        return [chunk.text for chunk in iter_chunks(text, max_chunk_size=max_chunk_size, overlap=overlap)]
+    
+    def _collection_path(self, name: str) -> str:
+        """Get the store path of a named collection"""
+        return os.path.join(os.path.dirname(self.index_path), self.COLLECTIONS_DIR, name, "vector_store.json")
+    
+    def get_collection(self, name: str, create: bool = True) -> Optional["MemorySystem"]:
+        """
+        Get a named collection
         
-        # Split into sentences to avoid breaking sentences
-        import re
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        Each collection has its own store, journal and indexes under
+        collections/<name>/ next to the default store, so loading, saving
+        or searching one never touches the others. A collection is loaded
+        on first access and embeds with the model of the default collection.
         
-        current_chunk = ""
+        Args:
+            name: Collection name (letters, digits, "_" and "-")
+            create: Create the collection if it does not exist yet
+            
+        Returns:
+            MemorySystem for the collection, or None if it does not exist
+            and `create` is False
+        """
+        if self._parent is not None:
+            return self._parent.get_collection(name, create)
+        if name == self.collection:
+            return self
+        if not re.fullmatch(r"[A-Za-z0-9_\-]+", name or ""):
+            self.log(f"[Memory Error] Invalid collection name: {name!r}")
+            return None
+            
+        path = self._collection_path(name)
+        with self._collections_lock:
+            collection = self._collections.get(name)
+            if collection is not None and collection.index_path == path:
+                return collection
+            if not create and not os.path.isdir(os.path.dirname(path)):
+                return None
+                
+            collection = MemorySystem(
+                model_name=self.model_name,
+                index_path=path,
+                logger=self.log,
+                search_mode=self.search_mode,
+                ann_nprobe=self.ann_index.nprobe,
+                use_embedding_cache=False,
+                storage_dtype=self.storage_dtype,
+                retrieval_mode=self.retrieval_mode,
+                hybrid_alpha=self.hybrid_alpha,
+                embedding_backend=self.embedding_backend,
+                collection=name
+            )
+            collection._parent = self
+            self._collections[name] = collection
+            return collection
+    
+    @classmethod
+    def _legacy_collection_of(cls, doc: Dict[str, Any]) -> Optional[str]:
+        """Get the collection a document stored by an older version belongs in"""
+        if doc.get("source") == "reflection":
+            return cls.REFLECTIONS_COLLECTION
+        if doc.get("subject") == "personality_profile" or doc.get("type") == "personality_profile":
+            return cls.PROFILES_COLLECTION
+        return None
+    
+    def _split_legacy_collections(self) -> None:
+        """
+        Move reflections and personality profiles out of the default collection
         
-        for sentence in sentences:
-            # If adding this sentence would exceed max_chunk_size
-            if len(current_chunk) + len(sentence) > max_chunk_size and current_chunk:
-                # Add current chunk to chunks list
-                chunks.append(current_chunk)
+        Older versions stored them with indexed documents. They are moved,
+        embeddings included, into the reflections and profiles collections
+        once; a marker in the collections directory records the move.
+        """
+        collections_dir = os.path.join(os.path.dirname(self.index_path), self.COLLECTIONS_DIR)
+        marker = os.path.join(collections_dir, self.LEGACY_SPLIT_MARKER)
+        if os.path.exists(marker):
+            return
+            
+        try:
+            # Row ids stay stable while no purge or compaction runs
+            with self._compact_lock:
+                moves: Dict[str, List[int]] = {}
+                with self._write_lock:
+                    for row in self._live_row_ids():
+                        name = self._legacy_collection_of(self._documents[row])
+                        if name:
+                            moves.setdefault(name, []).append(row)
+                            
+                for name, rows in moves.items():
+                    target = self.get_collection(name)
+                    with self._write_lock:
+                        embeddings = self.index[rows]
+                        metadata = [dict(self._documents[row]) for row in rows]
+                    if not target._append_rows(embeddings, metadata):
+                        raise RuntimeError(f"could not write the {name} collection")
+                    self._delete_rows(rows)
+                    self.log(f"[Memory] Moved {len(rows)} documents to the {name} collection")
                 
-                # Start new chunk with overlap
-                words = current_chunk.split()
-                overlap_words = min(len(words), int(overlap / 4))  # Approx 4 chars per word
-                overlap_text = " ".join(words[-overlap_words:]) if overlap_words > 0 else ""
-                current_chunk = overlap_text + " " + sentence
-            else:
-                # Add sentence to current chunk
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
+            os.makedirs(collections_dir, exist_ok=True)
+            with open(marker, "w", encoding="utf-8") as f:
+                f.write(time.strftime("%Y-%m-%d %H:%M:%S"))
+        except Exception as e:
+            self.log(f"[Memory Warning] Failed to move reflections and profiles to their collections: {e}")
+    
+    def list_collections(self) -> List[str]:
+        """
+        List the collections, including ones not loaded yet
         
-        # Add the last chunk if it's not empty
-        if current_chunk:
-            chunks.append(current_chunk)
+        Returns:
+            Collection names, the default collection first
+        """
+        if self._parent is not None:
+            return self._parent.list_collections()
+            
+        names = set(self._collections)
+        collections_dir = os.path.join(os.path.dirname(self.index_path), self.COLLECTIONS_DIR)
+        if os.path.isdir(collections_dir):
+            names.update(name for name in os.listdir(collections_dir)
+                         if os.path.isdir(os.path.join(collections_dir, name)))
+        return [self.collection] + sorted(names)
+    
+    def get_collection_stats(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the statistics of a collection
         
-        return chunks
+        Args:
+            name: Collection name
+            
+        Returns:
+            Statistics as returned by get_stats(), or None if the collection
+            does not exist
+        """
+        collection = self.get_collection(name, create=False)
+        if collection is None:
+            return None
+        stats = collection.get_stats()
+        stats["collection"] = collection.collection
+        return stats
     
     def add_reflection(self, category: str, content: str, importance: float = 0.5) -> Optional[str]:
         """
         Add a reflection or insight to the memory system
         
+        Reflections are kept in the "reflections" collection, apart from
+        indexed documents.
+        
         Args:
             category: Category of reflection (e.g., 'conversation', 'learning', 'user_preference')
             content: Text content of the reflection
             importance: Importance score (0.0-1.0) to prioritize in retrieval
             
         Returns:
-            ID of the added reflection or None if failed
+            ID of the added reflection, or of the same reflection added before,
+            or None if failed
         """
-        if not self.model:
-            self.log("[Memory Warning] Cannot add reflection: model not loaded")
-            return None
-            
         try:
-            # Generate a unique ID
-            reflection_id = f"refl_{int(time.time())}_{category}"
+            # Generate a unique ID, distinct for reflections added in the same second
+            reflection_id = f"refl_{int(time.time())}_{category}_{uuid.uuid4().hex[:8]}"
             
             # Create metadata
             metadata = {
@@ -468,35 +2206,45 @@ class MemorySystem:
                 "text": content
             }
             
-            # Add to index
-            success = self.add_to_index([content], [metadata])
-            
-            if success:
-                self.log(f"[Memory] Added {category} reflection to memory: {content[:50]}...")
-                return reflection_id
-            else:
+            # Add to the reflections collection
+            reflections = self.get_collection(self.REFLECTIONS_COLLECTION)
+            if reflections is None or not reflections.add_to_index([content], [metadata]):
                 return None
                 
+            # The same reflection was already stored, so report the stored one
+            if "content_hash" not in metadata:
+                existing = reflections._find_stored(content, "reflection")
+                return existing.get("id") if existing is not None else None
+                
+            self.log(f"[Memory] Added {category} reflection to memory: {content[:50]}...")
+            return reflection_id
+                
         except Exception as e:
             self.log(f"[Memory Error] Failed to add reflection: {e}")
             return None
         
     def get_context_for_query(self, query: str, max_tokens: int = 1500, 
-                             top_k: int = 5, min_score: float = 0.3) -> str:
+                             top_k: int = 5, min_score: float = 0.3,
+                             collections: Optional[List[str]] = None,
+                             count_tokens: Optional[Callable[[str], int]] = None) -> str:
         """
         Get a formatted context string for a query from memory
         
         Args:
             query: Query to find context for
-            max_tokens: Maximum approximate tokens to include in context
+            max_tokens: Maximum tokens to include in context
             top_k: Maximum number of results to include
             min_score: Minimum similarity score to include
+            collections: Optional collections to draw from, defaults to this one
+            count_tokens: Function counting the tokens of a text, such as
+                the chat engine's prompt_builder.counter.count; defaults to
+                this memory system's estimating TokenCounter
         
         Returns:
             Formatted context string
         """
         # Search for relevant items
-        results = self.search(query, top_k=top_k)
+        results = self.search(query, top_k=top_k, collections=collections)
         
         if not results:
             return ""
@@ -508,10 +2256,9 @@ class MemorySystem:
             return ""
             
         # Format the context
+        count_tokens = count_tokens or self.token_counter.count
         context_parts = []
-        total_length = 0
-        char_per_token = 4  # Rough approximation
-        max_chars = max_tokens * char_per_token
+        total_tokens = 0
         
         for item in results:
             # Get text from the item
@@ -525,38 +2272,48 @@ class MemorySystem:
             
             # Format this item
             item_text = f"[Source: {source} (relevance: {score:.2f})]\n{text}\n"
+            item_tokens = count_tokens(item_text)
             
             # Check if we've reached the max length
-            if total_length + len(item_text) > max_chars:
-                # Truncate if needed
-                available_chars = max_chars - total_length
-                if available_chars > 100:  # Only add if we can include meaningful content
-                    item_text = item_text[:available_chars] + "..."
+            if total_tokens + item_tokens > max_tokens:
+                # Truncate if needed, in proportion to the tokens left
+                available_tokens = max_tokens - total_tokens
+                if available_tokens > 25:  # Only add if we can include meaningful content
+                    item_text = item_text[:len(item_text) * available_tokens // item_tokens] + "..."
                     context_parts.append(item_text)
                 break
                 
             context_parts.append(item_text)
-            total_length += len(item_text)
+            total_tokens += item_tokens
         
         return "\n".join(context_parts)
 
-    def search_by_category(self, category: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    def search_by_category(self, category: str, top_k: int = 10,
+                           collection: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Retrieve items from memory by category
         
         Args:
             category: Category to search for
             top_k: Maximum number of results to return
+            collection: Optional collection to look in, e.g. "reflections";
+                defaults to this one
             
         Returns:
             List of items matching the category
         """
-        if not self.documents:
+        if collection is not None and collection != self.collection:
+            target = self.get_collection(collection, create=False)
+            return target.search_by_category(category, top_k) if target is not None else []
+            
+        if not self._documents:
             return []
             
         try:
-            # Find all documents with matching category
-            matches = [doc for doc in self.documents if doc.get("category") == category]
+            # Look up the documents with matching category
+            with self._write_lock:
+                rows = self._live_rows(self._get_metadata_index().rows_by("category", category))
+                matches = [self._documents[row] for row in rows]
             
             # Sort by timestamp (newest first)
             matches.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
@@ -568,46 +2325,69 @@ class MemorySystem:
             self.log(f"[Memory Error] Failed to search by category: {e}")
             return []
     
-    def export_memory(self, export_path: str) -> bool:
+    def export_memory(self, export_path: str, progress_callback: Optional[Callable] = None) -> bool:
         """
-        Export the memory system to a file
+        Export the memory system to a snapshot file
+        
+        The snapshot is streamed TRANSFER_CHUNK_ROWS documents at a time in
+        the line-delimited format of MemorySnapshotWriter, so exporting
+        needs little memory beyond the index itself. Deleted documents are
+        left out. Additions made while exporting are not included.
         
         Args:
             export_path: Path to export to
+            progress_callback: Optional function called with
+                (documents written, total documents) after each chunk
             
         Returns:
             True if export successful, False otherwise
         """
         try:
-            # Create data to export
-            export_data = {
-                "model_name": self.model_name,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "documents": self.documents,
-                "embeddings": [emb.cpu().tolist() for emb in self.index]
-            }
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(export_path), exist_ok=True)
+            # Rows are append-only and a purge swaps in new objects, so the
+            # rows present now stay readable through these references
+            with self._write_lock:
+                index = self.index
+                documents = self._documents
+                count = len(documents)
+                live = torch.ones(count, dtype=torch.bool)
+                if self._tombstones is not None:
+                    covered = min(count, len(self._tombstones))
+                    live[:covered] = ~self._tombstones[:covered]
+            total = int(live.sum())
             
-            # Save to file
-            with open(export_path, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, indent=2)
-                
-            self.log(f"[Memory] Exported memory to {export_path}")
+            with MemorySnapshotWriter(export_path, self.embedding_id, index.dim or 0, total,
+                                      logger=self.log) as writer:
+                for start in range(0, count, self.TRANSFER_CHUNK_ROWS):
+                    end = min(start + self.TRANSFER_CHUNK_ROWS, count)
+                    rows = (torch.nonzero(live[start:end]).flatten() + start).tolist()
+                    if not rows:
+                        continue
+                    writer.write([documents[row] for row in rows], index[rows].numpy())
+                    if progress_callback:
+                        progress_callback(writer.count, total)
+                        
+            self.log(f"[Memory] Exported {total} items to {export_path}")
             return True
             
         except Exception as e:
             self.log(f"[Memory Error] Failed to export memory: {e}")
             return False
             
-    def import_memory(self, import_path: str, merge: bool = False) -> bool:
+    def import_memory(self, import_path: str, merge: bool = False,
+                      progress_callback: Optional[Callable] = None) -> bool:
         """
-        Import memory from a file
+        Import memory from a snapshot file
+        
+        Snapshots are read TRANSFER_CHUNK_ROWS documents at a time and each
+        chunk is journaled as it is added; files from the older single JSON
+        export are accepted as well. When merging, documents whose content
+        is already stored for the same source are skipped.
         
         Args:
             import_path: Path to import from
             merge: Whether to merge with existing memory or replace
+            progress_callback: Optional function called with
+                (documents read, total documents) after each chunk
             
         Returns:
             True if import successful, False otherwise
@@ -617,32 +2397,46 @@ class MemorySystem:
             return False
             
         try:
-            # Load from file
-            with open(import_path, "r", encoding="utf-8") as f:
-                import_data = json.load(f)
+            try:
+                reader = MemorySnapshotReader(import_path, logger=self.log)
+            except ValueError as e:
+                self.log(f"[Memory Error] {e}")
+                return False
                 
-            # Validate data
-            if "documents" not in import_data or "embeddings" not in import_data:
-                self.log(f"[Memory Error] Invalid memory export file: {import_path}")
+            header = reader.header
+            if header.get("model_name") and header["model_name"] != self.embedding_id:
+                self.log(f"[Memory Warning] Snapshot was created with model {header['model_name']}, "
+                         f"not {self.embedding_id}")
+            if merge and self.index.dim and header.get("dim") and header["dim"] != self.index.dim:
+                self.log(f"[Memory Error] Snapshot embedding dimension {header['dim']} does not "
+                         f"match index dimension {self.index.dim}")
                 return False
                 
             # Clear existing memory if not merging
             if not merge:
-                self.index = []
-                self.documents = []
+                self.clear_index()
                 
-            # Import data
-            for emb_data, doc in zip(import_data["embeddings"], import_data["documents"]):
-                emb = torch.tensor(emb_data)
-                self.index.append(emb)
-                self.documents.append(doc)
-                
-            self.log(f"[Memory] Imported {len(import_data['documents'])} items from {import_path}")
-            
-            # Save to index
-            self.save_index()
+            read = imported = 0
+            for documents, embeddings in reader.chunks(self.TRANSFER_CHUNK_ROWS):
+                read += len(documents)
+                positions = list(range(len(documents)))
+                if merge:
+                    digests = [self._document_hash(doc) for doc in documents]
+                    positions = self._unique_positions(digests, documents)
+                    
+                if positions:
+                    if not self._append_rows(torch.from_numpy(embeddings[positions]),
+                                             [documents[pos] for pos in positions]):
+                        return False
+                    imported += len(positions)
+                if progress_callback:
+                    progress_callback(read, reader.count)
+                    
+            skipped = read - imported
+            self.log(f"[Memory] Imported {imported} items from {import_path}"
+                     + (f", skipped {skipped} duplicates" if skipped else ""))
             return True
             
         except Exception as e:
             self.log(f"[Memory Error] Failed to import memory: {e}")
-            return False
\ No newline at end of file
+            return False
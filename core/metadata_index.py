@@ -0,0 +1,159 @@
+"""
+Metadata Index - Secondary indexes over memory document metadata
+"""
+import os
+import bisect
+from typing import List, Dict, Any, Optional, Iterable, Set
+
+class MetadataIndex:
+    """
+    Inverted indexes from metadata values to document rows.
+
+    Keeps one posting list per value of each indexed field plus a sorted
+    timestamp index, so filters and category or source lookups only touch
+    the matching rows instead of scanning every document.
+    """
+
+    INDEXED_FIELDS = ("source", "category", "file_type")
+
+    def __init__(self):
+        """Initialize empty indexes"""
+        self.postings: Dict[str, Dict[Any, List[int]]] = {field: {} for field in self.INDEXED_FIELDS}
+        self.timestamps: List[tuple] = []
+        self.row_count = 0
+
+    @staticmethod
+    def get_file_type(meta: Dict[str, Any]) -> str:
+        """
+        Get the file type of a document
+
+        Args:
+            meta: Document metadata
+
+        Returns:
+            Lower-case extension such as ".pdf", or "" if unknown
+        """
+        file_type = meta.get("file_type")
+        if file_type:
+            return file_type
+        name = meta.get("path") or meta.get("source") or ""
+        return os.path.splitext(str(name))[1].lower()
+
+    def add(self, row: int, meta: Dict[str, Any]) -> None:
+        """
+        Index a document
+
+        Args:
+            row: Row id of the document
+            meta: Document metadata
+        """
+        for field in self.INDEXED_FIELDS:
+            value = self.get_file_type(meta) if field == "file_type" else meta.get(field)
+            if value is None or value == "":
+                continue
+            self.postings[field].setdefault(value, []).append(row)
+
+        timestamp = meta.get("timestamp")
+        if timestamp:
+            entry = (str(timestamp), row)
+            # Documents usually arrive in time order, making this an append
+            if not self.timestamps or entry >= self.timestamps[-1]:
+                self.timestamps.append(entry)
+            else:
+                bisect.insort(self.timestamps, entry)
+
+        self.row_count = max(self.row_count, row + 1)
+
+    def rebuild(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Rebuild all indexes from a document list
+
+        Args:
+            documents: Documents in row order
+        """
+        self.clear()
+        for row, meta in enumerate(documents):
+            self.add(row, meta)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self.postings = {field: {} for field in self.INDEXED_FIELDS}
+        self.timestamps = []
+        self.row_count = 0
+
+    def rows_by(self, field: str, value: Any) -> List[int]:
+        """
+        Get the rows with a given value of an indexed field
+
+        Args:
+            field: One of INDEXED_FIELDS
+            value: Field value
+
+        Returns:
+            Row ids in insertion order
+        """
+        return list(self.postings.get(field, {}).get(value, []))
+
+    def values(self, field: str) -> Dict[Any, int]:
+        """
+        Get the distinct values of an indexed field with their row counts
+
+        Args:
+            field: One of INDEXED_FIELDS
+
+        Returns:
+            Dictionary of value -> number of rows
+        """
+        return {value: len(rows) for value, rows in self.postings.get(field, {}).items()}
+
+    def rows_in_range(self, since: Optional[str] = None, until: Optional[str] = None) -> List[int]:
+        """
+        Get the rows whose timestamp falls in an inclusive range
+
+        Args:
+            since: Earliest timestamp, "%Y-%m-%d %H:%M:%S" or a prefix of it
+            until: Latest timestamp, "%Y-%m-%d %H:%M:%S" or a prefix of it
+
+        Returns:
+            Row ids ordered by timestamp
+        """
+        lo = bisect.bisect_left(self.timestamps, (str(since), -1)) if since else 0
+        # The sentinel suffix makes a date prefix include the whole day
+        hi = bisect.bisect_right(self.timestamps, (str(until) + "\uffff", 0)) if until else len(self.timestamps)
+        return [row for _, row in self.timestamps[lo:hi]]
+
+    def rows_for(self, filters: Dict[str, Any]) -> Optional[List[int]]:
+        """
+        Resolve the indexed part of a filter to candidate rows
+
+        Values may be a single value or a list of accepted values. Keys
+        "since" and "until" select a timestamp range. Keys that are not
+        indexed are ignored here and must be checked by the caller.
+
+        Args:
+            filters: Filter dictionary
+
+        Returns:
+            Sorted candidate row ids, or None if no indexed key was given
+        """
+        candidates: Optional[Set[int]] = None
+
+        for field in self.INDEXED_FIELDS:
+            if field not in filters:
+                continue
+            rows = set()
+            for value in _as_list(filters[field]):
+                rows.update(self.postings[field].get(value, ()))
+            candidates = rows if candidates is None else candidates & rows
+
+        if filters.get("since") or filters.get("until"):
+            rows = set(self.rows_in_range(filters.get("since"), filters.get("until")))
+            candidates = rows if candidates is None else candidates & rows
+
+        return None if candidates is None else sorted(candidates)
+
+def _as_list(value: Any) -> Iterable[Any]:
+    """Treat a scalar filter value as a one-element list"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return value
+    return [value]
@@ -0,0 +1,404 @@
+"""
+Prompt Builder - Token-budgeted prompt assembly with per-model chat templates
+"""
+import re
+from typing import List, Dict, Any, Optional, Callable, NamedTuple, Sequence, Tuple
+
+from core.lru_cache import LRUCache
+
+# Words and single punctuation marks, the units of the token estimate
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+class TokenCounter:
+    """
+    Counts the tokens of texts, caching the count of each text.
+
+    With a tokenizer (anything with an encode(text) method returning token
+    ids, such as a Hugging Face tokenizer) counts are exact for that
+    tokenizer. Without one they are estimated from words and punctuation:
+    BPE vocabularies hold common words as single tokens and split longer
+    ones into pieces of a few characters, which tracks real counts far
+    better than a fixed number of characters per token, notably for code
+    and non-English text. Prompts are assembled from the same messages
+    turn after turn, so most counts are cache hits.
+    """
+
+    # Characters per token within words longer than a single token
+    CHARS_PER_WORD_PIECE = 4
+
+    def __init__(self, tokenizer: Optional[Any] = None, cache_size: int = 4096):
+        """
+        Initialize the counter
+
+        Args:
+            tokenizer: Optional tokenizer with an encode(text) method
+            cache_size: Number of texts whose counts are cached
+        """
+        self.tokenizer = tokenizer
+        self._cache = LRUCache(cache_size)
+
+    def estimate(self, text: str) -> int:
+        """
+        Estimate the tokens of a text without a tokenizer
+
+        Args:
+            text: Text to count
+
+        Returns:
+            Estimated token count
+        """
+        tokens = 0
+        for piece in _PIECE_PATTERN.findall(text):
+            # Words of up to 6 characters are usually one token
+            tokens += 1 + max(0, len(piece) - 6 + self.CHARS_PER_WORD_PIECE - 1) // self.CHARS_PER_WORD_PIECE
+        return tokens + text.count("\n")
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of a text
+
+        Args:
+            text: Text to count
+
+        Returns:
+            Token count
+        """
+        if not text:
+            return 0
+        tokens = self._cache.get(text)
+        if tokens is None:
+            if self.tokenizer is not None:
+                tokens = len(self.tokenizer.encode(text))
+            else:
+                tokens = self.estimate(text)
+            self._cache.put(text, tokens)
+        return tokens
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters
+
+        Returns:
+            Dictionary with hits, misses, size and max_size
+        """
+        return self._cache.stats()
+
+def load_tokenizer(name: str, logger: Optional[Callable] = None,
+                   gguf_file: Optional[str] = None) -> Optional[Any]:
+    """
+    Load a Hugging Face tokenizer for exact token counts
+
+    Args:
+        name: Tokenizer name or path, or the directory of gguf_file
+        logger: Optional logging function
+        gguf_file: Optional GGUF model file in `name` to read the
+            tokenizer from (needs the gguf package)
+
+    Returns:
+        Tokenizer, or None if it cannot be loaded
+    """
+    log = logger or print
+    try:
+        from transformers import AutoTokenizer
+        if gguf_file:
+            return AutoTokenizer.from_pretrained(name, gguf_file=gguf_file)
+        return AutoTokenizer.from_pretrained(name)
+    except Exception as e:
+        log(f"[Prompt Warning] Could not load tokenizer '{gguf_file or name}': {e}")
+        return None
+
+class PromptTemplate:
+    """
+    Chat template of a model family.
+
+    Each role has a format with a single {content} field, compiled once
+    into the literal text before and after the content, so rendering a
+    message is a concatenation.
+    """
+
+    def __init__(self, name: str, keywords: Sequence[str], system: str, user: str,
+                 assistant: str, generation: str):
+        """
+        Compile the template
+
+        Args:
+            name: Template name
+            keywords: Substrings of model names that use the template
+            system: Format of the system message
+            user: Format of a user message
+            assistant: Format of an assistant message
+            generation: Text after the last user message that starts the
+                model's response
+        """
+        self.name = name
+        self.keywords = tuple(keywords)
+        self.generation = generation
+        self._roles: Dict[str, Tuple[str, str]] = {}
+        for role, fmt in (("system", system), ("user", user), ("assistant", assistant)):
+            prefix, content, suffix = fmt.partition("{content}")
+            if not content:
+                raise ValueError(f"Template '{name}' has no {{content}} field for {role}")
+            self._roles[role] = (prefix, suffix)
+
+    def render(self, role: str, content: str) -> str:
+        """
+        Render one message
+
+        Args:
+            role: "system", "user" or "assistant"
+            content: Message content
+
+        Returns:
+            Formatted message, empty for unknown roles
+        """
+        parts = self._roles.get(role)
+        if parts is None:
+            return ""
+        return parts[0] + content + parts[1]
+
+# Checked in order, so more specific names come first ("codellama"
+# contains "llama"); models matching none use the generic template
+TEMPLATES: List[PromptTemplate] = [
+    PromptTemplate("inst", ["codellama", "deepseek"],
+                   system="{content}\n\n",
+                   user="[INST] {content} [/INST]\n",
+                   assistant="{content}\n",
+                   generation=""),
+    PromptTemplate("tagged", ["llama", "mistral", "nous", "mythomax"],
+                   system="<|system|>\n{content}\n",
+                   user="<|user|>\n{content}\n",
+                   assistant="<|assistant|>\n{content}\n",
+                   generation="<|assistant|>\n"),
+    PromptTemplate("phi", ["phi"],
+                   system="System: {content}\n\n",
+                   user="Human: {content}\n",
+                   assistant="Assistant: {content}\n",
+                   generation="\nAssistant:"),
+]
+
+GENERIC_TEMPLATE = PromptTemplate("generic", [],
+                                  system="System: {content}\n\n",
+                                  user="User: {content}\n\n",
+                                  assistant="Assistant: {content}\n\n",
+                                  generation="Assistant:")
+
+MEMORY_HEADER = "Relevant context from documents:\n"
+
+class PromptStats(NamedTuple):
+    """Token counts of an assembled prompt"""
+    template: str
+    context_window: int
+    budget: int
+    system_tokens: int
+    memory_tokens: int
+    history_tokens: int
+    prompt_tokens: int
+    total_tokens: int
+    history_messages: int
+    memory_documents: int
+    dropped_messages: int
+    dropped_documents: int
+
+class AssembledPrompt(NamedTuple):
+    """Prompt text and the token counts it was assembled with"""
+    text: str
+    stats: PromptStats
+
+class PromptBuilder:
+    """
+    Assembles prompts that fit a model's context window.
+
+    The budget is the context window less the tokens reserved for the
+    response. The system prompt and the new user message are always
+    included; retrieved documents then get up to memory_share of what is
+    left, in the order given (most relevant first), and the rest is filled
+    with the most recent history, newest first, stopping at the first
+    message that does not fit so the included history is contiguous.
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None,
+                 memory_share: float = 0.5, output_share: float = 0.25):
+        """
+        Initialize the builder
+
+        Args:
+            counter: Token counter, an estimating one if None
+            memory_share: Largest share of the budget left after the system
+                prompt and user message that documents may take
+            output_share: Share of the context window reserved for the
+                response when no reserve is given
+        """
+        self.counter = counter or TokenCounter()
+        self.memory_share = memory_share
+        self.output_share = output_share
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def template_for(self, model_name: str) -> PromptTemplate:
+        """
+        Get the template of a model
+
+        Args:
+            model_name: Model name
+
+        Returns:
+            Template of the first family the name matches
+        """
+        template = self._templates.get(model_name)
+        if template is None:
+            model = model_name.lower()
+            template = next((t for t in TEMPLATES if any(k in model for k in t.keywords)), GENERIC_TEMPLATE)
+            self._templates[model_name] = template
+        return template
+
+    def budget(self, context_window: int, reserve_tokens: Optional[int] = None) -> int:
+        """
+        Get the prompt budget of a context window
+
+        Args:
+            context_window: Context window in tokens
+            reserve_tokens: Tokens reserved for the response, output_share
+                of the window if None
+
+        Returns:
+            Tokens available to the prompt
+        """
+        if reserve_tokens is None or reserve_tokens < 0:
+            reserve_tokens = int(context_window * self.output_share)
+        return max(0, context_window - reserve_tokens)
+
+    def _pack_documents(self, documents: Sequence[Dict[str, Any]],
+                        available: int) -> Tuple[List[str], int]:
+        """Format as many documents as fit; returns the parts and their tokens"""
+        if not documents:
+            return [], 0
+        header_tokens = self.counter.count(MEMORY_HEADER)
+        if header_tokens >= available:
+            return [], 0
+
+        parts = [MEMORY_HEADER]
+        used = header_tokens
+        for document in documents:
+            part = f"From {document.get('source', 'Unknown')}: {document.get('text', '')}\n\n"
+            tokens = self.counter.count(part)
+            if used + tokens > available:
+                continue
+            parts.append(part)
+            used += tokens
+        if len(parts) == 1:
+            return [], 0
+        return parts, used
+
+    def build(self, model_name: str, system_prompt: str, history: Sequence[Dict[str, Any]],
+              prompt: str, documents: Optional[Sequence[Dict[str, Any]]] = None,
+              context_window: int = 2048, reserve_tokens: Optional[int] = None) -> AssembledPrompt:
+        """
+        Assemble a full prompt
+
+        Args:
+            model_name: Model name, selects the template
+            system_prompt: System prompt, may be empty
+            history: Earlier messages with "role" and "content", oldest
+                first, not including the new user message
+            prompt: New user message
+            documents: Retrieved documents with "text" and "source"
+            context_window: Model context window in tokens
+            reserve_tokens: Tokens reserved for the response
+
+        Returns:
+            Prompt text and token counts
+        """
+        template = self.template_for(model_name)
+        count = self.counter.count
+        budget = self.budget(context_window, reserve_tokens)
+
+        system_tokens = count(template.render("system", system_prompt)) if system_prompt else 0
+        prompt_text = template.render("user", prompt.strip()) + template.generation
+        prompt_tokens = count(prompt_text)
+        available = max(0, budget - system_tokens - prompt_tokens)
+
+        memory_parts, memory_tokens = self._pack_documents(
+            documents or [], int(available * self.memory_share))
+        available -= memory_tokens
+
+        history_parts = []
+        history_tokens = 0
+        dropped_messages = 0
+        for index in range(len(history) - 1, -1, -1):
+            message = history[index]
+            text = template.render(message.get("role", ""), message.get("content", ""))
+            if not text:
+                continue
+            tokens = count(text)
+            if history_tokens + tokens > available:
+                dropped_messages = index + 1
+                break
+            history_parts.append(text)
+            history_tokens += tokens
+        history_parts.reverse()
+
+        # Documents go in the system message, after the system prompt
+        system_content = "\n\n".join(
+            part for part in (system_prompt, "".join(memory_parts).rstrip("\n")) if part)
+        system_text = template.render("system", system_content) if system_content else ""
+
+        memory_documents = max(0, len(memory_parts) - 1)
+        stats = PromptStats(
+            template=template.name,
+            context_window=context_window,
+            budget=budget,
+            system_tokens=system_tokens,
+            memory_tokens=memory_tokens,
+            history_tokens=history_tokens,
+            prompt_tokens=prompt_tokens,
+            total_tokens=system_tokens + memory_tokens + history_tokens + prompt_tokens,
+            history_messages=len(history_parts),
+            memory_documents=memory_documents,
+            dropped_messages=dropped_messages,
+            dropped_documents=len(documents or []) - memory_documents,
+        )
+        return AssembledPrompt("".join([system_text, *history_parts, prompt_text]), stats)
+
+    def build_continuation(self, model_name: str, prompt: str,
+                           documents: Optional[Sequence[Dict[str, Any]]] = None,
+                           context_window: int = 2048,
+                           reserve_tokens: Optional[int] = None) -> AssembledPrompt:
+        """
+        Assemble only a new user turn, for a model continuing its context
+
+        The earlier conversation is already in the model's context, so the
+        turn holds the user message and the documents retrieved for it.
+
+        Args:
+            model_name: Model name, selects the template
+            prompt: New user message
+            documents: Retrieved documents with "text" and "source"
+            context_window: Model context window in tokens
+            reserve_tokens: Tokens reserved for the response
+
+        Returns:
+            Prompt text and token counts; history is not counted
+        """
+        template = self.template_for(model_name)
+        budget = self.budget(context_window, reserve_tokens)
+        prompt_tokens = self.counter.count(template.render("user", prompt.strip()) + template.generation)
+
+        memory_parts, memory_tokens = self._pack_documents(
+            documents or [], int(max(0, budget - prompt_tokens) * self.memory_share))
+        content = "".join(memory_parts) + prompt.strip()
+
+        memory_documents = max(0, len(memory_parts) - 1)
+        stats = PromptStats(
+            template=template.name,
+            context_window=context_window,
+            budget=budget,
+            system_tokens=0,
+            memory_tokens=memory_tokens,
+            history_tokens=0,
+            prompt_tokens=prompt_tokens,
+            total_tokens=memory_tokens + prompt_tokens,
+            history_messages=0,
+            memory_documents=memory_documents,
+            dropped_messages=0,
+            dropped_documents=len(documents or []) - memory_documents,
+        )
+        return AssembledPrompt(template.render("user", content) + template.generation, stats)
@@ -0,0 +1,189 @@
+"""
+Session Journal - Append-only, line-delimited storage for chat history
+"""
+import os
+import json
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+class SessionJournal:
+    """
+    Chat history stored as one JSON message per line.
+
+    New messages are appended, so saving a turn costs only the size of
+    that turn. Messages are read backwards from a byte offset, which lets
+    the newest part of a long history be loaded at start-up and older
+    pages on demand, without parsing the rest of the file. Changes to
+    messages already written (edits, removals, a cleared history) are
+    persisted by compaction: the file is rewritten to a temporary file and
+    atomically swapped in. A torn last line from a crash during an append
+    is discarded by repair().
+    """
+
+    # Bytes read per step when scanning backwards for line boundaries
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, path: str, logger: Optional[Callable] = None):
+        """
+        Initialize the journal
+
+        Args:
+            path: Journal file path
+            logger: Optional logging function
+        """
+        self.path = path
+        self.log = logger or print
+
+    def exists(self) -> bool:
+        """Whether the journal file exists"""
+        return os.path.exists(self.path)
+
+    def size(self) -> int:
+        """Size of the journal in bytes, 0 if it does not exist"""
+        return os.path.getsize(self.path) if self.exists() else 0
+
+    @staticmethod
+    def _encode(messages: List[Dict[str, Any]]) -> bytes:
+        """Encode messages as JSON lines; json escapes newlines inside strings"""
+        return "".join(json.dumps(message, ensure_ascii=False) + "\n" for message in messages).encode("utf-8")
+
+    def append(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Append messages and flush them to disk
+
+        Args:
+            messages: Messages to append
+
+        Returns:
+            Size of the journal after the append
+        """
+        data = self._encode(messages)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            if data:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            return f.tell()
+
+    def repair(self) -> None:
+        """Truncate an incomplete last line so later appends start on a line boundary"""
+        size = self.size()
+        if not size:
+            return
+
+        with open(self.path, "r+b") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # Find the end of the last complete line
+            pos = size
+            keep = 0
+            while pos > 0:
+                step = min(self.BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    keep = pos + newline + 1
+                    break
+
+            self.log(f"[Session Warning] Discarding incomplete journal tail in {self.path}")
+            f.truncate(keep)
+
+    def read_before(self, offset: Optional[int] = None,
+                    count: int = 100) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Read the messages just before a byte offset
+
+        Args:
+            offset: Offset of a line boundary, the end of the journal if None
+            count: Maximum number of messages to read
+
+        Returns:
+            Tuple of (messages in journal order, offset of the first one);
+            the offset is 0 once the start of the journal is reached
+        """
+        if not self.exists():
+            return [], 0
+
+        with open(self.path, "rb") as f:
+            end = f.seek(0, os.SEEK_END) if offset is None else offset
+            pos = end
+            data = b""
+            # count + 1 newlines guarantee `count` complete lines
+            while pos > 0 and data.count(b"\n") <= count:
+                step = min(self.BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+
+        lines = data.split(b"\n")
+        # The last element follows the final newline and is empty; the first
+        # may be cut off unless the scan reached the start of the file
+        lines.pop()
+        if pos > 0:
+            lines.pop(0)
+        lines = lines[-count:] if count > 0 else []
+
+        start = end - sum(len(line) + 1 for line in lines)
+        messages = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                messages.append(json.loads(line.decode("utf-8")))
+            except ValueError:
+                self.log(f"[Session Warning] Skipping corrupt line in {self.path}")
+        return messages, start
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """
+        Read every message
+
+        Returns:
+            Messages in journal order
+        """
+        messages, _ = self.read_before(None, count=self._line_count())
+        return messages
+
+    def _line_count(self) -> int:
+        """Count the lines in the journal"""
+        if not self.exists():
+            return 0
+        lines = 0
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(self.BLOCK_SIZE), b""):
+                lines += block.count(b"\n")
+        return lines
+
+    def rewrite(self, messages: List[Dict[str, Any]], keep_bytes: int = 0) -> int:
+        """
+        Compact the journal: atomically replace its contents
+
+        Args:
+            messages: Messages to write
+            keep_bytes: Length of the existing journal prefix to keep in
+                front of the messages (older history that is not loaded)
+
+        Returns:
+            Size of the new journal
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as tmp:
+            if keep_bytes and self.exists():
+                with open(self.path, "rb") as f:
+                    remaining = keep_bytes
+                    while remaining > 0:
+                        block = f.read(min(self.BLOCK_SIZE, remaining))
+                        if not block:
+                            break
+                        tmp.write(block)
+                        remaining -= len(block)
+            tmp.write(self._encode(messages))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            size = tmp.tell()
+        os.replace(tmp_path, self.path)
+        return size
@@ -0,0 +1,148 @@
+"""
+Text Chunker - Streaming, sentence-aware splitting of documents into chunks
+"""
+import re
+from typing import Iterable, Iterator, NamedTuple, Optional, TextIO, Union
+
+# Whitespace following sentence-ending punctuation separates sentences
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\S+")
+
+# Characters read from a file at a time
+READ_SIZE = 1 << 20
+
+class TextChunk(NamedTuple):
+    """A chunk of text and its character offsets in the source text"""
+    text: str
+    start: int
+    end: int
+
+def _pieces(source: Union[str, TextIO, Iterable[str]], read_size: int) -> Iterator[str]:
+    """Yield the source text in pieces"""
+    if isinstance(source, str):
+        for start in range(0, len(source), read_size):
+            yield source[start:start + read_size]
+    elif hasattr(source, "read"):
+        while True:
+            piece = source.read(read_size)
+            if not piece:
+                return
+            yield piece
+    else:
+        yield from source
+
+def iter_chunks(source: Union[str, TextIO, Iterable[str]],
+                max_chunk_size: int = 1000,
+                overlap: int = 100,
+                read_size: int = READ_SIZE) -> Iterator[TextChunk]:
+    """
+    Split text into overlapping, sentence-aligned chunks
+
+    Sentences are gathered into a chunk until the next one would make it
+    longer than max_chunk_size; a single longer sentence becomes a chunk of
+    its own. Each chunk after the first starts with the last overlap / 4
+    words of the previous one (about four characters per word). Text no
+    longer than max_chunk_size is a single chunk.
+
+    The source is consumed incrementally and every character is scanned a
+    constant number of times, so memory use is bounded by the chunk size
+    and read_size rather than the document size. Chunk text is the exact
+    slice source[start:end].
+
+    Args:
+        source: Text, a text file object or an iterable of text pieces
+        max_chunk_size: Maximum chunk length in characters
+        overlap: Approximate number of characters repeated between chunks
+        read_size: Characters read from a file object at a time
+
+    Yields:
+        TextChunk tuples in source order
+    """
+    pieces = _pieces(source, read_size)
+    overlap_words = max(0, int(overlap / 4))
+
+    buf = ""        # Unconsumed text, starting at absolute offset `base`
+    base = 0
+    eof = False
+
+    def read_more() -> bool:
+        nonlocal buf, eof
+        piece = next(pieces, None)
+        if piece is None:
+            eof = True
+            return False
+        buf += piece
+        return True
+
+    # Short text is kept whole
+    while len(buf) <= max_chunk_size and read_more():
+        pass
+    if eof and len(buf) <= max_chunk_size:
+        yield TextChunk(buf, 0, len(buf))
+        return
+
+    chunk_start: Optional[int] = None
+    chunk_end = 0
+    sentence_start = 0
+    scan_from = 0
+
+    # Length the chunk is measured by: sentences and overlap words count
+    # as if joined by single spaces, whatever whitespace separates them
+    chunk_len = 0
+
+    def add_sentence(start: int, end: int) -> Optional[TextChunk]:
+        """Extend the current chunk, returning the finished chunk if it is full"""
+        nonlocal chunk_start, chunk_end, chunk_len
+        if chunk_start is None:
+            chunk_start, chunk_end, chunk_len = start, end, end - start
+            return None
+        if chunk_len + (end - start) <= max_chunk_size:
+            chunk_end = end
+            chunk_len += 1 + end - start
+            return None
+
+        finished = TextChunk(buf[chunk_start - base:chunk_end - base], chunk_start, chunk_end)
+
+        # The next chunk starts at the last overlap words of this one
+        next_start, carried = start, 0
+        if overlap_words:
+            words = finished.text.rsplit(None, overlap_words)
+            if len(words) > overlap_words:
+                first = _WORD.search(finished.text, len(words[0]))
+                words = words[1:]
+            else:
+                first = _WORD.search(finished.text)
+            if first:
+                next_start = chunk_start + first.start()
+                carried = sum(len(word) for word in words) + len(words) - 1
+        chunk_start, chunk_end = next_start, end
+        chunk_len = carried + 1 + end - start
+        return finished
+
+    while True:
+        match = _SENTENCE_BOUNDARY.search(buf, scan_from - base)
+        if match and (match.end() < len(buf) or eof):
+            finished = add_sentence(sentence_start, base + match.start())
+            sentence_start = scan_from = base + match.end()
+            if finished:
+                yield finished
+
+            # Drop text no longer needed by the current chunk
+            keep = min(chunk_start, sentence_start) - base
+            if keep > len(buf) // 2:
+                buf = buf[keep:]
+                base += keep
+        elif not eof:
+            # Resume after the text already scanned; a boundary that touched
+            # the end of the buffer may continue into the next piece
+            scan_from = base + (match.start() if match else len(buf))
+            read_more()
+        else:
+            if sentence_start < base + len(buf):
+                finished = add_sentence(sentence_start, base + len(buf))
+                if finished:
+                    yield finished
+            break
+
+    if chunk_start is not None:
+        yield TextChunk(buf[chunk_start - base:chunk_end - base], chunk_start, chunk_end)
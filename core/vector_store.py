@@ -0,0 +1,570 @@
+"""
+Vector Store - Binary, memory-mapped on-disk format for the memory system
+"""
+import os
+import json
+import glob
+import time
+import zlib
+import base64
+import struct
+import numpy as np
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator
+
+class VectorStoreFile:
+    """
+    Reads and writes the binary vector store format.
+
+    The store is split into two files next to the configured index path:
+    a contiguous matrix saved with numpy (``<base>.<generation>.npy``) and a
+    metadata file (``<base>.meta.json``) holding the documents and a
+    pointer to the current matrix file. The matrix is float32, float16 or
+    int8; int8 matrices have their per-row scales in
+    ``<base>.<generation>.scales.npy``. The matrix is opened with
+    memory-mapping, so loading does not depend on the number of rows and the
+    OS page cache is shared by every process that opens the same store.
+    """
+
+    FORMAT_VERSION = 2
+
+    def __init__(self, index_path: str, logger: Optional[Callable] = None):
+        """
+        Initialize the store file handler
+
+        Args:
+            index_path: Configured path of the (legacy JSON) vector store
+            logger: Optional logging function
+        """
+        self.index_path = index_path
+        self.log = logger or print
+        self.base_path = os.path.splitext(index_path)[0]
+        self.meta_path = f"{self.base_path}.meta.json"
+
+    def exists(self) -> bool:
+        """
+        Check whether a binary store exists on disk
+
+        Returns:
+            True if the metadata file exists, False otherwise
+        """
+        return os.path.exists(self.meta_path)
+
+    def sidecar_path(self, suffix: str) -> str:
+        """
+        Get the path of an auxiliary file stored alongside the store
+
+        Args:
+            suffix: File suffix, e.g. "ivf.npz"
+
+        Returns:
+            Path next to the metadata file
+        """
+        return f"{self.base_path}.{suffix}"
+
+    def _matrix_path(self, generation: int) -> str:
+        """Get the matrix file path for a store generation"""
+        return f"{self.base_path}.{generation}.npy"
+
+    def _scales_path(self, generation: int) -> str:
+        """Get the int8 scales file path for a store generation"""
+        return f"{self.base_path}.{generation}.scales.npy"
+
+    def read_meta(self) -> Dict[str, Any]:
+        """
+        Read the metadata file
+
+        Returns:
+            Metadata dictionary
+        """
+        with open(self.meta_path, "r", encoding="utf-8-sig") as f:
+            return json.load(f)
+
+    def load(self) -> Tuple[np.ndarray, List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Load the store, memory-mapping the embedding matrix
+
+        The matrix is mapped copy-on-write, so it can be wrapped by torch
+        without copying while the file on disk is never modified.
+
+        Returns:
+            Tuple of (embedding matrix, documents, metadata)
+        """
+        meta = self.read_meta()
+        documents = meta.pop("documents", [])
+        matrix_path = os.path.join(os.path.dirname(self.meta_path), meta["matrix_file"])
+        matrix = np.load(matrix_path, mmap_mode="c")
+
+        if matrix.ndim != 2 or matrix.shape[0] != len(documents):
+            raise ValueError(
+                f"Store mismatch: {matrix.shape[0]} embeddings for {len(documents)} documents"
+            )
+
+        return matrix, documents, meta
+
+    def load_scales(self, meta: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Load the per-row scales of an int8 store
+
+        Args:
+            meta: Metadata returned by load()
+
+        Returns:
+            Memory-mapped scales, or None if the store is not quantized
+        """
+        if not meta.get("scales_file"):
+            return None
+        scales_path = os.path.join(os.path.dirname(self.meta_path), meta["scales_file"])
+        return np.load(scales_path, mmap_mode="c")
+
+    def save(self, matrix: np.ndarray, documents: List[Dict[str, Any]],
+             extra: Optional[Dict[str, Any]] = None,
+             scales: Optional[np.ndarray] = None) -> None:
+        """
+        Save the store atomically
+
+        A new matrix generation is written next to the current one and the
+        metadata file is then replaced to point at it, so readers never see
+        a half-written store. Stale generations are removed afterwards when
+        no other process still holds them open.
+
+        Args:
+            matrix: 2-D float32, float16 or int8 matrix with one row per document
+            documents: Document metadata list
+            extra: Optional extra fields to record in the metadata file
+            scales: Per-row scales, required for an int8 matrix
+        """
+        os.makedirs(os.path.dirname(self.meta_path) or ".", exist_ok=True)
+
+        generation = 1
+        if self.exists():
+            try:
+                generation = int(self.read_meta().get("generation", 0)) + 1
+            except Exception:
+                generation = int(time.time())
+
+        if matrix.dtype not in (np.float16, np.int8):
+            matrix = matrix.astype(np.float32, copy=False)
+        if matrix.dtype == np.int8 and scales is None:
+            raise ValueError("int8 embeddings need per-row scales")
+        matrix = np.ascontiguousarray(matrix)
+        matrix_path = self._matrix_path(generation)
+        scales_path = self._scales_path(generation) if matrix.dtype == np.int8 else None
+
+        # Write the arrays under a temporary name first
+        arrays = [(matrix_path, matrix)]
+        if scales_path:
+            arrays.append((scales_path, np.ascontiguousarray(scales, dtype=np.float32)))
+        for path, array in arrays:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+
+        meta = {
+            "format": self.FORMAT_VERSION,
+            "generation": generation,
+            "matrix_file": os.path.basename(matrix_path),
+            "count": int(matrix.shape[0]),
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "dtype": str(matrix.dtype),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if scales_path:
+            meta["scales_file"] = os.path.basename(scales_path)
+        if extra:
+            meta.update(extra)
+        meta["documents"] = documents
+
+        tmp_meta_path = self.meta_path + ".tmp"
+        with open(tmp_meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta_path, self.meta_path)
+
+        self._remove_stale_generations(keep=generation)
+
+    def _remove_stale_generations(self, keep: Optional[int] = None) -> None:
+        """
+        Remove matrix and scales files from older generations
+
+        Args:
+            keep: Generation whose files must not be removed
+        """
+        for path in glob.glob(glob.escape(self.base_path) + ".*.npy"):
+            generation = path[len(self.base_path) + 1:-len(".npy")]
+            if generation.endswith(".scales"):
+                generation = generation[:-len(".scales")]
+            if not generation.isdigit():
+                continue
+            if keep is not None and int(generation) == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by this or another process (Windows); retried on next save
+                pass
+
+    def remove(self) -> None:
+        """Remove all files belonging to the binary store"""
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        self._remove_stale_generations()
+
+class VectorStoreJournal:
+    """
+    Append-only write-ahead journal of changes since the last full save.
+
+    An add record holds a contiguous run of rows: a fixed header, the
+    float32 embedding block and the JSON-encoded metadata, followed by a
+    CRC32 of the payload. Records carry the row id of their first row, so
+    replaying a journal over a store that already contains some of its
+    rows is idempotent. A delete record has the same layout with no
+    embeddings and a JSON list of deleted row ids; deleting a row twice is
+    harmless, so delete records are idempotent too. A torn record at the
+    end of the file (from a crash during an append) is detected by its
+    length or checksum and discarded.
+    """
+
+    MAGIC = b"IRJ1"
+    DELETE_MAGIC = b"IRD1"
+    HEADER = struct.Struct("<4sQIII")  # magic, start_row, rows, dim, meta_len
+    TRAILER = struct.Struct("<I")      # crc32 of embeddings + metadata
+
+    # Record kinds yielded by read()
+    ADD = "add"
+    DELETE = "delete"
+
+    def __init__(self, path: str, logger: Optional[Callable] = None):
+        """
+        Initialize the journal
+
+        Args:
+            path: Journal file path
+            logger: Optional logging function
+        """
+        self.path = path
+        self.log = logger or print
+
+    def exists(self) -> bool:
+        """Whether the journal file exists and is not empty"""
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def append(self, start_row: int, embeddings: np.ndarray,
+               documents: List[Dict[str, Any]]) -> int:
+        """
+        Append a run of rows and flush it to disk
+
+        Args:
+            start_row: Row id of the first row in the run
+            embeddings: 2-D float matrix for the rows
+            documents: Metadata for the rows
+
+        Returns:
+            Number of bytes written
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        return self._write(self.MAGIC, start_row, embeddings.shape[0], embeddings.shape[1],
+                           embeddings.tobytes(), json.dumps(documents).encode("utf-8"))
+
+    def append_delete(self, rows: List[int]) -> int:
+        """
+        Append a record of deleted rows and flush it to disk
+
+        Args:
+            rows: Row ids that were deleted
+
+        Returns:
+            Number of bytes written
+        """
+        rows = [int(row) for row in rows]
+        return self._write(self.DELETE_MAGIC, 0, len(rows), 0, b"", json.dumps(rows).encode("utf-8"))
+
+    def _write(self, magic: bytes, start_row: int, rows: int, dim: int,
+               emb_bytes: bytes, meta_bytes: bytes) -> int:
+        """Append one checksummed record and fsync the file"""
+        crc = zlib.crc32(meta_bytes, zlib.crc32(emb_bytes))
+        record = b"".join([
+            self.HEADER.pack(magic, start_row, rows, dim, len(meta_bytes)),
+            emb_bytes,
+            meta_bytes,
+            self.TRAILER.pack(crc),
+        ])
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(record)
+
+    def read(self) -> Iterator[Tuple[str, int, Optional[np.ndarray], List[Any]]]:
+        """
+        Iterate over complete records in the order they were written
+
+        A torn or corrupt tail is truncated so later appends start on a
+        record boundary.
+
+        Yields:
+            Tuples of (ADD, start_row, embeddings, documents) and
+            (DELETE, 0, None, row ids)
+        """
+        if not os.path.exists(self.path):
+            return
+
+        good_offset = 0
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    break
+                magic, start_row, rows, dim, meta_len = self.HEADER.unpack(header)
+                if magic not in (self.MAGIC, self.DELETE_MAGIC):
+                    break
+
+                emb_bytes = f.read(rows * dim * 4)
+                meta_bytes = f.read(meta_len)
+                trailer = f.read(self.TRAILER.size)
+                if len(emb_bytes) < rows * dim * 4 or len(meta_bytes) < meta_len \
+                        or len(trailer) < self.TRAILER.size:
+                    break
+                if self.TRAILER.unpack(trailer)[0] != zlib.crc32(meta_bytes, zlib.crc32(emb_bytes)):
+                    break
+
+                good_offset = f.tell()
+                payload = json.loads(meta_bytes.decode("utf-8"))
+                if magic == self.DELETE_MAGIC:
+                    yield self.DELETE, 0, None, payload
+                else:
+                    embeddings = np.frombuffer(emb_bytes, dtype=np.float32).reshape(rows, dim)
+                    yield self.ADD, start_row, embeddings, payload
+
+            file_size = f.seek(0, os.SEEK_END)
+
+        if file_size > good_offset:
+            self.log(f"[Memory Warning] Discarding incomplete journal tail in {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_offset)
+
+    def truncate_before(self, row: int) -> None:
+        """
+        Drop add records whose rows are all below a row id
+
+        Used after a compaction that persisted every row below `row`.
+        Delete records are kept because the store still holds the deleted
+        rows until they are purged.
+
+        Args:
+            row: First row id not covered by the compacted store
+        """
+        if not os.path.exists(self.path):
+            return
+
+        keep = [record for record in self.read() if record[0] == self.DELETE or record[1] >= row]
+        if not keep:
+            self.clear()
+            return
+
+        tmp_path = self.path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        tmp = VectorStoreJournal(tmp_path, logger=self.log)
+        for kind, start_row, embeddings, documents in keep:
+            if kind == self.DELETE:
+                tmp.append_delete(documents)
+            else:
+                tmp.append(start_row, embeddings, documents)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Remove the journal file"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class MemorySnapshotWriter:
+    """
+    Writes a memory export as line-delimited JSON, one record at a time.
+
+    The first line is a header with the model name and embedding size,
+    each following line holds one document and its float32 embedding
+    (base64-encoded, little-endian), and a final trailer line records the
+    number of documents written. The file is written under a temporary
+    name and only renamed into place by close(), so an interrupted export
+    never leaves a partial snapshot behind.
+    """
+
+    FORMAT = "irintai-memory-snapshot"
+    VERSION = 1
+
+    def __init__(self, path: str, model_name: str, dim: int, count: int,
+                 logger: Optional[Callable] = None):
+        """
+        Open a snapshot for writing
+
+        Args:
+            path: Destination file
+            model_name: Embedding model the vectors were produced with
+            dim: Embedding dimension
+            count: Number of documents that will be written
+            logger: Optional logging function
+        """
+        self.path = path
+        self.log = logger or print
+        self.count = 0
+        self._tmp_path = path + ".tmp"
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        self._write_line({
+            "format": self.FORMAT,
+            "version": self.VERSION,
+            "model_name": model_name,
+            "dim": dim,
+            "dtype": "float32",
+            "count": count,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    def __enter__(self) -> "MemorySnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_line(self, record: Dict[str, Any]) -> None:
+        """Write one JSON record on its own line"""
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n")
+
+    def write(self, documents: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        """
+        Append documents and their embeddings
+
+        Args:
+            documents: Document metadata
+            embeddings: 2-D float matrix with one row per document
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype="<f4")
+        for document, embedding in zip(documents, embeddings):
+            self._write_line({
+                "document": document,
+                "embedding": base64.b64encode(embedding.tobytes()).decode("ascii"),
+            })
+        self.count += len(documents)
+
+    def close(self) -> None:
+        """Write the trailer and move the snapshot into place"""
+        self._write_line({"end": True, "count": self.count})
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """Discard the partially written snapshot"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class MemorySnapshotReader:
+    """
+    Reads a memory export in chunks.
+
+    Reads snapshots written by MemorySnapshotWriter line by line, so only
+    one chunk of documents is in memory at a time. The older single-document
+    JSON export (``{"documents": [...], "embeddings": [...]}``) is still
+    accepted, but has to be parsed as a whole.
+    """
+
+    # Bytes read from the end of a snapshot to find its trailer
+    TAIL_BYTES = 4096
+
+    def __init__(self, path: str, logger: Optional[Callable] = None):
+        """
+        Open a snapshot and read its header
+
+        Args:
+            path: Snapshot file
+            logger: Optional logging function
+
+        Raises:
+            ValueError: If the file is not a complete memory export
+        """
+        self.path = path
+        self.log = logger or print
+        self._legacy = None
+
+        with open(path, "r", encoding="utf-8-sig") as f:
+            first_line = f.readline()
+        try:
+            header = json.loads(first_line)
+        except ValueError:
+            header = None
+
+        if isinstance(header, dict) and header.get("format") == MemorySnapshotWriter.FORMAT:
+            if header.get("version", 0) > MemorySnapshotWriter.VERSION:
+                raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+            trailer = self._read_trailer()
+            if trailer is None:
+                raise ValueError(f"Snapshot is incomplete: {path}")
+            self.header = header
+            self.count = int(trailer["count"])
+            return
+
+        # Single-document JSON export
+        with open(path, "r", encoding="utf-8-sig") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or "documents" not in data or "embeddings" not in data:
+            raise ValueError(f"Invalid memory export file: {path}")
+        self._legacy = data
+        self.count = min(len(data["documents"]), len(data["embeddings"]))
+        dim = len(data["embeddings"][0]) if self.count else None
+        self.header = {"model_name": data.get("model_name"), "dim": dim,
+                       "count": self.count, "timestamp": data.get("timestamp")}
+
+    def _read_trailer(self) -> Optional[Dict[str, Any]]:
+        """Read the trailer line of a snapshot, or None if it is missing"""
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - self.TAIL_BYTES))
+            lines = f.read().splitlines()
+        if not lines:
+            return None
+        try:
+            trailer = json.loads(lines[-1].decode("utf-8"))
+        except ValueError:
+            return None
+        return trailer if isinstance(trailer, dict) and trailer.get("end") else None
+
+    def chunks(self, rows: int) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray]]:
+        """
+        Iterate over the documents in chunks
+
+        Args:
+            rows: Maximum number of documents per chunk
+
+        Yields:
+            Tuples of (document metadata, float32 embedding matrix)
+        """
+        if self._legacy is not None:
+            documents, embeddings = self._legacy["documents"], self._legacy["embeddings"]
+            for start in range(0, self.count, rows):
+                end = min(start + rows, self.count)
+                yield documents[start:end], np.asarray(embeddings[start:end], dtype=np.float32)
+            return
+
+        documents, vectors = [], []
+        with open(self.path, "r", encoding="utf-8-sig") as f:
+            f.readline()  # header
+            for line in f:
+                record = json.loads(line)
+                if record.get("end"):
+                    break
+                documents.append(record["document"])
+                vectors.append(np.frombuffer(base64.b64decode(record["embedding"]), dtype="<f4"))
+                if len(documents) >= rows:
+                    yield documents, np.stack(vectors).astype(np.float32)
+                    documents, vectors = [], []
+        if documents:
+            yield documents, np.stack(vectors).astype(np.float32)
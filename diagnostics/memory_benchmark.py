@@ -0,0 +1,317 @@
+"""
+Memory Benchmark for IrintAI Assistant
+
+Measures how the memory system performs as the index grows, for each
+combination of embedding storage type and search mode:
+- Ingestion throughput through MemorySystem.batch()
+- save_index and load_index time
+- search latency (p50 / p99)
+- Resident memory of the process and size of the index
+- Recall@k against exact float32 search over the same embeddings
+
+A synthetic corpus is generated from a fixed seed. By default texts are
+embedded with the deterministic hashing backend, so the benchmark runs
+offline and without a model; --model uses a local sentence transformer
+instead, through the embedding backend chosen with --backend. Results
+are printed and can be written as JSON to compare releases.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# Add project root to sys.path to allow importing core modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.memory_system import MemorySystem
+from core.embedding_backends import HashingBackend, load_embedding_backend
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_CONFIGS = ["float32:exact", "float16:exact", "int8:exact", "float32:ivf", "int8:ivf"]
+
+class SyntheticCorpus:
+    """Topic-structured random documents and queries"""
+
+    def __init__(self, topics: int = 50, vocabulary: int = 20000, words_per_doc: int = 60, seed: int = 0):
+        """
+        Initialize the corpus generator
+
+        Args:
+            topics: Number of topics; each has its own word distribution
+            vocabulary: Number of distinct words
+            words_per_doc: Average words per document
+            seed: Random seed
+        """
+        self.rng = np.random.default_rng(seed)
+        self.words = np.array([f"w{i}" for i in range(vocabulary)])
+        self.words_per_doc = words_per_doc
+
+        # Zipf-like word weights, shuffled per topic
+        weights = 1.0 / np.arange(1, vocabulary + 1)
+        self.topic_words = [self.rng.permutation(vocabulary) for _ in range(topics)]
+        self.weights = weights / weights.sum()
+
+    def text(self, length: Optional[int] = None) -> str:
+        """Generate one text from a random topic"""
+        topic = self.topic_words[self.rng.integers(len(self.topic_words))]
+        length = length or max(5, int(self.rng.poisson(self.words_per_doc)))
+        ids = topic[self.rng.choice(len(self.weights), size=length, p=self.weights)]
+        return " ".join(self.words[ids])
+
+    def documents(self, count: int) -> List[str]:
+        """Generate documents"""
+        return [self.text() for _ in range(count)]
+
+    def queries(self, count: int) -> List[str]:
+        """Generate short queries"""
+        return [self.text(length=8) for _ in range(count)]
+
+class MemoryBenchmark:
+    """Benchmark MemorySystem across storage types and search modes"""
+
+    def __init__(self, docs: int = 20000, queries: int = 200, top_k: int = 10,
+                 configs: Optional[List[str]] = None, model: Optional[str] = None,
+                 backend: str = "sentence_transformer", dim: int = 384, seed: int = 0,
+                 work_dir: Optional[str] = None):
+        """
+        Initialize the benchmark
+
+        Args:
+            docs: Number of documents in the corpus
+            queries: Number of timed queries
+            top_k: Results per query, also the k of recall@k
+            configs: "storage:search_mode" combinations to measure
+            model: Sentence transformer to embed with instead of the
+                hashing backend
+            backend: Embedding backend used with `model`
+            dim: Dimension of the hashing backend
+            seed: Corpus random seed
+            work_dir: Directory for the benchmark indexes, a temporary
+                directory by default
+        """
+        self.docs = docs
+        self.queries = queries
+        self.top_k = top_k
+        self.configs = configs or DEFAULT_CONFIGS
+        self.model = model
+        self.backend = backend
+        self.dim = dim
+        self.seed = seed
+        self.work_dir = work_dir
+        self.results = {}
+
+    def log(self, message):
+        """Simple print-based logging for diagnostics"""
+        print(f"[MEMORY BENCH] {message}")
+
+    def _embedder(self):
+        """Get the embedding model used by every configuration"""
+        if self.model:
+            return load_embedding_backend(self.backend, self.model)
+        return HashingBackend(dim=self.dim)
+
+    @staticmethod
+    def _rss() -> Optional[int]:
+        """Resident set size of this process in bytes"""
+        if psutil is None:
+            return None
+        return psutil.Process().memory_info().rss
+
+    @staticmethod
+    def _percentile(values: List[float], q: float) -> float:
+        """Percentile of a list of values"""
+        return float(np.percentile(values, q)) if values else 0.0
+
+    def _exact_reference(self, embedder, texts: List[str], queries: List[str]) -> List[List[int]]:
+        """Top-k document ids of every query by exact float32 search"""
+        vectors = []
+        for start in range(0, len(texts), MemorySystem.EMBED_BATCH_SIZE):
+            vectors.append(torch.as_tensor(embedder.encode(texts[start:start + MemorySystem.EMBED_BATCH_SIZE],
+                                                           convert_to_tensor=True)).float().cpu())
+        matrix = F.normalize(torch.cat(vectors), dim=1)
+        query_vectors = F.normalize(torch.as_tensor(embedder.encode(queries, convert_to_tensor=True)).float().cpu(), dim=1)
+        return torch.topk(query_vectors @ matrix.T, k=min(self.top_k, len(texts)), dim=1).indices.tolist()
+
+    def _run_config(self, config: str, embedder, texts: List[str], queries: List[str],
+                    reference: List[List[int]], directory: str) -> Dict[str, Any]:
+        """Measure one storage:search_mode combination"""
+        storage, _, search_mode = config.partition(":")
+        search_mode = search_mode or "exact"
+        index_path = os.path.join(directory, config.replace(":", "_"), "vector_store.json")
+        quiet = lambda message: None
+
+        gc.collect()
+        rss_before = self._rss()
+
+        # Ingestion
+        memory_system = MemorySystem(index_path=index_path, logger=quiet, search_mode=search_mode,
+                                     use_embedding_cache=False, storage_dtype=storage)
+        memory_system.model = embedder
+        memory_system.model_state = MemorySystem.MODEL_LOADED
+
+        start_time = time.perf_counter()
+        with memory_system.batch() as batch:
+            for i, text in enumerate(texts):
+                memory_system.add_to_index([text], [{"source": f"doc{i % 100}.txt", "text": text, "doc": i}])
+        ingest_time = time.perf_counter() - start_time
+        if not batch.success:
+            raise RuntimeError(f"Ingestion failed for {config}")
+
+        start_time = time.perf_counter()
+        memory_system.save_index()
+        save_time = time.perf_counter() - start_time
+        del memory_system
+        gc.collect()
+
+        # Loading
+        start_time = time.perf_counter()
+        memory_system = MemorySystem(index_path=index_path, logger=quiet, search_mode=search_mode,
+                                     use_embedding_cache=False, storage_dtype=storage)
+        load_time = time.perf_counter() - start_time
+        memory_system.model = embedder
+        memory_system.model_state = MemorySystem.MODEL_LOADED
+
+        # Search latency and recall
+        latencies, hits, total = [], 0, 0
+        for query, expected in zip(queries, reference):
+            start_time = time.perf_counter()
+            results = memory_system.search(query, top_k=self.top_k)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            hits += len({result["doc"] for result in results} & set(expected))
+            total += len(expected)
+
+        rss_after = self._rss()
+        stats = memory_system.get_stats()
+        return {
+            "storage": storage,
+            "search_mode": search_mode,
+            "ivf_trained": memory_system.ann_index.is_trained(),
+            "ingest_docs_per_sec": len(texts) / ingest_time if ingest_time else None,
+            "ingest_seconds": ingest_time,
+            "save_seconds": save_time,
+            "load_seconds": load_time,
+            "search_p50_ms": self._percentile(latencies, 50),
+            "search_p99_ms": self._percentile(latencies, 99),
+            "search_mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+            f"recall@{self.top_k}": hits / total if total else 1.0,
+            "index_bytes": stats["index_bytes"],
+            "rss_bytes": rss_after,
+            "rss_delta_bytes": rss_after - rss_before if rss_after is not None and rss_before is not None else None,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the benchmark
+
+        Returns:
+            Report dictionary with the environment, parameters and one
+            result per configuration
+        """
+        embedder = self._embedder()
+        corpus = SyntheticCorpus(seed=self.seed)
+        self.log(f"Generating {self.docs} documents and {self.queries} queries")
+        texts = corpus.documents(self.docs)
+        queries = corpus.queries(self.queries)
+        reference = self._exact_reference(embedder, texts, queries)
+
+        self.results = {
+            "status": "Success",
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "environment": {
+                "python": platform.python_version(),
+                "torch": torch.__version__,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "torch_threads": torch.get_num_threads(),
+            },
+            "parameters": {
+                "docs": self.docs,
+                "queries": self.queries,
+                "top_k": self.top_k,
+                "embedder": f"{self.backend}:{self.model}" if self.model else f"hashing-{self.dim}",
+                "seed": self.seed,
+            },
+            "configs": {},
+        }
+
+        directory = self.work_dir or tempfile.mkdtemp(prefix="irintai_bench_")
+        try:
+            for config in self.configs:
+                self.log(f"Running {config}")
+                try:
+                    result = self._run_config(config, embedder, texts, queries, reference, directory)
+                except Exception as e:
+                    self.log(f"{config} failed: {e}")
+                    result = {"error": str(e)}
+                    self.results["status"] = "Partial"
+                self.results["configs"][config] = result
+        finally:
+            if self.work_dir is None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+        for config, result in self.results["configs"].items():
+            if "error" in result:
+                continue
+            self.log(
+                f"{config:>14}: ingest {result['ingest_docs_per_sec']:9.0f} docs/s  "
+                f"save {result['save_seconds']:6.2f} s  load {result['load_seconds']:6.2f} s  "
+                f"search p50 {result['search_p50_ms']:7.2f} ms  p99 {result['search_p99_ms']:7.2f} ms  "
+                f"recall@{self.top_k} {result[f'recall@{self.top_k}']:.4f}  "
+                f"index {result['index_bytes'] / 1024 / 1024:8.2f} MB"
+            )
+        return self.results
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark memory system ingestion, persistence and search")
+    parser.add_argument("--docs", type=int, default=20000, help="Number of synthetic documents")
+    parser.add_argument("--queries", type=int, default=200, help="Number of timed queries")
+    parser.add_argument("--top-k", type=int, default=10, help="Results per query and k of recall@k")
+    parser.add_argument("--configs", default=",".join(DEFAULT_CONFIGS),
+                        help="Comma-separated storage:search_mode combinations")
+    parser.add_argument("--model", help="Local sentence transformer to embed with instead of the hashing backend")
+    parser.add_argument("--backend", default="sentence_transformer",
+                        help="Embedding backend used with --model: sentence_transformer or cpu")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of the hashing backend")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument("--work-dir", help="Keep the benchmark indexes in this directory")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    benchmark = MemoryBenchmark(
+        docs=args.docs,
+        queries=args.queries,
+        top_k=args.top_k,
+        configs=[config.strip() for config in args.configs.split(",") if config.strip()],
+        model=args.model,
+        backend=args.backend,
+        dim=args.dim,
+        seed=args.seed,
+        work_dir=args.work_dir,
+    )
+    results = benchmark.run()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        benchmark.log(f"Report written to {args.json}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -39,7 +39,7 @@ class MemoryDiagnostic:
             self.config_loaded = True
             
             # Get memory paths
-            self.chat_history_path = self.config_manager.get("memory", {}).get("chat_history_path", "data/chat_history.json")
+            self.chat_history_path = self.config_manager.get("memory", {}).get("chat_history_path", "data/chat_history.jsonl")
             if not os.path.isabs(self.chat_history_path):
                 self.chat_history_path = os.path.join(project_root, self.chat_history_path)
                 
@@ -54,7 +54,7 @@ class MemoryDiagnostic:
         except Exception as e:
             self.config_loaded = False
             # Set default paths
-            self.chat_history_path = os.path.join(project_root, "data/chat_history.json")
+            self.chat_history_path = os.path.join(project_root, "data/chat_history.jsonl")
             self.vector_store_path = os.path.join(project_root, "data/vector_store")
             self.reflections_path = os.path.join(project_root, "data/reflections")
             print(f"Error loading configuration: {e}")        # Try to initialize memory system but catch any exceptions
@@ -75,6 +75,12 @@ class MemoryDiagnostic:
     
     def check_chat_history_file(self):
         """Check if the chat history file exists and is valid JSON"""
+        # Histories are kept in a JSON lines journal; older configs name the
+        # legacy JSON file it replaced
+        journal_path = os.path.splitext(self.chat_history_path)[0] + ".jsonl"
+        if os.path.exists(journal_path):
+            self.chat_history_path = journal_path
+            
         self.log(f"Checking chat history file: {self.chat_history_path}")
         
         # Check if file exists
@@ -98,8 +104,11 @@ class MemoryDiagnostic:
             
         # Check if file is valid JSON
         try:
-            with open(self.chat_history_path, 'r') as f:
-                chat_history = json.load(f)
+            with open(self.chat_history_path, 'r', encoding='utf-8') as f:
+                if self.chat_history_path.endswith(".jsonl"):
+                    chat_history = [json.loads(line) for line in f if line.strip()]
+                else:
+                    chat_history = json.load(f)
                 
             # Check if chat history has the expected structure
             if not isinstance(chat_history, list):
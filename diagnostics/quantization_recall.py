@@ -0,0 +1,155 @@
+"""
+Quantization Recall Diagnostic for IrintAI Assistant
+
+Measures what the compact embedding storage types cost in search quality
+on the local memory index:
+- Resident size of the index for float32, float16 and int8 storage
+- Recall@k of each compact type against exact float32 search
+- Score error and query latency
+
+Queries are sampled from the stored embeddings themselves, so no embedding
+model is needed. Each query's own row is excluded from the results.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, Any, List, Optional
+
+import torch
+
+# Add project root to sys.path to allow importing core modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.memory_system import MemorySystem
+from core.embedding_index import EmbeddingMatrix
+
+class QuantizationRecallDiagnostic:
+    """Compare compact embedding storage types against float32"""
+
+    def __init__(self, index_path: str = 'data/vector_store/vector_store.json',
+                 queries: int = 200, top_k: int = 10, seed: int = 0):
+        """
+        Initialize the diagnostic
+
+        Args:
+            index_path: Path of the memory index to measure
+            queries: Number of stored rows used as queries
+            top_k: Number of results compared per query
+            seed: Random seed for the query sample
+        """
+        if not os.path.isabs(index_path):
+            index_path = os.path.join(project_root, index_path)
+        self.index_path = index_path
+        self.queries = queries
+        self.top_k = top_k
+        self.seed = seed
+        self.results = {}
+
+    def log(self, message):
+        """Simple print-based logging for diagnostics"""
+        print(f"[QUANT DIAG] {message}")
+
+    def _search(self, index: EmbeddingMatrix, query_rows: torch.Tensor, queries: torch.Tensor):
+        """Run all queries against an index, excluding each query's own row"""
+        scores, ids = [], []
+        start_time = time.perf_counter()
+        for row, query in zip(query_rows.tolist(), queries):
+            top_scores, top_ids = index.top_k(query, self.top_k + 1)
+            keep = top_ids != row
+            scores.append(top_scores[keep][:self.top_k])
+            ids.append(top_ids[keep][:self.top_k])
+        elapsed = time.perf_counter() - start_time
+        return scores, ids, elapsed / max(1, len(ids))
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the comparison
+
+        Returns:
+            Dictionary of results per storage type
+        """
+        memory_system = MemorySystem(index_path=self.index_path, logger=lambda message: None,
+                                     use_embedding_cache=False, storage_dtype="float32")
+        reference = memory_system.index
+        count = len(reference)
+        if count < 2:
+            self.log(f"Index at {self.index_path} has too few rows to measure ({count})")
+            self.results = {"status": "Skipped", "rows": count}
+            return self.results
+
+        self.log(f"Measuring {count} rows of dimension {reference.dim}")
+        generator = torch.Generator().manual_seed(self.seed)
+        query_rows = torch.randperm(count, generator=generator)[:min(self.queries, count)]
+        queries = reference[query_rows]
+
+        ref_scores, ref_ids, ref_latency = self._search(reference, query_rows, queries)
+
+        self.results = {
+            "status": "Success",
+            "rows": count,
+            "dim": reference.dim,
+            "queries": len(query_rows),
+            "top_k": self.top_k,
+            "storage": {
+                "float32": {
+                    "bytes": reference.nbytes(),
+                    "recall": 1.0,
+                    "mean_score_error": 0.0,
+                    "latency_ms": ref_latency * 1000,
+                }
+            },
+        }
+
+        for storage in ("float16", "int8"):
+            compact = EmbeddingMatrix.from_array(reference.matrix(), storage=storage)
+            scores, ids, latency = self._search(compact, query_rows, queries)
+
+            hits = sum(len(set(a.tolist()) & set(b.tolist())) for a, b in zip(ids, ref_ids))
+            total = sum(len(b) for b in ref_ids)
+
+            # Score error of the compact representation on the reference results
+            errors = [
+                (compact[b] @ compact.prepare_query(q) - s).abs().mean().item()
+                for q, b, s in zip(queries, ref_ids, ref_scores) if len(b)
+            ]
+
+            self.results["storage"][storage] = {
+                "bytes": compact.nbytes(),
+                "recall": hits / total if total else 1.0,
+                "mean_score_error": sum(errors) / len(errors) if errors else 0.0,
+                "latency_ms": latency * 1000,
+            }
+
+        for storage, result in self.results["storage"].items():
+            self.log(
+                f"{storage:>8}: {result['bytes'] / 1024 / 1024:8.2f} MB  "
+                f"recall@{self.top_k} {result['recall']:.4f}  "
+                f"score error {result['mean_score_error']:.5f}  "
+                f"{result['latency_ms']:.2f} ms/query"
+            )
+        return self.results
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Measure recall loss of compact embedding storage")
+    parser.add_argument("--index", default="data/vector_store/vector_store.json", help="Memory index path")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries")
+    parser.add_argument("--top-k", type=int, default=10, help="Results compared per query")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    diagnostic = QuantizationRecallDiagnostic(args.index, queries=args.queries, top_k=args.top_k)
+    results = diagnostic.run()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        diagnostic.log(f"Results written to {args.json}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -152,7 +152,17 @@ def main():
         event_bus.start()  # Start the asynchronous event processing        # Initialize MemorySystem
         memory_system = MemorySystem(
             index_path="data/vector_store/vector_store.json",
-            logger=logger.log
+            logger=logger.log,
+            search_mode=config_manager.get("memory.search_mode", "exact"),
+            ann_nprobe=config_manager.get("memory.ann_nprobe", 8),
+            storage_dtype=config_manager.get("memory.storage_dtype", "float32"),
+            retrieval_mode=config_manager.get("memory.retrieval_mode", "vector"),
+            hybrid_alpha=config_manager.get("memory.hybrid_alpha", 0.6),
+            embedding_workers=config_manager.get("memory.embedding_workers", 0),
+            embedding_batch_size=config_manager.get("memory.embedding_batch_size", 512),
+            query_cache_size=config_manager.get("memory.query_cache_size", 256),
+            embedding_backend=config_manager.get("memory.embedding_backend", "sentence_transformer"),
+            embedding_threads=config_manager.get("memory.embedding_threads", 0)
         )
 
         # Initialize DependencyManager for plugin dependencies
@@ -162,8 +172,11 @@ def main():
         chat_engine = ChatEngine(
             model_manager=model_manager,
             memory_system=memory_system,
-            session_file="data/chat_history.json",
-            logger=logger.log
+            session_file="data/chat_history.jsonl",
+            logger=logger.log,
+            ollama_url=config_manager.get("ollama_url", None),
+            reuse_context=config_manager.get("reuse_context", True),
+            tokenizer=config_manager.get("prompt_tokenizer", None)
         )
         
         # Create file operations utility with proper sandboxing
@@ -205,6 +218,10 @@ def main():
         # Log application start
         logger.log("Irintai Assistant started successfully")
         
+        # Optionally warm up the embedding model once the window is up
+        if config_manager.get("memory.preload_model", False):
+            root.after(500, memory_system.start_background_load)
+        
         # Auto-load plugins if configured
         if config_manager.get("plugins.auto_load", True):
             def delayed_plugin_loading():
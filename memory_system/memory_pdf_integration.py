@@ -93,14 +93,19 @@ class EnhancedMemoryFileHandler:
         for ext in extensions:
             all_files.extend(self.file_ops.get_files_by_type(folder_path, ext))
             
-        # Process each file
+        # Process each file, embedding and saving them together at the end
         processed = 0
         successful = 0
         
-        for file_path in all_files:
-            processed += 1
-            if self.add_file_to_memory(file_path):
-                successful += 1
+        with self.memory_system.batch() as batch:
+            for file_path in all_files:
+                processed += 1
+                if self.add_file_to_memory(file_path):
+                    successful += 1
+                    
+        if batch.success is False:
+            self.logger("[Memory PDF] Failed to save folder contents to memory")
+            successful = 0
                 
         return processed, successful
 
@@ -5,21 +5,203 @@ import os
 import subprocess
 import json
 import re  # For stripping ANSI escape codes
-from typing import Dict, Any, Tuple, Optional, Callable
+import threading
+from typing import Dict, Any, List, Tuple, Optional, Callable, Iterator
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+# Generation parameters passed to the REST API as options; "context" is the
+# context window size in the CLI parameter names
+OPTION_NAMES = {"temperature", "top_p", "top_k", "repeat_penalty", "seed", "num_ctx", "num_predict"}
+
+# One keep-alive connection pool per server, shared by all clients
+_sessions: Dict[str, Any] = {}
+_sessions_lock = threading.Lock()
+
+def _get_session(base_url: str):
+    """Get the pooled HTTP session of an Ollama server"""
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+        return session
+
+class OllamaUnavailableError(Exception):
+    """The Ollama REST API could not be reached"""
 
 class OllamaClient:
     """Provides direct access to Ollama API for generating text responses"""
     
-    def __init__(self, logger: Optional[Callable] = None):
+    def __init__(self, logger: Optional[Callable] = None, base_url: Optional[str] = None,
+                 use_http: bool = True, timeout: float = 300.0):
         """
         Initialize the Ollama client
         
         Args:
             logger: Optional logging function
+            base_url: Ollama server URL, defaults to $OLLAMA_HOST or
+                http://localhost:11434
+            use_http: Generate through the REST API, falling back to the
+                ollama CLI when the server cannot be reached
+            timeout: Seconds to wait for the next piece of a response
         """
         self.log = logger or print
+        base_url = base_url or os.environ.get("OLLAMA_HOST") or DEFAULT_OLLAMA_URL
+        if "://" not in base_url:
+            base_url = f"http://{base_url}"
+        self.base_url = base_url.rstrip("/")
+        self.use_http = use_http and requests is not None
+        self.timeout = timeout
+        
+        # Final record of the last REST generation (timings, token counts)
+        self.last_result: Dict[str, Any] = {}
+        
+    def generate(self, model: str, prompt: str, params: Dict[str, Any] = None,
+                 on_token: Optional[Callable[[str], None]] = None,
+                 context: Optional[List[int]] = None) -> Tuple[bool, str]:
+        """
+        Generate a response for a prompt
+        
+        The REST API is used over a pooled keep-alive connection and the
+        response is streamed. If the server cannot be reached, the prompt
+        is run through the ollama CLI instead.
+        
+        Args:
+            model: Model name
+            prompt: The prompt to send
+            params: Optional parameters for generation
+            on_token: Optional callback receiving each piece of the
+                response as it arrives
+            context: Optional "context" of an earlier REST generation with
+                the same model; the prompt then continues that conversation
+                and only its own tokens are evaluated
+            
+        Returns:
+            Tuple of (success, response)
+        """
+        self.last_result = {}
+        if self.use_http:
+            try:
+                return self.generate_http(model, prompt, params, on_token, context)
+            except OllamaUnavailableError as e:
+                self.log(f"[Ollama] API not reachable at {self.base_url} ({e}), using the CLI")
+        
+        # The CLI cannot continue a context; the caller sends the full
+        # conversation again once last_result has no context to reuse
+        if context:
+            return False, "Context continuation needs the Ollama API"
+        success, response = self.generate_cli(model, prompt, params)
+        if success and on_token and response:
+            on_token(response)
+        return success, response
+    
+    def stream_generate(self, model: str, prompt: str, params: Dict[str, Any] = None,
+                        context: Optional[List[int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a generation from the REST API
+        
+        Args:
+            model: Model name
+            prompt: The prompt to send
+            params: Optional parameters for generation
+            context: Optional context of an earlier generation to continue
+            
+        Yields:
+            Response records as sent by /api/generate; the last one has
+            "done" set
+            
+        Raises:
+            OllamaUnavailableError: If the server cannot be reached
+            requests.RequestException: If the request fails later on
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        if context:
+            payload["context"] = context
+        options = {}
+        for key, value in (params or {}).items():
+            if key in OPTION_NAMES:
+                options[key] = value
+            elif key == "context":
+                options["num_ctx"] = value
+        if options:
+            payload["options"] = options
+            
+        try:
+            response = _get_session(self.base_url).post(
+                f"{self.base_url}/api/generate", json=payload, stream=True,
+                timeout=(5, self.timeout))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise OllamaUnavailableError(str(e)) from e
+            
+        # The body is read to its end even after the "done" record, so the
+        # connection goes back to the pool instead of being closed
+        with response:
+            if response.status_code != 200:
+                try:
+                    error = response.json().get("error")
+                except ValueError:
+                    error = None
+                yield {"error": error or f"HTTP {response.status_code}", "done": True}
+                return
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                yield json.loads(line)
+    
+    def generate_http(self, model: str, prompt: str, params: Dict[str, Any] = None,
+                      on_token: Optional[Callable[[str], None]] = None,
+                      context: Optional[List[int]] = None) -> Tuple[bool, str]:
+        """
+        Generate a response through the REST API
+        
+        The final record, including the "context" tokens that continue the
+        conversation, is kept in last_result.
         
-    def generate(self, model: str, prompt: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        Args:
+            model: Model name
+            prompt: The prompt to send
+            params: Optional parameters for generation
+            on_token: Optional callback receiving each piece of the response
+            context: Optional context of an earlier generation to continue
+            
+        Returns:
+            Tuple of (success, response)
+            
+        Raises:
+            OllamaUnavailableError: If the server cannot be reached
+        """
+        self.log(f"[Ollama] Generating with {model} via {self.base_url}")
+        pieces = []
+        try:
+            for record in self.stream_generate(model, prompt, params, context):
+                if record.get("error"):
+                    self.log(f"[Error] Model error: {record['error']}")
+                    return False, record["error"]
+                piece = record.get("response", "")
+                if piece:
+                    pieces.append(piece)
+                    if on_token:
+                        on_token(piece)
+                if record.get("done"):
+                    self.last_result = {key: value for key, value in record.items() if key != "response"}
+        except OllamaUnavailableError:
+            raise
+        except Exception as e:
+            self.log(f"[Error] Failed to generate response: {e}")
+            return False, f"Error: {str(e)}"
+        return True, "".join(pieces).strip()
+        
+    def generate_cli(self, model: str, prompt: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
         """
         Generate a response by invoking Ollama's run subcommand with prompt as argument
         Strips ANSI escape sequences from model output.
@@ -319,3 +501,52 @@ class OllamaClient:
         except Exception as e:
             self.log(f"[Ollama] Exception getting model info: {e}")
             return False, {"error": str(e)}
+
+    def get_model_file(self, model_name: str) -> Optional[str]:
+        """
+        Get the path of a model's GGUF weights file
+
+        The path is read from the FROM line of the model's Modelfile, so it
+        is only usable when the server runs on this machine.
+
+        Args:
+            model_name: Name of the model
+
+        Returns:
+            Path of the weights file, or None if the model has none here
+
+        Raises:
+            OllamaUnavailableError: If the server cannot be reached, does
+                not answer in time or fails, so the lookup may succeed later
+        """
+        modelfile = ""
+        if self.use_http:
+            try:
+                response = _get_session(self.base_url).post(
+                    f"{self.base_url}/api/show", json={"model": model_name}, timeout=(5, 30))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise OllamaUnavailableError(str(e)) from e
+            if response.status_code >= 500:
+                raise OllamaUnavailableError(f"HTTP {response.status_code}")
+            if response.status_code != 200:
+                self.log(f"[Ollama] Could not read the Modelfile of {model_name}: HTTP {response.status_code}")
+                return None
+            modelfile = response.json().get("modelfile", "")
+        else:
+            try:
+                result = subprocess.run(
+                    ["ollama", "show", "--modelfile", model_name],
+                    capture_output=True,
+                    text=True,
+                    env=os.environ.copy()
+                )
+            except OSError as e:
+                self.log(f"[Ollama] Could not read the Modelfile of {model_name}: {e}")
+                return None
+            if result.returncode == 0:
+                modelfile = result.stdout
+
+        match = re.search(r"^FROM\s+(\S+)", modelfile, re.MULTILINE | re.IGNORECASE)
+        if match and os.path.isfile(match.group(1)):
+            return match.group(1)
+        return None
@@ -0,0 +1,189 @@
+"""
+Tests for the Ollama client's REST generation path.
+
+A local HTTP server stands in for Ollama's /api/generate endpoint, so
+streaming, connection reuse and the CLI fallback are tested without
+Ollama installed.
+"""
+
+import unittest
+import os
+import sys
+import json
+import socket
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from plugins.ollama_hub.core.ollama_client import OllamaClient, OllamaUnavailableError
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Streams a canned /api/generate response as chunked NDJSON"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        self.server.requests.append(payload)
+        self.server.connections.add(self.client_address)
+
+        if self.path == "/api/show":
+            body = json.dumps({"modelfile": self.server.modelfile}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if payload["model"] == "missing":
+            body = json.dumps({"error": "model 'missing' not found"}).encode()
+            self.send_response(404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        records = [{"response": piece, "done": False} for piece in self.server.pieces]
+        context = payload.get("context", []) + [len(self.server.requests)]
+        records.append({"response": "", "done": True, "eval_count": len(self.server.pieces),
+                        "context": context})
+        for record in records:
+            line = (json.dumps(record) + "\n").encode()
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+class TestOllamaClientHTTP(unittest.TestCase):
+    """Test cases for generation through the REST API"""
+
+    def setUp(self):
+        """Start the mock server"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MockOllamaHandler)
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.pieces = ["Hello", ", ", "world", "!"]
+        self.server.modelfile = ""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        host, port = self.server.server_address
+        self.client = OllamaClient(logger=MagicMock(), base_url=f"http://{host}:{port}")
+
+    def tearDown(self):
+        """Stop the mock server"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_streams_tokens_in_order(self):
+        """Test that pieces reach the callback as they arrive and are joined"""
+        tokens = []
+        success, response = self.client.generate("llama3", "Hi", on_token=tokens.append)
+
+        self.assertTrue(success)
+        self.assertEqual(response, "Hello, world!")
+        self.assertEqual(tokens, ["Hello", ", ", "world", "!"])
+        self.assertEqual(self.client.last_result.get("eval_count"), 4)
+
+    def test_sends_prompt_and_options(self):
+        """Test the request payload"""
+        self.client.generate("llama3", "Hi", {"temperature": 0.2, "context": 8192, "unknown": 1})
+
+        payload = self.server.requests[0]
+        self.assertEqual(payload["model"], "llama3")
+        self.assertEqual(payload["prompt"], "Hi")
+        self.assertTrue(payload["stream"])
+        self.assertEqual(payload["options"], {"temperature": 0.2, "num_ctx": 8192})
+
+    def test_continues_context(self):
+        """Test that the returned context is kept and can be sent back"""
+        self.client.generate("llama3", "Hi")
+        context = self.client.last_result.get("context")
+        self.assertEqual(context, [1])
+        self.assertNotIn("context", self.server.requests[0])
+
+        success, _ = self.client.generate("llama3", "And then?", context=context)
+
+        self.assertTrue(success)
+        self.assertEqual(self.server.requests[1]["context"], [1])
+        self.assertEqual(self.client.last_result.get("context"), [1, 2])
+
+    def test_reuses_connection(self):
+        """Test that consecutive generations share one keep-alive connection"""
+        for _ in range(3):
+            success, _ = OllamaClient(logger=MagicMock(), base_url=self.client.base_url).generate("llama3", "Hi")
+            self.assertTrue(success)
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_reports_server_error(self):
+        """Test that an error from the server fails without using the CLI"""
+        with patch("plugins.ollama_hub.core.ollama_client.subprocess.run") as run:
+            success, response = self.client.generate("missing", "Hi")
+
+        self.assertFalse(success)
+        self.assertIn("not found", response)
+        run.assert_not_called()
+
+    def test_falls_back_to_cli(self):
+        """Test that the CLI is used when the server cannot be reached"""
+        # A port nothing listens on
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        client = OllamaClient(logger=MagicMock(), base_url=f"http://127.0.0.1:{port}")
+
+        result = MagicMock(stdout="From the CLI\n", stderr="")
+        tokens = []
+        with patch("plugins.ollama_hub.core.ollama_client.subprocess.run", return_value=result) as run:
+            success, response = client.generate("llama3", "Hi", on_token=tokens.append)
+
+        self.assertTrue(success)
+        self.assertEqual(response, "From the CLI")
+        self.assertEqual(tokens, ["From the CLI"])
+        self.assertEqual(run.call_args[0][0][:3], ["ollama", "run", "llama3"])
+        self.assertEqual(client.last_result, {})
+
+        # A context continuation cannot be run by the CLI
+        with patch("plugins.ollama_hub.core.ollama_client.subprocess.run") as run:
+            success, _ = client.generate("llama3", "Hi", context=[1, 2])
+        self.assertFalse(success)
+        run.assert_not_called()
+
+    def test_finds_model_file(self):
+        """Test that the weights file is read from the Modelfile"""
+        with tempfile.TemporaryDirectory() as tmp:
+            blob = os.path.join(tmp, "sha256-abc")
+            open(blob, "wb").close()
+            self.server.modelfile = f"# FROM llama3:latest\nFROM {blob}\nTEMPLATE {{{{ .Prompt }}}}\n"
+            self.assertEqual(self.client.get_model_file("llama3"), blob)
+            self.assertEqual(self.server.requests[-1], {"model": "llama3"})
+
+            # A server on another machine reports paths that do not exist here
+            self.server.modelfile = f"FROM {os.path.join(tmp, 'missing')}\n"
+            self.assertIsNone(self.client.get_model_file("llama3"))
+
+        # An unreachable server may come up later, so it is not a "no file" answer
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        client = OllamaClient(logger=MagicMock(), base_url=f"http://127.0.0.1:{port}")
+        with self.assertRaises(OllamaUnavailableError):
+            client.get_model_file("llama3")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -63,8 +63,10 @@ class PersonalityBridge:
                         
             chat_engine.unregister_message_modifier = unregister_message_modifier
             
-        # Patch send_message method to apply modifiers if not already patched
-        if not hasattr(chat_engine, "_original_send_message"):
+        # Patch send_message method to apply modifiers if not already patched;
+        # chat engines with apply_message_modifiers run the modifiers themselves
+        if not hasattr(chat_engine, "_original_send_message") and \
+                not hasattr(chat_engine, "apply_message_modifiers"):
             # Save original method
             chat_engine._original_send_message = chat_engine.send_message
             
@@ -108,7 +110,7 @@ class PersonalityBridge:
         
         # Add add_to_index method if not present
         if not hasattr(memory_system, "add_to_index"):
-            def add_to_index(docs, metadata):
+            def add_to_index(docs, metadata, collection=None):
                 if hasattr(memory_system, "log"):
                     memory_system.log("Memory system does not support adding to index", "WARNING")
                 return False
@@ -248,8 +250,8 @@ class PersonalityBridge:
                 "importance": 0.8  # High importance to ensure it's retrieved
             }
             
-            # Add to memory system
-            return memory_system.add_to_index([profile_text], [metadata])
+            # Add to the profiles collection of the memory system
+            return memory_system.add_to_index([profile_text], [metadata], collection="profiles")
             
         except Exception as e:
             if hasattr(self.core_system, "log"):
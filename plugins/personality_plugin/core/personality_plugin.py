@@ -637,7 +637,7 @@ class PersonalityPlugin:
                 f"{'Tagged as: ' + ', '.join(profile.get('tags', []))}."
             )
             
-            # Add to memory
+            # Add to the profiles collection, apart from indexed documents
             memory_system.add_to_index(
                 [memory_text],
                 [{
@@ -645,7 +645,8 @@ class PersonalityPlugin:
                     "text": memory_text,
                     "type": "personality_profile",
                     "profile_name": profile_name
-                }]
+                }],
+                collection="profiles"
             )
             
             self._logger(f"Stored profile '{profile_name}' in memory system", "INFO")
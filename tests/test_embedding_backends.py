@@ -0,0 +1,106 @@
+"""
+Tests for the embedding backend registry and the model-free hashing backend.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import torch
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.embedding_backends as embedding_backends
+from core.embedding_backends import CPUBackend, HashingBackend, get_backend_class, load_embedding_backend
+from core.embedding_cache import EmbeddingCache
+from core.memory_system import MemorySystem
+
+class TestHashingBackend(unittest.TestCase):
+    """Test cases for hashed bag-of-words embeddings"""
+
+    def setUp(self):
+        """Create the backend"""
+        self.backend = load_embedding_backend("hashing", "test")
+
+    def test_embeddings_are_deterministic(self):
+        """Test that the same text always gets the same embedding"""
+        first = self.backend.encode(["the quick brown fox"])
+        second = HashingBackend("test").encode(["The quick  brown\nfox"])
+
+        self.assertEqual(first.shape, (1, 384))
+        self.assertEqual(first.dtype, np.float32)
+        np.testing.assert_array_equal(first, second)
+
+    def test_shared_words_are_similar(self):
+        """Test that texts sharing words score higher than unrelated ones"""
+        embeddings = self.backend.encode(["red apples and pears", "green apples and pears",
+                                          "quantum field theory"], convert_to_tensor=True)
+        embeddings = torch.nn.functional.normalize(embeddings, dim=1)
+
+        self.assertGreater(float(embeddings[0] @ embeddings[1]), float(embeddings[0] @ embeddings[2]))
+
+    def test_encode_shapes(self):
+        """Test single texts, empty lists and the model id"""
+        self.assertEqual(self.backend.encode("one text").shape, (384,))
+        self.assertEqual(self.backend.encode([], convert_to_tensor=True).shape, (0, 384))
+        self.assertEqual(HashingBackend("test", dim=16).encode(["a b c"]).shape, (1, 16))
+        self.assertEqual(self.backend.model_id, "hashing:test")
+        self.assertEqual(HashingBackend.expected_model_id("test"), self.backend.model_id)
+
+    def test_unknown_backend(self):
+        """Test that unknown backend names are rejected"""
+        self.assertIs(get_backend_class("hashing"), HashingBackend)
+        with self.assertRaises(ValueError):
+            get_backend_class("missing")
+
+class TestCPUBackend(unittest.TestCase):
+    """Test cases for the model id of the quantized CPU backend"""
+
+    def setUp(self):
+        """Stand in for the sentence transformer so nothing is downloaded"""
+        patcher = patch("sentence_transformers.SentenceTransformer", return_value=MagicMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.log = MagicMock()
+
+    def test_quantized_model_id(self):
+        """Test that quantized embeddings get their own id"""
+        with patch.object(embedding_backends.torch.ao.quantization, "quantize_dynamic",
+                          side_effect=lambda model, *args, **kwargs: model):
+            backend = CPUBackend("mini", logger=self.log)
+
+        self.assertTrue(backend.quantized)
+        self.assertEqual(backend.model_id, "mini+int8")
+        self.assertEqual(CPUBackend.expected_model_id("mini"), backend.model_id)
+
+    def test_float_fallback_model_id(self):
+        """Test that a failed quantization is logged and keeps the plain id"""
+        with patch.object(embedding_backends.torch.ao.quantization, "quantize_dynamic",
+                          side_effect=RuntimeError("no engine")):
+            backend = CPUBackend("mini", logger=self.log)
+
+        self.assertFalse(backend.quantized)
+        self.assertEqual(backend.model_id, "mini")
+        self.assertIn("no engine", self.log.call_args[0][0])
+
+    def test_memory_switches_to_reported_id(self):
+        """Test that the memory system caches embeddings under the loaded model's id"""
+        with tempfile.TemporaryDirectory() as tmp:
+            memory = MemorySystem(model_name="mini", index_path=os.path.join(tmp, "vector_store.json"),
+                                  logger=self.log, embedding_backend="cpu")
+            self.assertEqual(memory.embedding_id, "mini+int8")
+            with patch.object(embedding_backends.torch.ao.quantization, "quantize_dynamic",
+                              side_effect=RuntimeError("no engine")):
+                self.assertTrue(memory.load_model())
+
+            self.assertEqual(memory.embedding_id, "mini")
+            self.assertEqual(memory.embedding_cache.path, EmbeddingCache(tmp, "mini", logger=self.log).path)
+            self.assertEqual(memory.get_collection("notes").embedding_id, "mini")
+            memory.close()
+
+if __name__ == "__main__":
+    unittest.main()
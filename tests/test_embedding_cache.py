@@ -0,0 +1,123 @@
+"""
+Tests for the persistent content-hash embedding cache.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+import numpy as np
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.embedding_cache import EmbeddingCache, content_hash
+from core.memory_system import MemorySystem
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test cases for storing, reloading and compacting cached embeddings"""
+
+    def setUp(self):
+        """Create a cache in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = self.open_cache()
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.cache = None
+        self.tmp.cleanup()
+
+    def open_cache(self):
+        """Open the cache file of the test model"""
+        return EmbeddingCache(self.tmp.name, "test/model", logger=MagicMock())
+
+    def put_texts(self, texts):
+        """Cache one distinct vector per text"""
+        vectors = np.array([[len(text), i, -1.0] for i, text in enumerate(texts)], dtype=np.float32)
+        self.cache.put([content_hash(text) for text in texts], vectors)
+        return vectors
+
+    def test_lookup_after_reload(self):
+        """Test that entries are found in this and a later session"""
+        vectors = self.put_texts(["alpha", "beta"])
+        found, missing = self.cache.lookup([content_hash("beta"), content_hash("gamma")])
+        np.testing.assert_array_equal(found[0], vectors[1])
+        self.assertEqual(missing, [1])
+
+        # Entries appended after the file was mapped are found too
+        more = self.put_texts(["gamma"])
+        found, _ = self.cache.lookup([content_hash("gamma")])
+        np.testing.assert_array_equal(found[0], more[0])
+
+        self.cache = self.open_cache()
+        found, missing = self.cache.lookup([content_hash("alpha"), content_hash("gamma")])
+        self.assertEqual(missing, [])
+        np.testing.assert_array_equal(found[0], vectors[0])
+        self.assertEqual(len(self.cache), 3)
+
+    def test_discards_torn_record(self):
+        """Test that a partly written record is dropped on load"""
+        self.put_texts(["alpha", "beta"])
+        with open(self.cache.path, "ab") as f:
+            f.write(b"\x01" * 10)
+
+        self.cache = self.open_cache()
+        self.assertEqual(self.cache.lookup([content_hash("beta")])[1], [])
+        self.put_texts(["gamma"])
+        self.cache = self.open_cache()
+        self.assertEqual(len(self.cache.lookup([content_hash(text) for text in ("alpha", "gamma")])[0]), 2)
+
+    def test_compact_drops_unused_entries(self):
+        """Test that compaction keeps only the given texts"""
+        vectors = self.put_texts(["alpha", "beta", "gamma"])
+        size = os.path.getsize(self.cache.path)
+
+        self.assertEqual(self.cache.compact([content_hash("gamma"), None]), 2)
+
+        self.assertEqual(len(self.cache), 1)
+        self.assertLess(os.path.getsize(self.cache.path), size)
+        found, missing = self.cache.lookup([content_hash("alpha"), content_hash("gamma")])
+        self.assertEqual(missing, [0])
+        np.testing.assert_array_equal(found[1], vectors[2])
+        self.assertEqual(self.cache.compact([content_hash("gamma")]), 0)
+
+        self.cache = self.open_cache()
+        self.assertEqual(self.cache.lookup([content_hash("gamma"), content_hash("beta")])[1], [1])
+        self.assertEqual(len(self.cache), 1)
+
+class TestMemoryEmbeddingCache(unittest.TestCase):
+    """Test cases for keeping the cache in step with the store"""
+
+    def setUp(self):
+        """Create a memory system with an embedding cache"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.memory = MemorySystem(model_name="test", index_path=os.path.join(self.tmp.name, "vector_store.json"),
+                                   logger=MagicMock(), embedding_backend="hashing")
+        self.memory.PURGE_RATIO = 2.0
+
+    def tearDown(self):
+        """Close the memory system and remove the temporary directory"""
+        self.memory.close()
+        self.memory = None
+        self.tmp.cleanup()
+
+    def test_purge_drops_cached_embeddings(self):
+        """Test that purged documents leave the cache"""
+        docs = [f"note number {i}" for i in range(6)]
+        self.memory.add_to_index(docs, [{"source": f"s{i % 2}", "text": doc} for i, doc in enumerate(docs)])
+        self.memory.add_reflection("learning", "kept in another collection")
+        cache = self.memory.embedding_cache
+        self.assertEqual(len(cache), 7)
+
+        self.memory.delete_by_source("s0")
+        self.assertTrue(self.memory._purge_deleted())
+
+        self.assertEqual(len(cache), 4)
+        _, missing = cache.lookup([content_hash(doc) for doc in docs])
+        self.assertEqual(missing, [0, 2, 4])
+        self.assertEqual(cache.lookup([content_hash("kept in another collection")])[1], [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Tests for BM25 scoring and hybrid retrieval.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.lexical_index import BM25Index, tokenize
+from core.memory_system import MemorySystem
+
+class TestBM25Index(unittest.TestCase):
+    """Test cases for tokenizing, scoring and selecting matches"""
+
+    def setUp(self):
+        """Index a few short documents"""
+        self.index = BM25Index(logger=MagicMock())
+        for row, text in enumerate(["error ERR-4012 in file_ops.py", "apples and pears",
+                                    "the error log", "pears are green"]):
+            self.index.add(row, text)
+
+    def test_tokenize_keeps_compounds_and_parts(self):
+        """Test that identifiers match whole and by their parts"""
+        self.assertEqual(tokenize("The file_ops.py"), ["file_ops.py", "file", "ops", "py"])
+
+    def test_scores_are_filtered_and_sorted_by_row(self):
+        """Test candidate rows, exclusions and the row count"""
+        matched, scores = self.index.scores("error pears")
+        self.assertEqual(matched.tolist(), [0, 1, 2, 3])
+        self.assertTrue((scores > 0).all())
+
+        matched, _ = self.index.scores("error pears", rows=[1, 2, 3],
+                                       exclude=np.array([False, False, True]), count=3)
+        self.assertEqual(matched.tolist(), [1])
+
+    def test_top_k_orders_best_first(self):
+        """Test that top_k returns the best rows of a single scoring pass"""
+        scores, rows = self.index.top_k("ERR-4012 error", 2)
+        self.assertEqual(rows.tolist(), [0, 2])
+        self.assertGreater(scores[0], scores[1])
+        self.assertEqual(self.index.top_k("bananas", 2)[1].tolist(), [])
+
+class TestHybridSearch(unittest.TestCase):
+    """Test cases for fusing vector and BM25 scores"""
+
+    def setUp(self):
+        """Create a memory system with a few documents"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.memory = MemorySystem(model_name="test", index_path=os.path.join(self.tmp.name, "vector_store.json"),
+                                   logger=MagicMock(), use_embedding_cache=False, embedding_backend="hashing")
+        docs = [f"note {i} about topic{i}" for i in range(20)] + ["fix for ERR-4012 in the parser"]
+        self.memory.add_to_index(docs, [{"source": "notes.txt", "text": doc} for doc in docs])
+
+    def tearDown(self):
+        """Close the memory system and remove the temporary directory"""
+        self.memory.close()
+        self.tmp.cleanup()
+
+    def test_scores_the_query_once(self):
+        """Test that the pooled rows and the normaliser come from one BM25 pass"""
+        lexical_index = self.memory._get_lexical_index()
+        with patch.object(lexical_index, "scores", wraps=lexical_index.scores) as scores:
+            results = self.memory.search("ERR-4012 topic3", top_k=3, mode="hybrid")
+
+        scores.assert_called_once()
+        self.assertEqual(results[0]["text"], "fix for ERR-4012 in the parser")
+        self.assertTrue(all(0.0 <= result["score"] <= 1.0 for result in results))
+
+if __name__ == "__main__":
+    unittest.main()
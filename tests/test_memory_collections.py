@@ -0,0 +1,125 @@
+"""
+Tests for named memory collections.
+
+The memory system uses the hashing embedding backend, so no model is
+downloaded and embeddings are reproducible.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.memory_system import MemorySystem
+
+class TestMemoryCollections(unittest.TestCase):
+    """Test cases for collection isolation, merged search and the legacy split"""
+
+    def setUp(self):
+        """Create an empty memory system in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.tmp.name, "vector_store")
+        self.memory = self.open_memory()
+
+    def tearDown(self):
+        """Close the memory system and remove the temporary directory"""
+        self.memory.close()
+        self.tmp.cleanup()
+
+    def open_memory(self):
+        """Open the default collection"""
+        return MemorySystem(model_name="test", index_path=os.path.join(self.store_dir, "vector_store.json"),
+                            logger=MagicMock(), use_embedding_cache=False, embedding_backend="hashing")
+
+    def reopen(self):
+        """Close the memory system and load it again from disk"""
+        self.memory.close()
+        self.memory = self.open_memory()
+
+    def add(self, text, collection=None, **metadata):
+        """Add one document"""
+        metadata.setdefault("source", "notes.txt")
+        metadata["text"] = text
+        self.assertTrue(self.memory.add_to_index([text], [metadata], collection=collection))
+
+    def test_collections_are_isolated(self):
+        """Test that each collection only holds and finds its own documents"""
+        self.add("apples grow on trees")
+        self.add("bananas grow in bunches", collection="fruit")
+
+        fruit = self.memory.get_collection("fruit")
+        self.assertEqual([doc["text"] for doc in self.memory.documents], ["apples grow on trees"])
+        self.assertEqual([doc["text"] for doc in fruit.documents], ["bananas grow in bunches"])
+        self.assertEqual([result["text"] for result in self.memory.search("bananas bunches")],
+                         ["apples grow on trees"])
+        self.assertEqual([result["text"] for result in fruit.search("apples trees")],
+                         ["bananas grow in bunches"])
+        self.assertTrue(os.path.isdir(os.path.join(self.store_dir, "collections", "fruit")))
+
+        self.reopen()
+        self.assertEqual(self.memory.list_collections(), ["default", "fruit"])
+        self.assertEqual(len(self.memory.documents), 1)
+        self.assertEqual(len(self.memory.get_collection("fruit").documents), 1)
+        self.assertIsNone(self.memory.get_collection("missing", create=False))
+
+    def test_search_merges_collections(self):
+        """Test that a search over several collections labels and ranks results"""
+        self.add("apples grow on trees")
+        self.add("bananas grow in bunches", collection="fruit")
+
+        results = self.memory.search("bunches grow", top_k=2, collections=["default", "fruit"])
+
+        self.assertEqual([result["collection"] for result in results], ["fruit", "default"])
+        self.assertGreaterEqual(results[0]["score"], results[1]["score"])
+        self.assertEqual(self.memory.search("bananas", collections=["missing"]), [])
+
+    def test_reflections_are_kept_apart(self):
+        """Test that reflections go to their own collection"""
+        self.assertIsNotNone(self.memory.add_reflection("learning", "the user prefers short answers"))
+
+        self.assertEqual(len(self.memory.documents), 0)
+        reflections = self.memory.get_collection(MemorySystem.REFLECTIONS_COLLECTION)
+        self.assertEqual(reflections.documents[0]["source"], "reflection")
+        results = self.memory.search("short answers", collections=list(MemorySystem.CHAT_COLLECTIONS))
+        self.assertEqual(results[0]["collection"], MemorySystem.REFLECTIONS_COLLECTION)
+
+    def test_reflection_ids(self):
+        """Test that ids are unique and a repeated reflection returns the stored id"""
+        first = self.memory.add_reflection("learning", "the user prefers short answers")
+        second = self.memory.add_reflection("learning", "the user writes in French")
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.memory.add_reflection("learning", "the user prefers short answers"), first)
+        reflections = self.memory.get_collection(MemorySystem.REFLECTIONS_COLLECTION)
+        self.assertEqual([doc["id"] for doc in reflections.documents], [first, second])
+
+    def test_splits_legacy_rows_once(self):
+        """Test that reflections and profiles stored by older versions are moved"""
+        self.add("apples grow on trees")
+        self.add("the user likes brevity", source="reflection", id="refl_1")
+        self.add("curious and direct", source="profile", subject="personality_profile")
+        marker = os.path.join(self.store_dir, "collections", MemorySystem.LEGACY_SPLIT_MARKER)
+        os.remove(marker)
+
+        self.reopen()
+
+        self.assertTrue(os.path.exists(marker))
+        self.assertEqual([doc["text"] for doc in self.memory.documents], ["apples grow on trees"])
+        reflections = self.memory.get_collection(MemorySystem.REFLECTIONS_COLLECTION)
+        profiles = self.memory.get_collection(MemorySystem.PROFILES_COLLECTION)
+        self.assertEqual([doc["id"] for doc in reflections.documents], ["refl_1"])
+        self.assertEqual([doc["text"] for doc in profiles.documents], ["curious and direct"])
+        self.assertEqual(reflections.search("brevity")[0]["text"], "the user likes brevity")
+
+        # The marker prevents a second move
+        self.add("another old reflection", source="reflection")
+        self.reopen()
+        self.assertEqual(len(self.memory.documents), 2)
+        self.assertEqual(len(self.memory.get_collection(MemorySystem.REFLECTIONS_COLLECTION).documents), 1)
+
+if __name__ == "__main__":
+    unittest.main()
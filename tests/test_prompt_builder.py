@@ -0,0 +1,210 @@
+"""
+Tests for token-budgeted prompt assembly.
+
+A whitespace tokenizer makes token counts exact and easy to reason about.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.prompt_builder import PromptBuilder, TokenCounter
+import core.chat_engine as chat_engine
+
+class WordTokenizer:
+    """One token per whitespace-separated word"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+def make_history(count, words=10):
+    """Build alternating messages of a fixed number of words"""
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": " ".join([f"m{i}"] * words)} for i in range(count)]
+
+class TestTokenCounter(unittest.TestCase):
+    """Test cases for counting and caching"""
+
+    def test_counts_with_tokenizer_and_caches(self):
+        """Test that each text is tokenized once"""
+        tokenizer = WordTokenizer()
+        counter = TokenCounter(tokenizer)
+
+        self.assertEqual(counter.count("one two three"), 3)
+        self.assertEqual(counter.count("one two three"), 3)
+        self.assertEqual(counter.count(""), 0)
+        self.assertEqual(tokenizer.calls, 1)
+        self.assertEqual(counter.stats()["hits"], 1)
+
+    def test_estimate(self):
+        """Test the estimate for words, long words and punctuation"""
+        counter = TokenCounter()
+        self.assertEqual(counter.count("the cat sat"), 3)
+        self.assertEqual(counter.count("Hello, world!"), 4)
+        self.assertGreater(counter.count("internationalization"), 1)
+
+class TestPromptBuilder(unittest.TestCase):
+    """Test cases for templates and budget packing"""
+
+    def setUp(self):
+        """Create a builder that counts words"""
+        self.builder = PromptBuilder(TokenCounter(WordTokenizer()), memory_share=0.5, output_share=0.25)
+
+    def test_template_selection(self):
+        """Test that more specific model names win"""
+        self.assertEqual(self.builder.template_for("codellama:7b").name, "inst")
+        self.assertEqual(self.builder.template_for("llama3:8b").name, "tagged")
+        self.assertEqual(self.builder.template_for("phi3").name, "phi")
+        self.assertEqual(self.builder.template_for("gemma2").name, "generic")
+
+    def test_budget(self):
+        """Test the response reserve"""
+        self.assertEqual(self.builder.budget(2048), 1536)
+        self.assertEqual(self.builder.budget(2048, 48), 2000)
+        self.assertEqual(self.builder.budget(100, 200), 0)
+
+    def test_keeps_recent_history_within_budget(self):
+        """Test that the newest contiguous history fills what is left"""
+        history = make_history(10)
+        assembled = self.builder.build("gemma2", "Be brief.", history, "What now?", context_window=100)
+        stats = assembled.stats
+
+        self.assertLessEqual(stats.total_tokens, stats.budget)
+        self.assertEqual(stats.budget, 75)
+        self.assertEqual(stats.history_messages + stats.dropped_messages, 10)
+        self.assertGreater(stats.dropped_messages, 0)
+
+        # The kept messages are the newest ones, in order
+        text = assembled.text
+        kept = [message["content"] for message in history[stats.dropped_messages:]]
+        positions = [text.index(content) for content in kept]
+        self.assertEqual(positions, sorted(positions))
+        self.assertNotIn(history[stats.dropped_messages - 1]["content"], text)
+        self.assertTrue(text.startswith("System: Be brief."))
+        self.assertTrue(text.endswith("User: What now?\n\nAssistant:"))
+
+    def test_documents_share_the_budget(self):
+        """Test that documents take at most their share and skip what does not fit"""
+        documents = [
+            {"source": "big.txt", "text": " ".join(["big"] * 200)},
+            {"source": "a.txt", "text": "alpha facts"},
+            {"source": "b.txt", "text": "beta facts"},
+        ]
+        assembled = self.builder.build("gemma2", "", make_history(20), "Question?",
+                                       documents=documents, context_window=200)
+        stats = assembled.stats
+
+        self.assertEqual(stats.memory_documents, 2)
+        self.assertEqual(stats.dropped_documents, 1)
+        self.assertLessEqual(stats.memory_tokens, (stats.budget - stats.prompt_tokens) * 0.5)
+        self.assertLessEqual(stats.total_tokens, stats.budget)
+        self.assertIn("From a.txt: alpha facts", assembled.text)
+        self.assertNotIn("big big", assembled.text)
+        self.assertGreater(stats.history_messages, 0)
+
+    def test_prompt_is_kept_over_budget(self):
+        """Test that the system prompt and user message are never dropped"""
+        prompt = " ".join(["word"] * 50)
+        assembled = self.builder.build("gemma2", "System prompt.", make_history(2), prompt, context_window=20)
+
+        self.assertIn(prompt, assembled.text)
+        self.assertEqual(assembled.stats.history_messages, 0)
+        self.assertEqual(assembled.stats.dropped_messages, 2)
+        self.assertGreater(assembled.stats.total_tokens, assembled.stats.budget)
+
+    def test_continuation_holds_only_the_new_turn(self):
+        """Test the turn sent to a model continuing its context"""
+        assembled = self.builder.build_continuation(
+            "llama3", "And then?", [{"source": "a.txt", "text": "alpha"}], context_window=100)
+
+        self.assertTrue(assembled.text.startswith("<|user|>\nRelevant context from documents:\n"))
+        self.assertTrue(assembled.text.endswith("And then?\n<|assistant|>\n"))
+        self.assertEqual(assembled.stats.history_tokens, 0)
+        self.assertEqual(assembled.stats.memory_documents, 1)
+
+class TestChatEngineTokenizer(unittest.TestCase):
+    """Test cases for loading the tokenizer of the selected model"""
+
+    def setUp(self):
+        """Create a chat engine with a stand-in Ollama client"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = MagicMock()
+        self.engine = chat_engine.ChatEngine(MagicMock(), session_file=os.path.join(self.tmp.name, "chat.jsonl"),
+                                             logger=self.log)
+        self.engine._ollama = MagicMock()
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.tmp.cleanup()
+
+    def wait_for_lookups(self):
+        """Wait until no tokenizer is being looked up"""
+        deadline = time.monotonic() + 5
+        while self.engine._resolving and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(self.engine._resolving)
+
+    def test_uses_the_model_tokenizer(self):
+        """Test that the tokenizer is read from the model's weights file once"""
+        self.engine._ollama.get_model_file.return_value = os.path.join("blobs", "sha256-1")
+        tokenizer = WordTokenizer()
+        with patch.object(chat_engine, "load_tokenizer", return_value=tokenizer) as load:
+            self.engine.prepare_tokenizer("llama3")
+            self.wait_for_lookups()
+            builder = self.engine.get_prompt_builder("llama3")
+            self.assertIs(self.engine.get_prompt_builder("llama3"), builder)
+
+        load.assert_called_once_with("blobs", logger=self.log, gguf_file="sha256-1")
+        self.assertIs(builder.counter.tokenizer, tokenizer)
+
+    def test_does_not_wait_for_the_lookup(self):
+        """Test that prompts are estimated while the tokenizer is looked up"""
+        release = threading.Event()
+        self.engine._ollama.get_model_file.side_effect = lambda model: release.wait(5) and None
+
+        self.assertIs(self.engine.get_prompt_builder("llama3"), self.engine.prompt_builder)
+        self.assertIs(self.engine.get_prompt_builder("llama3"), self.engine.prompt_builder)
+        release.set()
+        self.wait_for_lookups()
+
+        self.engine._ollama.get_model_file.assert_called_once_with("llama3")
+
+    def test_falls_back_to_estimate_once(self):
+        """Test that a model without a tokenizer is estimated and logged once"""
+        self.engine._ollama.get_model_file.return_value = None
+
+        for _ in range(3):
+            self.engine.prepare_tokenizer("remote-model")
+            self.wait_for_lookups()
+            self.assertIs(self.engine.get_prompt_builder("remote-model"), self.engine.prompt_builder)
+
+        self.engine._ollama.get_model_file.assert_called_once_with("remote-model")
+        messages = [call.args[0] for call in self.log.call_args_list]
+        self.assertEqual(sum("estimating token counts" in message for message in messages), 1)
+
+    def test_retries_when_server_unavailable(self):
+        """Test that a lookup failing because Ollama is not up is not cached"""
+        self.engine._ollama.get_model_file.side_effect = [ConnectionError("starting"),
+                                                          os.path.join("blobs", "sha256-1")]
+        with patch.object(chat_engine, "load_tokenizer", return_value=WordTokenizer()):
+            self.engine.prepare_tokenizer("llama3")
+            self.wait_for_lookups()
+            self.assertIs(self.engine.get_prompt_builder("llama3"), self.engine.prompt_builder)
+            self.wait_for_lookups()
+
+        self.assertIsNot(self.engine.get_prompt_builder("llama3"), self.engine.prompt_builder)
+        self.assertEqual(self.engine._ollama.get_model_file.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
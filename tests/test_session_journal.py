@@ -0,0 +1,187 @@
+"""
+Tests for the append-only chat session journal and the paged chat history.
+"""
+
+import unittest
+import copy
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.session_journal import SessionJournal
+from core.chat_history import ChatHistory
+from core.chat_engine import ChatEngine
+
+def make_messages(count, start=0):
+    """Build alternating user and assistant messages"""
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}\nline two ü"}
+            for i in range(start, start + count)]
+
+class TestSessionJournal(unittest.TestCase):
+    """Test cases for appending, paging, repair and compaction"""
+
+    def setUp(self):
+        """Create a journal in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = SessionJournal(os.path.join(self.tmp.name, "chat_history.jsonl"), logger=MagicMock())
+        # Small blocks make the backward scans cross block boundaries
+        self.journal.BLOCK_SIZE = 16
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_pages_backwards(self):
+        """Test that pages read from the end cover the journal in order"""
+        messages = make_messages(10)
+        size = self.journal.append(messages[:4])
+        self.assertEqual(self.journal.append([]), size)
+        self.journal.append(messages[4:])
+
+        page, offset = self.journal.read_before(None, 4)
+        self.assertEqual(page, messages[6:])
+        pages = [page]
+        while offset:
+            page, offset = self.journal.read_before(offset, 4)
+            pages.insert(0, page)
+
+        self.assertEqual([len(page) for page in pages], [2, 4, 4])
+        self.assertEqual(sum(pages, []), messages)
+        self.assertEqual(self.journal.read_all(), messages)
+
+    def test_missing_journal(self):
+        """Test reading a journal that does not exist yet"""
+        self.assertEqual(self.journal.read_before(None, 10), ([], 0))
+        self.assertEqual(self.journal.read_all(), [])
+        self.assertEqual(self.journal.size(), 0)
+
+    def test_repair_discards_torn_line(self):
+        """Test that an incomplete last line is truncated"""
+        messages = make_messages(3)
+        size = self.journal.append(messages)
+        with open(self.journal.path, "ab") as f:
+            f.write(b'{"role": "user", "cont')
+
+        self.journal.repair()
+
+        self.assertEqual(self.journal.size(), size)
+        self.journal.append(make_messages(1, start=3))
+        self.assertEqual(self.journal.read_all(), messages + make_messages(1, start=3))
+
+    def test_rewrite_keeps_prefix(self):
+        """Test that compaction keeps the unloaded older part of the journal"""
+        messages = make_messages(6)
+        self.journal.append(messages)
+        _, offset = self.journal.read_before(None, 2)
+
+        self.journal.rewrite([{"role": "user", "content": "edited"}], keep_bytes=offset)
+
+        self.assertEqual(self.journal.read_all(), messages[:4] + [{"role": "user", "content": "edited"}])
+        self.assertFalse(os.path.exists(self.journal.path + ".tmp"))
+
+class TestChatHistory(unittest.TestCase):
+    """Test cases for history revisions"""
+
+    def test_append_keeps_edit_revision(self):
+        """Test that appends change only the revision"""
+        history = ChatHistory(make_messages(2))
+        revision, edit_revision = history.revision, history.edit_revision
+
+        history.append({"role": "user", "content": "new"})
+        history += make_messages(1)
+
+        self.assertNotEqual(history.revision, revision)
+        self.assertEqual(history.edit_revision, edit_revision)
+
+    def test_edits_change_edit_revision(self):
+        """Test that in-place edits of the list or a message are seen"""
+        history = ChatHistory(make_messages(4))
+        for edit in (lambda: history[0].__setitem__("content", "changed"),
+                     lambda: history[1].update(content="changed"),
+                     lambda: history.insert(0, {"role": "user", "content": "first"}),
+                     lambda: history.__setitem__(slice(0, 1), []),
+                     lambda: history.pop()):
+            edit_revision = history.edit_revision
+            edit()
+            self.assertNotEqual(history.edit_revision, edit_revision)
+
+    def test_copies_are_plain(self):
+        """Test that copies are detached from the history"""
+        history = ChatHistory(make_messages(2))
+        edit_revision = history.edit_revision
+
+        messages = copy.deepcopy(history)
+        messages[0]["content"] = "changed"
+
+        self.assertIs(type(messages), list)
+        self.assertIs(type(messages[0]), dict)
+        self.assertEqual(history.edit_revision, edit_revision)
+
+class TestChatEngineSession(unittest.TestCase):
+    """Test cases for saving and paging the chat engine's history"""
+
+    def setUp(self):
+        """Create a session file path in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session_file = os.path.join(self.tmp.name, "chat_history.jsonl")
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.tmp.cleanup()
+
+    def open_engine(self):
+        """Create a chat engine that loads three messages at a time"""
+        return ChatEngine(MagicMock(), session_file=self.session_file, logger=MagicMock(),
+                          history_page_size=3)
+
+    def test_loads_history_in_pages(self):
+        """Test that the newest page is loaded first and older pages on demand"""
+        engine = self.open_engine()
+        messages = make_messages(8)
+        engine.chat_history.extend(messages)
+        self.assertTrue(engine.save_session())
+
+        engine = self.open_engine()
+        self.assertEqual(engine.chat_history, messages[5:])
+        self.assertTrue(engine.has_older_messages())
+        self.assertEqual(engine.load_older_messages(), 3)
+        self.assertEqual(engine.load_older_messages(), 2)
+        self.assertFalse(engine.has_older_messages())
+        self.assertEqual(engine.chat_history, messages)
+
+    def test_saves_edits_to_earlier_messages(self):
+        """Test that appends are journaled and edits compact the loaded page"""
+        engine = self.open_engine()
+        engine.chat_history.extend(make_messages(6))
+        engine.save_session()
+
+        engine = self.open_engine()
+        engine.chat_history.append({"role": "user", "content": "appended"})
+        engine.save_session()
+        engine.chat_history[0]["content"] = "edited"
+        engine.save_session()
+
+        expected = make_messages(6)
+        expected[3]["content"] = "edited"
+        self.assertEqual(SessionJournal(self.session_file).read_all(),
+                         expected + [{"role": "user", "content": "appended"}])
+
+    def test_clear_history_empties_journal(self):
+        """Test that clearing removes older messages that were not loaded"""
+        engine = self.open_engine()
+        engine.chat_history.extend(make_messages(6))
+        engine.save_session()
+
+        engine = self.open_engine()
+        engine.clear_history()
+        engine.save_session()
+
+        self.assertEqual(SessionJournal(self.session_file).read_all(), [])
+        self.assertEqual(self.open_engine().chat_history, [])
+
+if __name__ == "__main__":
+    unittest.main()
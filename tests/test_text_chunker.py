@@ -0,0 +1,75 @@
+"""
+Tests for streaming, sentence-aware document chunking.
+"""
+
+import unittest
+import io
+import os
+import sys
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.text_chunker import iter_chunks
+
+def make_text(sentences=60):
+    """Build a document of numbered sentences with mixed whitespace"""
+    separators = [" ", "\n", "  ", "\n\n"]
+    return "".join(f"Sentence number {i} says something about item {i * 7}." + separators[i % 4]
+                   for i in range(sentences)).rstrip()
+
+class TestTextChunker(unittest.TestCase):
+    """Test cases for chunk boundaries and character offsets"""
+
+    def test_short_text_is_one_chunk(self):
+        """Test that text within the chunk size is kept whole"""
+        chunks = list(iter_chunks("One sentence. Two sentences.", max_chunk_size=100))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0], ("One sentence. Two sentences.", 0, 28))
+
+    def test_offsets_slice_the_source(self):
+        """Test that every chunk is the exact slice of the source at its offsets"""
+        text = make_text()
+        chunks = list(iter_chunks(text, max_chunk_size=200, overlap=40))
+
+        self.assertGreater(len(chunks), 5)
+        for chunk in chunks:
+            self.assertEqual(text[chunk.start:chunk.end], chunk.text)
+
+        # Chunks are in order, cover the text and overlap their predecessor
+        self.assertEqual(chunks[0].start, 0)
+        self.assertEqual(chunks[-1].end, len(text))
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertLess(previous.start, chunk.start)
+            self.assertLessEqual(chunk.start, previous.end)
+
+    def test_chunks_end_on_sentences(self):
+        """Test that chunks hold whole sentences within the size limit"""
+        text = make_text()
+        for chunk in iter_chunks(text, max_chunk_size=200, overlap=0):
+            self.assertTrue(chunk.text.endswith("."))
+            self.assertLessEqual(len(" ".join(chunk.text.split())), 200)
+
+    def test_long_sentence_is_own_chunk(self):
+        """Test that a sentence longer than the limit is not split"""
+        long_sentence = "word " * 80 + "end."
+        text = "Short start. " + long_sentence + " Short end."
+        chunks = list(iter_chunks(text, max_chunk_size=100, overlap=0))
+
+        self.assertIn(long_sentence, [chunk.text for chunk in chunks])
+        for chunk in chunks:
+            self.assertEqual(text[chunk.start:chunk.end], chunk.text)
+
+    def test_streaming_matches_whole_text(self):
+        """Test that small reads of a file give the same chunks as a string"""
+        text = make_text(200)
+        expected = list(iter_chunks(text, max_chunk_size=300, overlap=60))
+
+        self.assertEqual(list(iter_chunks(io.StringIO(text), max_chunk_size=300, overlap=60, read_size=17)),
+                         expected)
+        pieces = [text[i:i + 50] for i in range(0, len(text), 50)]
+        self.assertEqual(list(iter_chunks(pieces, max_chunk_size=300, overlap=60)), expected)
+
+if __name__ == "__main__":
+    unittest.main()
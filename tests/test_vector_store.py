@@ -0,0 +1,207 @@
+"""
+Tests for the vector store journal and for compaction and purging.
+
+The memory system uses the hashing embedding backend, so no model is
+downloaded and embeddings are reproducible.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+import numpy as np
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.vector_store import VectorStoreJournal
+from core.memory_system import MemorySystem
+
+class TestVectorStoreJournal(unittest.TestCase):
+    """Test cases for journal records, replay order and torn tails"""
+
+    def setUp(self):
+        """Create a journal in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = VectorStoreJournal(os.path.join(self.tmp.name, "journal"), logger=MagicMock())
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_replays_records_in_order(self):
+        """Test that add and delete records are read back as written"""
+        first = np.arange(6, dtype=np.float32).reshape(2, 3)
+        second = np.ones((1, 3), dtype=np.float32)
+        self.journal.append(0, first, [{"source": "a"}, {"source": "b"}])
+        self.journal.append_delete([1])
+        self.journal.append(2, second, [{"source": "c"}])
+
+        records = list(self.journal.read())
+
+        self.assertEqual([record[0] for record in records],
+                         [VectorStoreJournal.ADD, VectorStoreJournal.DELETE, VectorStoreJournal.ADD])
+        kind, start_row, embeddings, documents = records[0]
+        self.assertEqual(start_row, 0)
+        np.testing.assert_array_equal(embeddings, first)
+        self.assertEqual(documents, [{"source": "a"}, {"source": "b"}])
+        self.assertEqual(records[1][3], [1])
+        self.assertEqual(records[2][1], 2)
+
+    def test_discards_torn_tail(self):
+        """Test that a partly written last record is dropped and truncated"""
+        embeddings = np.ones((1, 4), dtype=np.float32)
+        size = self.journal.append(0, embeddings, [{"source": "a"}])
+        self.journal.append(1, embeddings, [{"source": "b"}])
+        with open(self.journal.path, "r+b") as f:
+            f.truncate(size + 10)
+
+        records = list(self.journal.read())
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(os.path.getsize(self.journal.path), size)
+
+        # Appends continue on the record boundary
+        self.journal.append(1, embeddings, [{"source": "c"}])
+        self.assertEqual([record[3] for record in self.journal.read()],
+                         [[{"source": "a"}], [{"source": "c"}]])
+
+    def test_discards_corrupt_record(self):
+        """Test that a record failing its checksum ends the replay"""
+        embeddings = np.ones((1, 4), dtype=np.float32)
+        size = self.journal.append(0, embeddings, [{"source": "a"}])
+        self.journal.append(1, embeddings, [{"source": "b"}])
+        with open(self.journal.path, "r+b") as f:
+            f.seek(size + VectorStoreJournal.HEADER.size)
+            f.write(b"\xff\xff\xff\xff")
+
+        self.assertEqual(len(list(self.journal.read())), 1)
+        self.assertEqual(os.path.getsize(self.journal.path), size)
+
+    def test_truncate_before_keeps_later_rows_and_deletes(self):
+        """Test that compaction drops only add records it covers"""
+        embeddings = np.ones((2, 4), dtype=np.float32)
+        self.journal.append(0, embeddings, [{"source": "a"}, {"source": "b"}])
+        self.journal.append_delete([0])
+        self.journal.append(2, embeddings, [{"source": "c"}, {"source": "d"}])
+
+        self.journal.truncate_before(2)
+
+        records = list(self.journal.read())
+        self.assertEqual([(record[0], record[1]) for record in records],
+                         [(VectorStoreJournal.DELETE, 0), (VectorStoreJournal.ADD, 2)])
+
+        self.journal.truncate_before(4)
+        self.assertEqual([record[0] for record in self.journal.read()], [VectorStoreJournal.DELETE])
+
+class TestCompactionAndPurge(unittest.TestCase):
+    """Test cases for persisting, compacting and purging the memory index"""
+
+    def setUp(self):
+        """Create an empty memory system in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp.name, "vector_store", "vector_store.json")
+        self.memory = self.open_memory()
+
+    def tearDown(self):
+        """Close the memory system and remove the temporary directory"""
+        self.memory.close()
+        self.tmp.cleanup()
+
+    def open_memory(self):
+        """Open the memory system, without background purges"""
+        memory = MemorySystem(model_name="test", index_path=self.index_path, logger=MagicMock(),
+                              use_embedding_cache=False, embedding_backend="hashing")
+        memory.PURGE_RATIO = 2.0
+        return memory
+
+    def reopen(self):
+        """Close the memory system and load it again from disk"""
+        self.memory.close()
+        self.memory = self.open_memory()
+
+    def add_documents(self, count, source="notes.txt"):
+        """Add documents with distinct text"""
+        docs = [f"document {i} about topic{i}" for i in range(count)]
+        self.assertTrue(self.memory.add_to_index(docs, [{"source": source, "text": doc} for doc in docs]))
+
+    def test_replays_journal_without_save(self):
+        """Test that added and deleted documents survive a restart"""
+        self.add_documents(5)
+        self.memory._delete_rows([1])
+        self.assertFalse(self.memory.store.exists())
+
+        self.reopen()
+
+        self.assertEqual(len(self.memory.index), 5)
+        self.assertEqual(len(self.memory.documents), 4)
+        self.assertNotIn("document 1 about topic1", [doc["text"] for doc in self.memory.documents])
+
+    def test_compaction_truncates_journal(self):
+        """Test that saving writes the store and empties the journal"""
+        self.add_documents(5)
+
+        self.assertTrue(self.memory.save_index())
+
+        self.assertTrue(self.memory.store.exists())
+        self.assertFalse(self.memory.journal.exists())
+
+        self.add_documents(2, source="later.txt")
+        self.reopen()
+        self.assertEqual(len(self.memory.documents), 7)
+        self.assertEqual(self.memory.search("topic3", top_k=1)[0]["text"], "document 3 about topic3")
+
+    def test_purge_removes_deleted_rows(self):
+        """Test that a purge renumbers rows and persists the result"""
+        self.add_documents(4)
+        self.add_documents(2, source="old.txt")
+        self.assertEqual(self.memory.delete_by_source("old.txt"), 2)
+        self.assertEqual(len(self.memory.index), 6)
+
+        self.assertTrue(self.memory._purge_deleted())
+
+        self.assertEqual(len(self.memory.index), 4)
+        self.assertEqual(self.memory.get_stats()["deleted_count"], 0)
+        self.assertEqual(self.memory.filter_rows({"source": "notes.txt"}), [0, 1, 2, 3])
+
+        self.reopen()
+        self.assertEqual(len(self.memory.index), 4)
+        self.assertEqual({doc["source"] for doc in self.memory.documents}, {"notes.txt"})
+        self.assertFalse(self.memory.search("topic1", filters={"source": "old.txt"}))
+
+    def test_relocate_keeps_deletions_and_collections(self):
+        """Test that copying to a new path drops deleted rows and moves collections"""
+        self.add_documents(6)
+        self.add_documents(4, source="old.txt")
+        self.memory.delete_by_source("old.txt")
+        self.memory.add_reflection("learning", "the user prefers short answers")
+
+        self.index_path = os.path.join(self.tmp.name, "moved", "vector_store.json")
+        self.assertTrue(self.memory.relocate(self.index_path))
+        self.assertEqual(len(self.memory.index), 6)
+
+        # Deletions made after the move are journaled at the new path
+        self.memory.delete_by_source("notes.txt")
+        self.add_documents(1, source="new.txt")
+        self.reopen()
+
+        self.assertEqual({doc["source"] for doc in self.memory.documents}, {"new.txt"})
+        reflections = self.memory.get_collection(MemorySystem.REFLECTIONS_COLLECTION, create=False)
+        self.assertIsNotNone(reflections)
+        self.assertEqual([doc["text"] for doc in reflections.documents], ["the user prefers short answers"])
+
+    def test_relocate_without_copy_loads_new_path(self):
+        """Test that switching to an empty location does not carry documents"""
+        self.add_documents(3)
+        self.index_path = os.path.join(self.tmp.name, "other", "vector_store.json")
+
+        self.assertFalse(self.memory.relocate(self.index_path, copy_index=False))
+
+        self.assertEqual(len(self.memory.documents), 0)
+        self.reopen()
+        self.assertEqual(len(self.memory.documents), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -570,7 +570,7 @@ class Dashboard:
         
         # Get memory mode
         memory_mode = self.chat_engine.memory_mode
-        self.memory_mode_var.set(memory_mode)
+        self.memory_mode_var.set(memory_mode.capitalize())
         
         # Calculate average response length
         if assistant_count > 0:
@@ -775,23 +775,11 @@ class Dashboard:
         last_updated = stats["last_updated"] or "Never"
         self.last_updated_var.set(last_updated)
         
-        # Count unique sources
-        sources = set()
-        source_types = {}
-        
-        for doc in self.memory_system.documents:
-            source = doc.get("source", "Unknown")
-            sources.add(source)
-            
-            # Get file extension
-            ext = os.path.splitext(source)[1].lower() if "." in source else "unknown"
-            source_types[ext] = source_types.get(ext, 0) + 1
-            
         # Update unique sources count
-        self.source_count_var.set(str(len(sources)))
+        self.source_count_var.set(str(len(stats["sources"])))
         
-        # Update sources tree
-        self.update_sources_tree(source_types, doc_count)
+        # Update sources tree with the per-file-type counts
+        self.update_sources_tree(stats["file_types"], doc_count)
         
         # Add recent searches (placeholder - would need to track searches)
         self.searches_listbox.delete(0, tk.END)
@@ -138,7 +138,7 @@ class MainWindow:
             self.chat_engine = ChatEngine(
                 model_manager=self.model_manager,
                 memory_system=self.memory_system,
-                session_file="data/chat_history.json",
+                session_file="data/chat_history.jsonl",
                 logger=self.logger.log
             )
         
@@ -298,7 +298,7 @@ class MainWindow:
         
         # Add memory mode selector to toolbar
         ttk.Label(toolbar, text="Memory Mode:").pack(side=tk.LEFT, padx=(20, 5))
-        self.memory_mode_var = tk.StringVar(value=self.chat_engine.memory_mode)
+        self.memory_mode_var = tk.StringVar(value=self.chat_engine.memory_mode.capitalize())
         memory_modes = ["Off", "Manual", "Auto", "Background"]
         memory_dropdown = ttk.Combobox(
             toolbar, 
@@ -577,6 +577,10 @@ class MainWindow:
         # Deactivate all active plugins
         self.cleanup_plugins()
         
+        # Stop embedding workers and background index writes, after the
+        # plugins so they can still store memories while deactivating
+        self.memory_system.close()
+        
         # Log shutdown
         self.logger.log("[System] Irintai Assistant shutting down")
         
@@ -11,6 +11,10 @@ from core.model_manager import MODEL_STATUS
 class ChatPanel:
     """Chat interface panel for user interaction with the AI assistant"""
 
+    # Streamed response pieces are gathered and inserted into the console
+    # at most once per this many milliseconds
+    STREAM_FLUSH_MS = 40
+
     def __init__(self, parent, chat_engine, logger: Callable, config_manager):
         """
         Initialize the chat panel
@@ -26,6 +30,13 @@ class ChatPanel:
         self.log = logger
         self.config_manager = config_manager
 
+        # Response being streamed into the console: pieces received from the
+        # worker thread and not yet inserted, and the text inserted so far
+        self._stream_pending: List[str] = []
+        self._stream_lock = threading.Lock()
+        self._stream_flush_scheduled = False
+        self._stream_text = ""
+
         # Create the main frame
         self.frame = ttk.Frame(parent)
 
@@ -228,6 +239,13 @@ class ChatPanel:
             command=self.save_conversation
         ).pack(side=tk.RIGHT, padx=5)
         
+        # Add button to page in older history from the session journal
+        ttk.Button(
+            filter_frame, 
+            text="Earlier Messages", 
+            command=self.load_earlier_messages
+        ).pack(side=tk.RIGHT, padx=5)
+        
     def create_input_section(self):
         """Create the user input section"""
         input_frame = ttk.Frame(self.frame)
@@ -391,6 +409,19 @@ class ChatPanel:
         # Update timeline
         self.update_timeline()
 
+    def load_earlier_messages(self):
+        """Load the previous page of chat history and redisplay it"""
+        if not self.chat_engine.has_older_messages():
+            self.log("[Chat] No earlier messages")
+            return
+            
+        count = self.chat_engine.load_older_messages()
+        self.log(f"[Chat] Loaded {count} earlier messages")
+        self.load_chat_history()
+        
+        # Keep the view at the oldest newly loaded message
+        self.console.see(1.0)
+
     def update_status_indicators(self): # <<< MODIFY THIS METHOD
         """Update the status indicator based on the model's status."""
         if hasattr(self, 'status_light') and hasattr(self.chat_engine, 'model_manager'):
@@ -522,10 +553,13 @@ class ChatPanel:
         # Disable submit button while processing
         self.submit_button.config(state=tk.DISABLED)
         
+        # Open the response in the console; pieces are shown as they arrive
+        self._begin_assistant_stream()
+        
         # Send to chat engine
         def on_response(response):
-            # Display assistant response
-            self.display_assistant_message(response)
+            # Complete the streamed response
+            self._finish_assistant_stream(response)
             
             # Re-enable submit button
             self.submit_button.config(state=tk.NORMAL)
@@ -549,12 +583,90 @@ class ChatPanel:
             prompt: Prompt text
             callback: Function to call with response
         """
-        # Send to chat engine
-        response = self.chat_engine.send_message(prompt)
+        # Send to chat engine, streaming the response into the console
+        response = self.chat_engine.send_message(prompt, on_chunk=self._queue_stream_chunk)
         
         # Call callback on main thread
         self.frame.after(0, lambda: callback(response))
         
+    def _begin_assistant_stream(self):
+        """Insert the header of a response whose text will be streamed"""
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        
+        self.console.config(state=tk.NORMAL)
+        self.console.insert(tk.END, f"[{timestamp}] ", "timestamp")
+        self.console.insert(tk.END, "[Irintai] ", "irintai")
+        
+        # Streamed text goes between these marks; the end mark moves
+        # forward past every insertion made at it
+        self.console.mark_set("stream_start", "end-1c")
+        self.console.mark_gravity("stream_start", tk.LEFT)
+        self.console.mark_set("stream_end", "end-1c")
+        self.console.mark_gravity("stream_end", tk.RIGHT)
+        self.console.config(state=tk.DISABLED)
+        self.console.see(tk.END)
+        
+        with self._stream_lock:
+            self._stream_pending = []
+        self._stream_text = ""
+        
+    def _queue_stream_chunk(self, chunk):
+        """
+        Queue a response piece for display; called from the worker thread
+        
+        Pieces arrive once per token, so they are batched and a single
+        console insert is scheduled per STREAM_FLUSH_MS.
+        
+        Args:
+            chunk: Response text piece
+        """
+        with self._stream_lock:
+            self._stream_pending.append(chunk)
+            if self._stream_flush_scheduled:
+                return
+            self._stream_flush_scheduled = True
+        self.frame.after(self.STREAM_FLUSH_MS, self._flush_stream)
+        
+    def _flush_stream(self):
+        """Insert the queued response pieces into the console"""
+        with self._stream_lock:
+            text = "".join(self._stream_pending)
+            self._stream_pending = []
+            self._stream_flush_scheduled = False
+        if not text:
+            return
+            
+        self.console.config(state=tk.NORMAL)
+        self.console.insert("stream_end", text, "irintai_message")
+        self.console.config(state=tk.DISABLED)
+        self.console.see(tk.END)
+        self._stream_text += text
+        
+    def _finish_assistant_stream(self, response):
+        """
+        Complete a streamed response with the final text
+        
+        Message modifiers and plugin hooks run on the complete response,
+        so the final text may extend or differ from what was streamed; it
+        is appended to, or replaces, the streamed text.
+        
+        Args:
+            response: Final response text from the chat engine
+        """
+        self._flush_stream()
+        final = self.process_message_hooks(response, "assistant")
+        
+        self.console.config(state=tk.NORMAL)
+        if final.startswith(self._stream_text):
+            remainder = final[len(self._stream_text):]
+        else:
+            self.console.delete("stream_start", "stream_end")
+            remainder = final
+        self.console.insert("stream_end", f"{remainder}\n\n", "irintai_message")
+        self.console.config(state=tk.DISABLED)
+        self.console.see(tk.END)
+        self._stream_text = ""
+        
     def update_timeline(self, prompt=None):
         """
         Update the conversation timeline
@@ -721,6 +833,7 @@ class ChatPanel:
         
         if success:
             self.log(f"[Model] Starting {model_name}")
+            self.chat_engine.prepare_tokenizer(model_name)
             self.console.insert(
                 tk.END,
                 f"[System] Starting model: {model_name}...\n\n",
@@ -762,6 +875,9 @@ class ChatPanel:
         # Update the model manager
         self.chat_engine.model_manager.current_model = model_name
         
+        # Load the model's tokenizer for prompt token counts in the background
+        self.chat_engine.prepare_tokenizer(model_name)
+        
         # Check if the model is running
         if (self.chat_engine.model_manager.model_process and 
             self.chat_engine.model_manager.model_process.poll() is None):
@@ -819,34 +819,25 @@ class ConfigPanel:
             new_path = self.index_path_var.get()
             
             # Ask if the user wants to copy the old index to the new path
-            if os.path.exists(old_path):
-                result = messagebox.askyesno(
+            copy_index = False
+            if self.memory_system.documents:
+                copy_index = messagebox.askyesno(
                     "Copy Index",
                     f"Do you want to copy the existing index from\n{old_path}\nto\n{new_path}?",
                     icon=messagebox.QUESTION
                 )
-                
-                if result:
-                    # Create directory if it doesn't exist
-                    os.makedirs(os.path.dirname(new_path), exist_ok=True)
-                    
-                    # Copy the file
-                    import shutil
-                    try:
-                        shutil.copy2(old_path, new_path)
-                        self.log(f"[Config] Copied index from {old_path} to {new_path}")
-                    except Exception as e:
-                        self.log(f"[Error] Failed to copy index: {e}")
-                        messagebox.showerror(
-                            "Error",
-                            f"Failed to copy index: {e}"
-                        )
             
-            # Update memory system path
-            self.memory_system.index_path = new_path
-            
-            # Reload index
-            self.memory_system.load_index()
+            # Move the memory system, writing its live documents and
+            # collections to the new location or loading what is there
+            moved = self.memory_system.relocate(new_path, copy_index=copy_index)
+            if copy_index:
+                if moved:
+                    self.log(f"[Config] Copied index from {old_path} to {new_path}")
+                else:
+                    messagebox.showerror(
+                        "Error",
+                        "Failed to copy index"
+                    )
         
         # Update chat engine settings
         self.chat_engine.set_system_prompt(self.system_prompt_var.get())
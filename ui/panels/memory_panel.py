@@ -299,6 +299,10 @@ class MemoryPanel:
         self.index_path_var = tk.StringVar(value=self.memory_system.index_path)
         ttk.Label(stats_frame, textvariable=self.index_path_var, foreground="blue").grid(row=2, column=1, sticky=tk.W, padx=5, pady=2)
         
+        ttk.Label(stats_frame, text="Embedding Model:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=2)
+        self.model_state_var = tk.StringVar(value="Not loaded")
+        ttk.Label(stats_frame, textvariable=self.model_state_var).grid(row=3, column=1, sticky=tk.W, padx=5, pady=2)
+        
         # Action buttons
         action_frame = ttk.Frame(mgmt_frame)
         action_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -489,10 +493,30 @@ class MemoryPanel:
         self.doc_count_var.set(str(stats["documents_count"]))
         self.last_updated_var.set(stats["last_updated"] or "Never")
         self.index_path_var.set(stats["index_path"])
+        self.model_state_var.set(self._get_model_state_description(stats.get("model_state")))
         
         # Update document tree
         self._update_document_tree(stats)
         
+    def _get_model_state_description(self, state):
+        """
+        Get display text for an embedding model load state
+        
+        Args:
+            state: Model state reported by the memory system
+            
+        Returns:
+            Description text
+        """
+        descriptions = {
+            "not_loaded": "Not loaded (loads on first use)",
+            "loading": "Loading...",
+            "loaded": f"Loaded ({self.memory_system.model_name})",
+            "failed": "Failed to load"
+        }
+        
+        return descriptions.get(state, "Unknown")
+        
     def _update_document_tree(self, stats):
         """
         Update the document tree with current index contents
@@ -504,35 +528,17 @@ class MemoryPanel:
         for item in self.docs_tree.get_children():
             self.docs_tree.delete(item)
             
-        # Group documents by source
-        sources = {}
-        for doc in self.memory_system.documents:
-            source = doc.get("source", "Unknown")
+        # One row per source, from the per-source counters in the stats
+        for source, count in stats["sources"].items():
             file_type = os.path.splitext(source)[1] if "." in source else "Unknown"
-            timestamp = doc.get("timestamp", "Unknown")
-            
-            if source in sources:
-                sources[source]["count"] += 1
-                # Keep the most recent timestamp
-                if timestamp > sources[source]["timestamp"]:
-                    sources[source]["timestamp"] = timestamp
-            else:
-                sources[source] = {
-                    "type": file_type,
-                    "count": 1,
-                    "timestamp": timestamp
-                }
-                
-        # Add to tree
-        for source, info in sources.items():
             self.docs_tree.insert(
                 "",
                 tk.END,
                 values=(
                     source,
-                    info["type"],
-                    info["count"],
-                    info["timestamp"]
+                    file_type,
+                    count,
+                    stats["source_updated"].get(source, "Unknown")
                 )
             )
             
@@ -548,10 +554,7 @@ class MemoryPanel:
         source = values[0]
         
         # Find all chunks for this source
-        chunks = []
-        for doc in self.memory_system.documents:
-            if doc.get("source") == source:
-                chunks.append(doc)
+        chunks = self.memory_system.get_documents_by_source(source)
                 
         if not chunks:
             return
@@ -619,27 +622,33 @@ class MemoryPanel:
         # Load files in a separate thread
         def load_thread():
             successful = 0
-            for i, file_path in enumerate(files):
-                # Update progress
-                progress_var.set(i)
-                filename = os.path.basename(file_path)
-                status_var.set(f"Loading {filename}...")
+            # Embed and save all files together when the batch commits
+            with self.memory_system.batch() as batch:
+                for i, file_path in enumerate(files):
+                    # Update progress
+                    progress_var.set(i)
+                    filename = os.path.basename(file_path)
+                    status_var.set(f"Loading {filename}...")
+                    progress_window.update()
+                    
+                    # Use our enhanced memory handler which routes PDFs through enhanced processing
+                    if self.enhanced_memory.add_file_to_memory(file_path):
+                        successful += 1
+                        self.log(f"[Loaded] {filename}")
+                    else:
+                        self.log(f"[Error] Failed to load {file_path}")
+                        
+                status_var.set("Embedding documents...")
                 progress_window.update()
-                
-                # Use our enhanced memory handler which routes PDFs through enhanced processing
-                if self.enhanced_memory.add_file_to_memory(file_path):
-                    successful += 1
-                    self.log(f"[Loaded] {filename}")
-                else:
-                    self.log(f"[Error] Failed to load {file_path}")
                     
             # Finish up
             progress_var.set(len(files))
             status_var.set("Complete")
             progress_window.update()
             
-            # Save the index
-            self.memory_system.save_index()
+            if not batch.success:
+                successful = 0
+                self.log("[Error] Failed to save loaded files to memory")
             
             # Refresh stats
             self.refresh_stats()
@@ -702,27 +711,33 @@ class MemoryPanel:
             # Set maximum value for progress bar
             progress_window.nametowidget(progress_window.winfo_children()[1]).config(maximum=len(files))
             
-            # Process each file with our enhanced handler
+            # Process each file with our enhanced handler, embedding and
+            # saving them together when the batch commits
             successful = 0
-            for i, file_path in enumerate(files):
-                status_var.set(f"Loading {os.path.basename(file_path)}")
-                progress_var.set(i)
+            with self.memory_system.batch() as batch:
+                for i, file_path in enumerate(files):
+                    status_var.set(f"Loading {os.path.basename(file_path)}")
+                    progress_var.set(i)
+                    progress_window.update()
+                    
+                    # Use our enhanced memory handler which routes PDFs through enhanced processing
+                    if self.enhanced_memory.add_file_to_memory(file_path):
+                        successful += 1
+                        self.log(f"[Loaded] {os.path.basename(file_path)}")
+                    else:
+                        self.log(f"[Error] Failed to load {file_path}")
+                        
+                status_var.set("Embedding documents...")
                 progress_window.update()
-                
-                # Use our enhanced memory handler which routes PDFs through enhanced processing
-                if self.enhanced_memory.add_file_to_memory(file_path):
-                    successful += 1
-                    self.log(f"[Loaded] {os.path.basename(file_path)}")
-                else:
-                    self.log(f"[Error] Failed to load {file_path}")
                     
             # Finish up
             progress_var.set(len(files))
             status_var.set("Complete")
             progress_window.update()
             
-            # Save the index
-            self.memory_system.save_index()
+            if not batch.success:
+                successful = 0
+                self.log("[Error] Failed to save loaded files to memory")
             
             # Refresh stats
             self.refresh_stats()
@@ -869,8 +884,8 @@ class MemoryPanel:
         
         # Find path for this source
         path = None
-        for doc in self.memory_system.documents:
-            if doc.get("source") == source and "path" in doc:
+        for doc in self.memory_system.get_documents_by_source(source):
+            if "path" in doc:
                 path = doc["path"]
                 break
                 
@@ -934,8 +949,7 @@ class MemoryPanel:
                 else:
                     self.log(f"[Memory Error] Failed to remove document: {source}")
                     
-        # Save changes and refresh view
-        self.memory_system.save_index()
+        # Refresh view; removals are journaled by the memory system
         self.refresh_stats()
         
     def view_document_info(self):
@@ -961,11 +975,8 @@ class MemoryPanel:
                 source = self.docs_tree.item(parent_id, "text") + "/" + doc_id
                 
             # Find document in memory system
-            doc_info = None
-            for doc in self.memory_system.documents:
-                if doc.get("source") == source:
-                    doc_info = doc
-                    break
+            chunks = self.memory_system.get_documents_by_source(source)
+            doc_info = chunks[0] if chunks else None
                     
             if doc_info:
                 # Show document info in a dialog
@@ -1369,25 +1380,21 @@ class MemoryPanel:
         try:
             import json
             
-            # Get metadata
+            # Get metadata from the memory statistics
+            stats = self.memory_system.get_stats()
             metadata = {
-                "index_path": self.memory_system.index_path,
-                "document_count": len(self.memory_system.documents),
-                "last_updated": self.memory_system.last_updated,
-                "sources": {}
-            }
-            
-            # Group documents by source
-            for doc in self.memory_system.documents:
-                source = doc.get("source", "Unknown")
-                if source in metadata["sources"]:
-                    metadata["sources"][source]["chunk_count"] += 1
-                else:
-                    metadata["sources"][source] = {
-                        "chunk_count": 1,
+                "index_path": stats["index_path"],
+                "document_count": stats["documents_count"],
+                "last_updated": stats["last_updated"],
+                "sources": {
+                    source: {
+                        "chunk_count": count,
                         "file_type": os.path.splitext(source)[1] if "." in source else "Unknown",
-                        "timestamp": doc.get("timestamp", "Unknown")
+                        "timestamp": stats["source_updated"].get(source, "Unknown")
                     }
+                    for source, count in stats["sources"].items()
+                }
+            }
             
             # Save to file
             with open(filename, "w", encoding="utf-8") as f:
@@ -1502,8 +1509,7 @@ class MemoryPanel:
                 else:
                     self.log(f"[Memory Error] Failed to remove document: {source}")
                     
-        # Save changes and refresh view
-        self.memory_system.save_index()
+        # Refresh view; removals are journaled by the memory system
         self.refresh_stats()
         
     def view_document_info(self):
@@ -1529,11 +1535,8 @@ class MemoryPanel:
                 source = self.docs_tree.item(parent_id, "text") + "/" + doc_id
                 
             # Find document in memory system
-            doc_info = None
-            for doc in self.memory_system.documents:
-                if doc.get("source") == source:
-                    doc_info = doc
-                    break
+            chunks = self.memory_system.get_documents_by_source(source)
+            doc_info = chunks[0] if chunks else None
                     
             if doc_info:
                 # Show document info in a dialog